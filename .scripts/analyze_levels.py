@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Structural report for every level in Graph.kt: bridges, cut vertices, traps.
+
+One iterative Tarjan DFS per level over the LevelGraph incidence arrays
+finds every bridge and articulation point in linear time. The parent edge
+is skipped by edge index rather than by vertex, so parallel edges are
+correctly never bridges.
+
+When a level has an Eulerian trail, every bridge separates the two trail
+ends, so each one has to be crossed only after everything behind it is
+drawn. The bridges that can be taken as the very first move while other
+edges are still waiting at the start node are reported as trap edges. A
+declared hints.firstEdge is sound when it leaves from a valid start and is
+not a trap (Fleury's rule), which needs no trail search at all.
+"""
+import argparse
+import sys
+
+from graph_core import LevelGraph
+from solve_levels import has_trail, trail_starts
+from validate_levels import iter_levels
+
+
+def cut_structure(graph):
+    """(bridges, pieces) for the whole graph.
+
+    `bridges` is a set of edge indices into graph.edges. `pieces` maps the
+    vertex index of every articulation point to the number of components
+    its removal leaves behind in its own component.
+    """
+    offsets, neighbors, edge_ids = graph.incidence()
+    n = len(graph.node_ids)
+    disc = [0] * n
+    low = [0] * n
+    splits = [0] * n
+    ptr = list(offsets)
+    bridges = set()
+    pieces = {}
+    clock = 0
+
+    for root in range(n):
+        if disc[root] or offsets[root] == offsets[root + 1]:
+            continue
+        clock += 1
+        disc[root] = low[root] = clock
+        stack = [root]
+        via = [-1]
+        while stack:
+            v = stack[-1]
+            slot = ptr[v]
+            if slot < offsets[v + 1]:
+                ptr[v] = slot + 1
+                e = edge_ids[slot]
+                if e == via[-1]:
+                    continue
+                w = neighbors[slot]
+                if disc[w]:
+                    if disc[w] < low[v]:
+                        low[v] = disc[w]
+                else:
+                    clock += 1
+                    disc[w] = low[w] = clock
+                    stack.append(w)
+                    via.append(e)
+            else:
+                stack.pop()
+                e = via.pop()
+                if stack:
+                    u = stack[-1]
+                    if low[v] < low[u]:
+                        low[u] = low[v]
+                    if low[v] >= disc[u]:
+                        splits[u] += 1
+                        if low[v] > disc[u]:
+                            bridges.add(e)
+
+        # The root cuts only with two or more DFS subtrees; any other vertex
+        # cuts off each subtree that cannot climb above it, plus its parent side.
+        if splits[root] >= 2:
+            pieces[root] = splits[root]
+        splits[root] = -1
+    for v in range(n):
+        if splits[v] > 0:
+            pieces[v] = splits[v] + 1
+    return bridges, pieces
+
+
+def trap_edges(graph, bridges):
+    """{start node index: [edge indices]} of first moves that strand edges.
+
+    Only meaningful for levels with a trail: a bridge out of a valid start is
+    a trap whenever that start has another edge to draw first.
+    """
+    offsets, _, edge_ids = graph.incidence()
+    degree = graph.degree
+    traps = {}
+    if not bridges:
+        return traps
+    for s in trail_starts(graph):
+        if degree[s] > 1:
+            found = sorted({edge_ids[slot] for slot in range(offsets[s], offsets[s + 1])} & bridges)
+            if found:
+                traps[s] = found
+    return traps
+
+
+def first_edge_sound(graph, bridges, first_edge):
+    """Does some complete trail start with `first_edge`, in either direction?
+
+    Assumes the level has a trail (right parity, edges connected).
+    """
+    a, b = first_edge
+    index = graph.index
+    ia = index.get(a)
+    ib = index.get(b)
+    if ia is None or ib is None or not graph.has_edge(a, b):
+        return False
+    offsets, neighbors, edge_ids = graph.incidence()
+    starts = trail_starts(graph)
+    degree = graph.degree
+    for s, t in ((ia, ib), (ib, ia)):
+        if s not in starts:
+            continue
+        if degree[s] == 1:
+            return True
+        # Any parallel copy that is not a bridge will do; a parallel edge never is.
+        for slot in range(offsets[s], offsets[s + 1]):
+            if neighbors[slot] == t and edge_ids[slot] not in bridges:
+                return True
+    return False
+
+
+def analyze_level(level):
+    graph = LevelGraph(level['nodes'], level['edges'])
+    bridges, pieces = cut_structure(graph)
+    ids = graph.node_ids
+    edges = level['edges']
+
+    report = {
+        'bridges': [edges[e] for e in sorted(bridges)],
+        'cut_vertices': [(ids[v], k) for v, k in sorted(pieces.items(), key=lambda item: ids[item[0]])],
+        'traps': {},
+        'first_edge_sound': None,
+    }
+    if has_trail(graph):
+        report['traps'] = {
+            ids[s]: [edges[e] for e in found]
+            for s, found in sorted(trap_edges(graph, bridges).items(), key=lambda item: ids[item[0]])
+        }
+        if level['first_edge']:
+            report['first_edge_sound'] = first_edge_sound(graph, bridges, level['first_edge'])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    args = parser.parse_args()
+
+    count = 0
+    unsound = 0
+    for level in iter_levels(args.filepath):
+        count += 1
+        report = analyze_level(level)
+        header = f"Level {level['id']} ({level['name']})"
+        if not report['bridges'] and not report['cut_vertices']:
+            print(f"{header} - no bridges or cut vertices")
+        else:
+            print(f"{header}:")
+            if report['bridges']:
+                print(f"  Bridges: {', '.join(f'({a},{b})' for a, b in report['bridges'])}")
+            if report['cut_vertices']:
+                print(f"  Cut vertices: {', '.join(f'{v} ({k} pieces)' for v, k in report['cut_vertices'])}")
+            for start, found in report['traps'].items():
+                print(f"  Traps from {start}: {', '.join(f'({a},{b})' for a, b in found)}")
+        if report['first_edge_sound'] is False:
+            a, b = level['first_edge']
+            print(f"  WARNING: firstEdge ({a},{b}) cannot start a complete trail")
+            unsound += 1
+
+    print(f"\nTotal: {count} levels, {unsound} unsound firstEdge hints")
+    return 1 if unsound else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
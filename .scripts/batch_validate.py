@@ -0,0 +1,267 @@
+"""Validate a whole level pack at once with NumPy.
+
+Every level's nodes and edges are packed into flat arrays with per-level
+offsets, and each check in validate_levels.validate_level becomes a fixed
+sequence of whole-pack array operations. Only levels that fail are turned
+back into Python to render their messages, so validate_pack() returns the
+same issue lists as calling validate_level() on each level.
+
+Requires numpy.
+"""
+from itertools import chain
+
+import numpy as np
+
+# Per-level keys put the level index in the high 32 bits and the node id in
+# the low 32, so sorting keys groups by level and then orders by node id.
+_SHIFT = np.int64(32)
+_LOW = np.int64(0xFFFFFFFF)
+
+
+class PackedLevels:
+    """Flat node/edge arrays for a list of levels, with per-level offsets."""
+
+    __slots__ = (
+        'count', 'node_offsets', 'node_ids', 'edge_offsets', 'edges',
+        'start_offsets', 'valid_starts', 'first_edges', 'has_first_edge',
+    )
+
+    def __init__(self, levels):
+        count = len(levels)
+        node_counts = np.fromiter((len(level['nodes']) for level in levels), np.int64, count)
+        edge_counts = np.fromiter((len(level['edges']) for level in levels), np.int64, count)
+        start_counts = np.fromiter((len(level['valid_starts']) for level in levels), np.int64, count)
+
+        self.count = count
+        self.node_offsets = _offsets(node_counts)
+        self.edge_offsets = _offsets(edge_counts)
+        self.start_offsets = _offsets(start_counts)
+        self.node_ids = np.fromiter(
+            chain.from_iterable(level['nodes'] for level in levels), np.int64, int(node_counts.sum()))
+        self.edges = np.fromiter(
+            chain.from_iterable(chain.from_iterable(level['edges']) for level in levels),
+            np.int64, 2 * int(edge_counts.sum())).reshape(-1, 2)
+        self.valid_starts = np.fromiter(
+            chain.from_iterable(level['valid_starts'] for level in levels), np.int64, int(start_counts.sum()))
+        self.has_first_edge = np.fromiter(
+            (bool(level['first_edge']) for level in levels), bool, count)
+        self.first_edges = np.fromiter(
+            chain.from_iterable(level['first_edge'] or (0, 0) for level in levels),
+            np.int64, 2 * count).reshape(-1, 2)
+
+    @classmethod
+    def from_arrays(cls, node_counts, node_ids, edge_counts, edges, start_counts, valid_starts,
+                    has_first_edge, first_edges):
+        """A pack over existing arrays, used as they are: per-level counts,
+        the flat node ids, (n, 2) edges and valid starts, and (count, 2)
+        first edges where has_first_edge is set. Any unsigned or int64 dtype
+        works, so views of a mapped file are checked without being copied.
+        """
+        pack = cls.__new__(cls)
+        pack.count = len(node_counts)
+        pack.node_offsets = _offsets(node_counts)
+        pack.edge_offsets = _offsets(edge_counts)
+        pack.start_offsets = _offsets(start_counts)
+        pack.node_ids = node_ids
+        pack.edges = edges
+        pack.valid_starts = valid_starts
+        pack.has_first_edge = has_first_edge
+        pack.first_edges = first_edges
+        return pack
+
+
+def _offsets(counts):
+    offsets = np.zeros(len(counts) + 1, np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+
+def _owner(offsets):
+    """Level index of every element of a flat array described by `offsets`."""
+    return np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+
+
+def _sorted_unique(values):
+    # Sort-based rather than np.unique, which may hash instead of sort.
+    values = np.sort(values)
+    keep = np.ones(len(values), bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+def _member(keys, sorted_targets):
+    """Mask of `keys` present in the sorted array `sorted_targets`."""
+    if len(sorted_targets) == 0:
+        return np.zeros(len(keys), bool)
+    at = np.minimum(np.searchsorted(sorted_targets, keys), len(sorted_targets) - 1)
+    return sorted_targets[at] == keys
+
+
+def _slices(level_of_sorted, count):
+    """Offsets of each level's run inside an array sorted by level."""
+    return np.searchsorted(level_of_sorted, np.arange(count + 1, dtype=np.int64))
+
+
+def _same_sets(keys, targets, count):
+    """Per level: does the set of `keys` equal the set of `targets`? Both unique."""
+    sizes_match = np.bincount(keys >> _SHIFT, minlength=count) == np.bincount(targets >> _SHIFT, minlength=count)
+    strays = keys[~_member(keys, targets)]
+    return sizes_match & (np.bincount(strays >> _SHIFT, minlength=count) == 0)
+
+
+def _components(vertex_count, ia, ib):
+    """Min-label propagation with pointer jumping; returns a label per vertex."""
+    labels = np.arange(vertex_count, dtype=np.int64)
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, ia, labels[ib])
+        np.minimum.at(labels, ib, labels[ia])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def check_pack(pack):
+    """Run every check over the packed arrays.
+
+    Returns a dict of whole-pack arrays that render_issues() turns into
+    per-level messages.
+    """
+    count = pack.count
+    edges = pack.edges
+    node_level = _owner(pack.node_offsets)
+    edge_level = _owner(pack.edge_offsets)
+    start_level = _owner(pack.start_offsets)
+
+    node_keys = _sorted_unique((node_level << _SHIFT) | pack.node_ids)
+    edge_a = (edge_level << _SHIFT) | edges[:, 0]
+    edge_b = (edge_level << _SHIFT) | edges[:, 1]
+
+    # Vertices are the level's nodes plus any id that only shows up in an
+    # edge; those still carry degree and connectivity, as in validate_level.
+    vertex_keys = _sorted_unique(np.concatenate([node_keys, edge_a, edge_b]))
+    vertex_level = vertex_keys >> _SHIFT
+    is_real = _member(vertex_keys, node_keys)
+    ia = np.searchsorted(vertex_keys, edge_a)
+    ib = np.searchsorted(vertex_keys, edge_b)
+
+    # Canonical (level, min, max) codes; an edge is a duplicate when an
+    # earlier edge of the same level has the same code.
+    lo = np.minimum(edges[:, 0], edges[:, 1])
+    hi = np.maximum(edges[:, 0], edges[:, 1])
+    first_lo = pack.first_edges.min(axis=1)
+    first_hi = pack.first_edges.max(axis=1)
+    width = int(max(hi.max(initial=0), first_hi.max(initial=0))) + 1
+    if count * width * width >= 1 << 62:
+        raise ValueError("node ids too large to pack edge codes into int64")
+    edge_codes = (edge_level * width + lo) * width + hi
+    order = np.argsort(edge_codes, kind='stable')
+    repeat = np.zeros(len(edge_codes), bool)
+    repeat[order[1:]] = edge_codes[order[1:]] == edge_codes[order[:-1]]
+
+    degree = np.bincount(np.concatenate([ia, ib]), minlength=len(vertex_keys))
+    odd = (degree & 1).astype(bool) & is_real
+    odd_count = np.bincount(vertex_level[odd], minlength=count)
+    node_count = np.bincount(node_keys >> _SHIFT, minlength=count)
+
+    # Each level's root is its smallest real node id, i.e. the first real
+    # vertex of that level in key order.
+    labels = _components(len(vertex_keys), ia, ib)
+    real_index = np.flatnonzero(is_real)
+    first_real = np.zeros(count, np.int64)
+    first_real[vertex_level[real_index][::-1]] = real_index[::-1]
+    unreachable = is_real & (labels != labels[first_real][vertex_level])
+
+    start_keys = _sorted_unique((start_level << _SHIFT) | pack.valid_starts)
+    first_codes = (np.arange(count, dtype=np.int64) * width + first_lo) * width + first_hi
+
+    return {
+        'edge_level': edge_level,
+        'invalid_a': ~is_real[ia],
+        'invalid_b': ~is_real[ib],
+        'repeat': repeat,
+        'vertex_keys': vertex_keys,
+        'vertex_slices': _slices(vertex_level, count),
+        'degree': degree,
+        'odd': odd,
+        'odd_count': odd_count,
+        'node_keys': node_keys,
+        'node_slices': _slices(node_keys >> _SHIFT, count),
+        'node_count': node_count,
+        'unreachable': unreachable,
+        'start_keys': start_keys,
+        'start_slices': _slices(start_keys >> _SHIFT, count),
+        'circuit_ok': _same_sets(start_keys, node_keys, count),
+        'path_ok': _same_sets(start_keys, vertex_keys[odd], count),
+        'first_missing': pack.has_first_edge & ~_member(first_codes, _sorted_unique(edge_codes)),
+    }
+
+
+def render_issues(pack, checks):
+    """Turn check_pack() output into validate_level()-style issue lists.
+
+    Only the rows behind a failure are pulled back into Python.
+    """
+    issues = [[] for _ in range(pack.count)]
+    edge_level = checks['edge_level']
+    vertex_ids = checks['vertex_keys'] & _LOW
+    vertex_slices = checks['vertex_slices']
+    degree = checks['degree']
+    odd = checks['odd']
+    unreachable = checks['unreachable']
+
+    invalid_a = checks['invalid_a']
+    invalid_b = checks['invalid_b']
+    bad = np.flatnonzero(invalid_a | invalid_b)
+    for i, (a, b), bad_a, bad_b in zip(
+            edge_level[bad].tolist(), pack.edges[bad].tolist(),
+            invalid_a[bad].tolist(), invalid_b[bad].tolist()):
+        if bad_a:
+            issues[i].append(f"Edge ({a},{b}) references invalid node {a}")
+        if bad_b:
+            issues[i].append(f"Edge ({a},{b}) references invalid node {b}")
+
+    repeats = np.flatnonzero(checks['repeat'])
+    for i, (a, b) in zip(edge_level[repeats].tolist(), pack.edges[repeats].tolist()):
+        issues[i].append(f"Duplicate edge ({a},{b})")
+
+    def odd_ids(i):
+        lo, hi = vertex_slices[i], vertex_slices[i + 1]
+        return vertex_ids[lo:hi][odd[lo:hi]].tolist()
+
+    odd_count = checks['odd_count']
+    for i in np.flatnonzero((odd_count != 0) & (odd_count != 2)).tolist():
+        lo, hi = vertex_slices[i], vertex_slices[i + 1]
+        degrees = dict(zip(vertex_ids[lo:hi].tolist(), degree[lo:hi].tolist()))
+        issues[i].append(f"Has {int(odd_count[i])} odd-degree nodes (need 0 or 2): {odd_ids(i)}")
+        issues[i].append(f"  Degrees: {degrees}")
+
+    stranded = np.bincount(checks['vertex_keys'][unreachable] >> _SHIFT, minlength=pack.count)
+    for i in np.flatnonzero((checks['node_count'] > 0) & (stranded > 0)).tolist():
+        lo, hi = vertex_slices[i], vertex_slices[i + 1]
+        missing = vertex_ids[lo:hi][unreachable[lo:hi]].tolist()
+        issues[i].append(f"Not connected. Unreachable nodes: {missing}")
+
+    start_ids = checks['start_keys'] & _LOW
+    start_slices = checks['start_slices']
+    node_ids = checks['node_keys'] & _LOW
+    node_slices = checks['node_slices']
+    for i in np.flatnonzero((odd_count == 0) & ~checks['circuit_ok']).tolist():
+        starts = start_ids[start_slices[i]:start_slices[i + 1]].tolist()
+        nodes = node_ids[node_slices[i]:node_slices[i + 1]].tolist()
+        issues[i].append(f"Circuit but validStartNodeIds={starts} != all nodes {nodes}")
+    for i in np.flatnonzero((odd_count == 2) & ~checks['path_ok']).tolist():
+        starts = start_ids[start_slices[i]:start_slices[i + 1]].tolist()
+        issues[i].append(f"Path: odd nodes={odd_ids(i)} but validStartNodeIds={starts}")
+
+    for i in np.flatnonzero(checks['first_missing']).tolist():
+        a, b = pack.first_edges[i].tolist()
+        issues[i].append(f"firstEdge ({a},{b}) not found in edges")
+
+    return issues
+
+
+def validate_pack(levels):
+    """Issue lists for every level, identical to [validate_level(l) for l in levels]."""
+    pack = PackedLevels(levels)
+    return render_issues(pack, check_pack(pack))
@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""Benchmark the level tooling on synthetic Graph.kt-style packs.
+
+For each --sizes entry a deterministic pack is written (cycles with
+chords, 3 to 17 nodes and at most 37 edges, The Abyss being the largest
+level) and every case runs in a fresh forked child, so its time and peak
+RSS are its own:
+
+  split        parse_levels_split, the original parser
+  parse        validate_levels.parse_levels (streaming scanner)
+  validate     validate_level on every level
+  batch        batch_validate.validate_pack (numpy)
+  lfpack       validate_level_pack on a level_pack binary (numpy)
+  verify       generate_levels.verify_level on every level
+  solve        solve_levels.solve_level on every level
+  generate     generate_pack.generate for as many candidates
+
+Setup (parsing the input of a validator, writing the binary pack) is not
+timed but counts towards peak RSS. Engines that should agree are checked
+against each other: the two parsers on the levels, and validate, batch
+and lfpack on the issue lists.
+
+--json saves the results; --baseline compares them with saved ones and
+exits 1 when a case got slower (or bigger) than --tolerance allows.
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+
+from validate_levels import parse_levels, validate_level
+
+CASES = ('split', 'parse', 'validate', 'batch', 'lfpack', 'verify', 'solve', 'generate')
+# Engines whose results must match, by what they produce.
+AGREE = (('split', 'parse'), ('validate', 'batch', 'lfpack'))
+# Differences below this many seconds are noise, whatever the ratio.
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def parse_levels_split(filepath):
+    """The original split-and-search parser, kept as the benchmark baseline."""
+    with open(filepath) as f:
+        content = f.read()
+
+    levels = []
+    parts = content.split('Level(')
+
+    for part in parts[1:]:
+        id_match = re.search(r'id\s*=\s*(\d+)', part)
+        name_match = re.search(r'name\s*=\s*"([^"]+)"', part)
+        if not id_match or not name_match:
+            continue
+
+        nodes_section = re.search(r'nodes\s*=\s*listOf\(([\s\S]*?)\)\s*,\s*edges', part)
+        if not nodes_section:
+            continue
+        node_ids = [int(x) for x in re.findall(r'Node\(\s*(\d+)', nodes_section.group(1))]
+
+        edges_section = re.search(r'edges\s*=\s*listOf\(([\s\S]*?)\)\s*,\s*hint', part)
+        if not edges_section:
+            continue
+        edge_pairs = re.findall(r'Edge\(\s*(\d+)\s*,\s*(\d+)\s*\)', edges_section.group(1))
+
+        valid_starts_match = re.search(r'validStartNodeIds\s*=\s*listOf\(([\d\s,]+)\)', part)
+        first_edge_match = re.search(r'firstEdge\s*=\s*Pair\(\s*(\d+)\s*,\s*(\d+)\s*\)', part)
+
+        valid_starts = []
+        if valid_starts_match:
+            valid_starts = [int(x.strip()) for x in valid_starts_match.group(1).split(',') if x.strip()]
+
+        first_edge = None
+        if first_edge_match:
+            first_edge = (int(first_edge_match.group(1)), int(first_edge_match.group(2)))
+
+        levels.append({
+            'id': int(id_match.group(1)),
+            'name': name_match.group(1),
+            'nodes': node_ids,
+            'edges': [(int(a), int(b)) for a, b in edge_pairs],
+            'valid_starts': valid_starts,
+            'first_edge': first_edge,
+        })
+
+    return levels
+
+
+def synthetic_level(level_id, rng):
+    """An n-cycle with a few chords: 3 to 17 nodes and at most 37 edges,
+    the size of The Abyss.
+    """
+    n = rng.randint(3, 17)
+    edges = [(i, (i + 1) % n) for i in range(n)]
+    seen = {(min(a, b), max(a, b)) for a, b in edges}
+    for _ in range(rng.randint(0, min(2 * n, 37 - n))):
+        a, b = rng.sample(range(n), 2)
+        key = (min(a, b), max(a, b))
+        if key not in seen:
+            seen.add(key)
+            edges.append((a, b))
+
+    degree = [0] * n
+    for a, b in edges:
+        degree[a] += 1
+        degree[b] += 1
+    odd = [i for i in range(n) if degree[i] % 2]
+    positions = [
+        (0.5 + 0.42 * math.cos(2 * math.pi * i / n), 0.5 + 0.42 * math.sin(2 * math.pi * i / n))
+        for i in range(n)
+    ]
+    return {
+        'id': level_id,
+        'name': f"Synthetic {level_id}",
+        'nodes': list(range(n)),
+        'positions': positions,
+        'edges': edges,
+        'valid_starts': odd if odd else list(range(n)),
+        'first_edge': edges[0],
+    }
+
+
+def render_level(level):
+    node_lines = ",\n".join(
+        f"                Node({i}, Offset({x:.2f}f, {y:.2f}f))"
+        for i, (x, y) in zip(level['nodes'], level['positions'])
+    )
+    edge_lines = ",\n                ".join(
+        ", ".join(f"Edge({a}, {b})" for a, b in level['edges'][i:i + 4])
+        for i in range(0, len(level['edges']), 4)
+    )
+    starts = ", ".join(str(n) for n in level['valid_starts'])
+    a, b = level['first_edge']
+    return f"""        // Level {level['id']}: {level['name']} — {len(level['nodes'])} nodes, {len(level['edges'])} edges
+        Level(
+            id = {level['id']},
+            name = "{level['name']}",
+            nodes = listOf(
+{node_lines}
+            ),
+            edges = listOf(
+                {edge_lines}
+            ),
+            hints = LevelHints(
+                validStartNodeIds = listOf({starts}),
+                firstEdge = Pair({a}, {b}),
+                steps = listOf(
+                    HintStep(text = "Find the way around."),
+                    HintStep(text = "Start from a highlighted node.", showValidStarts = true, showFirstEdge = true)
+                )
+            )
+        )"""
+
+
+def write_synthetic_pack(filepath, count, seed=0):
+    """Write a Graph.kt-shaped file holding `count` synthetic levels."""
+    rng = random.Random(seed)
+    with open(filepath, 'w') as f:
+        f.write("package app.curious.lineflow\n\nobject LevelManager {\n    val levels = listOf(\n")
+        for level_id in range(1, count + 1):
+            if level_id > 1:
+                f.write(",\n\n")
+            f.write(render_level(synthetic_level(level_id, rng)))
+        f.write("\n    )\n}\n")
+
+
+def _digest(value):
+    return hashlib.sha256(repr(value).encode()).hexdigest()
+
+
+def _level_digest(levels):
+    for level in levels:
+        level.pop('span', None)
+        level.pop('lines', None)
+        level.pop('positions', None)
+        level.pop('steps', None)
+    return _digest(levels)
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def case_split(paths, count, seed):
+    elapsed, levels = _timed(parse_levels_split, paths['source'])
+    return elapsed, len(levels), _level_digest(levels)
+
+
+def case_parse(paths, count, seed):
+    elapsed, levels = _timed(parse_levels, paths['source'])
+    return elapsed, len(levels), _level_digest(levels)
+
+
+def case_validate(paths, count, seed):
+    levels = parse_levels(paths['source'])
+    elapsed, issues = _timed(lambda: [validate_level(level) for level in levels])
+    return elapsed, len(levels), _digest(issues)
+
+
+def case_batch(paths, count, seed):
+    from batch_validate import validate_pack
+
+    levels = parse_levels(paths['source'])
+    elapsed, issues = _timed(validate_pack, levels)
+    return elapsed, len(levels), _digest(issues)
+
+
+def case_lfpack(paths, count, seed):
+    from level_pack import LevelPack, validate_level_pack
+
+    def run():
+        with LevelPack(paths['pack']) as pack:
+            return validate_level_pack(pack)
+
+    elapsed, issues = _timed(run)
+    return elapsed, len(issues), _digest(issues)
+
+
+def case_verify(paths, count, seed):
+    # generate_levels verifies its own levels at import time.
+    with contextlib.redirect_stdout(io.StringIO()):
+        from generate_levels import verify_level
+
+    levels = parse_levels(paths['source'])
+    elapsed, results = _timed(lambda: [verify_level(level) for level in levels])
+    return elapsed, len(levels), _digest(results)
+
+
+def case_solve(paths, count, seed):
+    from solve_levels import solve_level
+
+    levels = parse_levels(paths['source'])
+    elapsed, solutions = _timed(lambda: [solve_level(level) for level in levels])
+    return elapsed, len(levels), _digest(solutions)
+
+
+def case_generate(paths, count, seed):
+    from generate_pack import generate
+
+    target = os.path.join(os.path.dirname(paths['source']), 'generated.jsonl')
+    try:
+        elapsed, written = _timed(generate, target, count, seed)
+    finally:
+        if os.path.exists(target):
+            os.remove(target)
+    return elapsed, count, str(written)
+
+
+def _write_binary_pack(paths, count, seed):
+    from level_pack import write_pack
+
+    elapsed, _ = _timed(write_pack, parse_levels(paths['source']), paths['pack'])
+    return elapsed, count, None
+
+
+def _run_case(case, args, conn):
+    try:
+        result = case(*args)
+    except Exception as e:
+        conn.send((None, f"{type(e).__name__}: {e}"))
+    else:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        conn.send((result + (peak_kb,), None))
+    conn.close()
+
+
+def run_isolated(case, *args):
+    """Run a case in a fresh child so its peak RSS is measured on its own;
+    returns (elapsed, levels, digest, peak_kb).
+    """
+    ctx = multiprocessing.get_context('fork')
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_run_case, args=(case, args, send))
+    proc.start()
+    result, error = recv.recv()
+    proc.join()
+    if error:
+        raise RuntimeError(f"{case.__name__}: {error}")
+    return result
+
+
+def bench_size(directory, count, seed, cases):
+    """Write a `count`-level pack under `directory` and run `cases` on it;
+    returns ({case: measurements}, errors).
+    """
+    paths = {
+        'source': os.path.join(directory, 'Graph.kt'),
+        'pack': os.path.join(directory, 'Graph.lfpack'),
+    }
+    write_synthetic_pack(paths['source'], count, seed)
+    size_mb = os.path.getsize(paths['source']) / 1e6
+    if 'lfpack' in cases:
+        run_isolated(_write_binary_pack, paths, count, seed)
+
+    results = {}
+    digests = {}
+    errors = []
+    for name in cases:
+        try:
+            elapsed, levels, digest, peak_kb = run_isolated(globals()[f"case_{name}"], paths, count, seed)
+        except RuntimeError as e:
+            errors.append(f"{count} levels: {e}")
+            continue
+        digests[name] = digest
+        results[name] = {
+            'seconds': round(elapsed, 4),
+            'levels': levels,
+            'levels_per_second': round(levels / elapsed, 1) if elapsed else None,
+            'peak_rss_mb': round(peak_kb / 1024, 1),
+        }
+    for group in AGREE:
+        ran = [name for name in group if name in digests]
+        if len({digests[name] for name in ran}) > 1:
+            errors.append(f"{count} levels: {', '.join(ran)} disagree")
+
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+
+    print(f"{count} levels, {size_mb:.1f} MB")
+    for name, r in results.items():
+        rate = f"{r['levels_per_second']:12.0f} levels/s" if r['levels_per_second'] else f"{'-':>12s} levels/s"
+        print(f"  {name + ':':10s}{r['seconds']:9.3f}s {rate}  peak RSS {r['peak_rss_mb']:7.1f} MB")
+    return results, errors
+
+
+def compare(results, baseline, tolerance):
+    """Messages for every case that got slower or bigger than the baseline
+    by more than `tolerance` (a fraction).
+    """
+    regressions = []
+    for size, cases in results.items():
+        for name, now in cases.items():
+            before = baseline.get('results', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            slower = now['seconds'] - before['seconds']
+            if now['seconds'] > before['seconds'] * (1 + tolerance) and slower > MIN_REGRESSION_SECONDS:
+                regressions.append(f"{size} levels {name}: {now['seconds']:.3f}s vs {before['seconds']:.3f}s "
+                                   f"(+{slower / before['seconds']:.0%})")
+            if now['peak_rss_mb'] > before['peak_rss_mb'] * (1 + tolerance):
+                regressions.append(f"{size} levels {name}: peak RSS {now['peak_rss_mb']:.1f} MB vs "
+                                   f"{before['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def _sizes(text):
+    return [int(size) for size in text.split(',')]
+
+
+def _cases(text):
+    names = text.split(',')
+    unknown = [name for name in names if name not in CASES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown case {', '.join(unknown)} (choose from {', '.join(CASES)})")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=_sizes, default=[1_000, 10_000, 100_000],
+                        help="comma-separated pack sizes (default 1000,10000,100000; 1000000 needs a few GB)")
+    parser.add_argument('--cases', type=_cases, default=list(CASES), help="comma-separated cases to run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="save the results here")
+    parser.add_argument('--baseline', metavar='PATH', help="compare with results saved by --json")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed slowdown or growth against the baseline (default 0.25)")
+    args = parser.parse_args()
+
+    results = {}
+    errors = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.sizes:
+            results[str(count)], size_errors = bench_size(tmp, count, args.seed, args.cases)
+            errors.extend(size_errors)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    for error in errors:
+        print(f"ERROR: {error}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('seed') != args.seed:
+            print(f"WARNING: baseline was run with seed {baseline.get('seed')}")
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+    return 1 if errors or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
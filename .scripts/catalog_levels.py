@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Catalog of per-level metrics with indexes for fast filter queries.
+
+The catalog keeps one row per level, in source order, in columnar arrays:
+
+  id, nodes, edges    level id, node and edge counts
+  odd                 odd-degree nodes
+  max_degree          largest node degree
+  deg0 .. deg8        nodes of each degree (deg8 counts 8 and above)
+  kind                circuit, path, or none (no Eulerian trail)
+  connected           1 if every node is in one component, else 0
+  bridges             edges whose removal disconnects the graph
+  min_x .. max_y      bounding box of the literal positions (NaN if none)
+
+Every column is indexed once, when the catalog is built. Columns with at
+most BITMAP_VALUES distinct values get a bitmap index (one bit per level
+for each value); the others get a sorted index (the rows in value order,
+next to the sorted values). A query is a list of inclusive ranges, an
+equality being a range of one value. The bitmap terms are ANDed into one
+bitmap, the most selective sorted term (found with two binary searches)
+gives the candidate rows, and the remaining terms are checked on just
+those rows, so a query costs about the size of its answer plus a few
+passes over the bitmaps, not a scan of every level.
+
+Building reads the levels (Kotlin source, .jsonl or .lfpack); -o saves
+the catalog, indexes included, as a .lfcat file (a NumPy .npz archive), and
+giving a .lfcat as filepath loads it instead of parsing anything:
+
+  catalog_levels.py levels.jsonl -o levels.lfcat
+  catalog_levels.py levels.lfcat -w kind=path -w nodes=10..12 -w max_degree<=6 -w bridges=0
+
+Requires numpy.
+"""
+import argparse
+import math
+import re
+import sys
+import time
+
+import numpy as np
+
+from analyze_levels import cut_structure
+from graph_core import LevelGraph
+from solve_levels import has_trail
+from validate_levels import iter_levels
+
+CATALOG_VERSION = 1
+HISTOGRAM_DEGREES = 9
+BITMAP_VALUES = 64
+KINDS = ('none', 'path', 'circuit')
+
+_INT_COLUMNS = (
+    'id', 'nodes', 'edges', 'odd', 'max_degree',
+    *(f'deg{d}' for d in range(HISTOGRAM_DEGREES)),
+    'kind', 'connected', 'bridges',
+)
+_FLOAT_COLUMNS = ('min_x', 'min_y', 'max_x', 'max_y')
+COLUMNS = _INT_COLUMNS + _FLOAT_COLUMNS
+_TERM = re.compile(r'^\s*([a-z_0-9]+)\s*(<=|>=|!?=|<|>)\s*(\S+?)(?:\.\.(\S+))?\s*$')
+
+
+def level_metrics(level):
+    """The catalog row for one level, as a tuple in COLUMNS order."""
+    graph = LevelGraph(level['nodes'], level['edges'])
+    degree = graph.degree[:graph.node_count]
+    histogram = [0] * HISTOGRAM_DEGREES
+    for d in degree:
+        histogram[min(d, HISTOGRAM_DEGREES - 1)] += 1
+    odd = len(graph.odd_nodes)
+    kind = 0
+    if has_trail(graph):
+        kind = 1 if odd else 2
+    bridges, _ = cut_structure(graph)
+
+    points = [p for p in level.get('positions') or () if p is not None]
+    if points:
+        xs = [x for x, _ in points]
+        ys = [y for _, y in points]
+        box = (min(xs), min(ys), max(xs), max(ys))
+    else:
+        box = (math.nan,) * 4
+    return (
+        level['id'], graph.node_count, len(level['edges']), odd, max(degree, default=0),
+        *histogram, kind, int(graph.is_connected), len(bridges), *box,
+    )
+
+
+def _names(names):
+    """(UTF-8 blob, offsets) for a list of strings."""
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+class LevelCatalog:
+    """Columns, names and indexes of a set of levels; see the module docstring."""
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.count = len(arrays['id'])
+        self.columns = {name: arrays[name] for name in COLUMNS}
+        self._name_blob = arrays['name_blob'].tobytes()
+        self._name_offsets = arrays['name_offsets']
+
+    @classmethod
+    def build(cls, levels):
+        rows = []
+        names = []
+        for level in levels:
+            rows.append(level_metrics(level))
+            names.append(level['name'])
+        arrays = {}
+        for k, name in enumerate(COLUMNS):
+            dtype = np.float64 if name in _FLOAT_COLUMNS else np.int64 if name == 'id' else np.int32
+            arrays[name] = np.fromiter((row[k] for row in rows), dtype=dtype, count=len(rows))
+        arrays['name_blob'], arrays['name_offsets'] = _names(names)
+        arrays['version'] = np.array([CATALOG_VERSION])
+        for name in COLUMNS:
+            arrays.update(cls._index(name, arrays[name]))
+        return cls(arrays)
+
+    @staticmethod
+    def _index(name, column):
+        values = np.unique(column)
+        if 0 < len(values) <= BITMAP_VALUES and name != 'id' and not np.isnan(values).any():
+            # One packed row of bits per distinct value.
+            return {
+                f'bitmap_values/{name}': values,
+                f'bitmap/{name}': np.stack([np.packbits(column == value) for value in values]),
+            }
+        order = np.argsort(column, kind='stable').astype(np.int32)
+        return {f'order/{name}': order, f'sorted/{name}': column[order]}
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath, allow_pickle=False) as archive:
+            arrays = {key: archive[key] for key in archive.files}
+        version = int(arrays['version'][0]) if 'version' in arrays else None
+        if version != CATALOG_VERSION:
+            raise ValueError(f"{filepath}: catalog version {version}, expected {CATALOG_VERSION}")
+        return cls(arrays)
+
+    def save(self, filepath):
+        # A file object, so np.savez does not append .npz to the name.
+        with open(filepath, 'wb') as f:
+            np.savez(f, **self.arrays)
+
+    def __len__(self):
+        return self.count
+
+    def name(self, row):
+        lo, hi = self._name_offsets[row], self._name_offsets[row + 1]
+        return self._name_blob[lo:hi].decode('utf-8')
+
+    def row(self, row):
+        """{column: value} for one row, plus its name."""
+        record = {name: column[row].item() for name, column in self.columns.items()}
+        record['kind'] = KINDS[record['kind']]
+        record['name'] = self.name(row)
+        return record
+
+    def _bitmap(self, field, lo, hi):
+        """Packed bits of the rows with lo <= field <= hi."""
+        values = self.arrays[f'bitmap_values/{field}']
+        a = np.searchsorted(values, lo, 'left')
+        b = np.searchsorted(values, hi, 'right')
+        if b - a == 1:
+            return self.arrays[f'bitmap/{field}'][a]
+        if a == b:
+            return np.zeros((self.count + 7) // 8, dtype=np.uint8)
+        return np.bitwise_or.reduce(self.arrays[f'bitmap/{field}'][a:b], axis=0)
+
+    def _sorted_range(self, field, lo, hi):
+        values = self.arrays[f'sorted/{field}']
+        return np.searchsorted(values, lo, 'left'), np.searchsorted(values, hi, 'right')
+
+    def query(self, terms):
+        """Row numbers, in source order, of the levels matching every
+        (field, lo, hi) term (inclusive bounds).
+        """
+        for field, _, _ in terms:
+            if field not in self.columns:
+                raise ValueError(f"unknown field {field!r}")
+        bitmap = None
+        ranged = []
+        for field, lo, hi in terms:
+            if f'bitmap/{field}' in self.arrays:
+                bits = self._bitmap(field, lo, hi)
+                bitmap = bits if bitmap is None else bitmap & bits
+            else:
+                a, b = self._sorted_range(field, lo, hi)
+                ranged.append((b - a, field, lo, hi, a, b))
+
+        if ranged:
+            ranged.sort(key=lambda term: term[0])
+            _, field, _, _, a, b = ranged[0]
+            rows = np.sort(self.arrays[f'order/{field}'][a:b])
+            if bitmap is not None:
+                rows = rows[((bitmap[rows >> 3] >> (7 - (rows & 7)).astype(np.uint8)) & 1).astype(bool)]
+            for _, field, lo, hi, _, _ in ranged[1:]:
+                values = self.columns[field][rows]
+                rows = rows[(values >= lo) & (values <= hi)]
+            return rows
+        if bitmap is None:
+            return np.arange(self.count)
+        return np.flatnonzero(np.unpackbits(bitmap, count=self.count))
+
+
+def _value(field, text):
+    if field == 'kind':
+        if text not in KINDS:
+            raise ValueError(f"kind is one of {', '.join(KINDS)}")
+        return KINDS.index(text)
+    if field == 'connected' and text in ('yes', 'no', 'true', 'false'):
+        return int(text in ('yes', 'true'))
+    try:
+        return float(text) if field in _FLOAT_COLUMNS else int(text)
+    except ValueError:
+        raise ValueError(f"bad value {text!r} for {field}") from None
+
+
+def parse_term(text):
+    """(field, lo, hi) from 'field=v', 'field=lo..hi', 'field<=v', 'field<v',
+    'field>=v' or 'field>v'. Strict bounds are tightened for integer fields.
+    """
+    m = _TERM.match(text)
+    if not m or m.group(2) == '!=' or (m.group(4) is not None and m.group(2) != '='):
+        raise ValueError(f"cannot parse {text!r}")
+    field, op, first, second = m.groups()
+    if field not in COLUMNS:
+        raise ValueError(f"unknown field {field!r}; fields are {', '.join(COLUMNS)}")
+    value = _value(field, first)
+    step = 0 if field in _FLOAT_COLUMNS else 1
+    if op == '=':
+        return field, value, _value(field, second) if second is not None else value
+    if op == '<=':
+        return field, -math.inf, value
+    if op == '>=':
+        return field, value, math.inf
+    if op == '<':
+        return field, -math.inf, np.nextafter(value, -math.inf) if not step else value - step
+    return field, np.nextafter(value, math.inf) if not step else value + step, math.inf
+
+
+def describe(record):
+    return (f"Level {record['id']} ({record['name']}) - {record['nodes']} nodes, {record['edges']} edges, "
+            f"{record['kind']}, {record['odd']} odd, max degree {record['max_degree']}, "
+            f"{record['bridges']} bridges")
+
+
+def _term(text):
+    try:
+        return parse_term(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+        help="levels to catalog, or a saved .lfcat",
+    )
+    parser.add_argument('-o', '--output', metavar='PATH', help="save the catalog here")
+    parser.add_argument('-w', '--where', type=_term, action='append', default=[], metavar='TERM',
+                        help="filter such as nodes=10..12, kind=path or max_degree<=6 (repeatable)")
+    parser.add_argument('--count', action='store_true', help="only print how many levels match")
+    parser.add_argument('--limit', type=int, metavar='N', help="print at most N matching levels")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.filepath.endswith('.lfcat'):
+        try:
+            catalog = LevelCatalog.load(args.filepath)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        how = 'loaded'
+    else:
+        catalog = LevelCatalog.build(iter_levels(args.filepath))
+        how = 'built'
+    print(f"Catalog of {len(catalog)} levels {how} in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+    if args.output:
+        catalog.save(args.output)
+        print(f"Saved to {args.output}", file=sys.stderr)
+        if not args.where:
+            return 0
+
+    started = time.perf_counter()
+    rows = catalog.query(args.where)
+    elapsed = time.perf_counter() - started
+    if not args.count:
+        for row in rows[:args.limit]:
+            print(describe(catalog.row(row)))
+    print(f"\nTotal: {len(rows)} of {len(catalog)} levels match ({elapsed * 1000:.2f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""Find isomorphic and near-duplicate levels across one or more packs.
+
+Every level is reduced to its edge structure (names, layout and node
+numbering are ignored) and bucketed by a Weisfeiler-Lehman hash. A level
+landing in an occupied bucket is checked exactly against each class
+already there, so a hash collision can never merge two different graphs.
+Only one representative per class is kept in memory, and each level costs
+one refinement plus, almost always, a single verification: the whole
+pass is near-linear in the number of levels rather than pairwise.
+
+With --near, each class representative is also indexed under the hashes
+of its one-edge-deleted subgraphs next to its own hash. Two classes that
+meet in such a bucket are one edge apart (one is the other plus an edge,
+or both become the same graph after dropping one edge each); that is
+verified exactly too, and verified pairs are merged into groups.
+
+Inputs are Kotlin sources or .jsonl packs from generate_pack.py.
+"""
+import argparse
+import os
+import sys
+
+from graph_core import LevelGraph
+from isomorphism import adjacency_lists, find_mapping, refine, wl_hash
+from validate_levels import iter_levels
+
+
+class IsomorphismIndex:
+    """WL-hash buckets of verified isomorphism classes.
+
+    classes[k] = (label, nodes, edges, members) for class k, where label
+    names the first level seen with that structure and members lists the
+    labels of the levels that duplicate it. The representative's colours
+    are kept too, so a verification only has to rebuild its graph.
+    """
+
+    __slots__ = ('buckets', 'classes', '_colors')
+
+    def __init__(self):
+        self.buckets = {}
+        self.classes = []
+        self._colors = []
+
+    def add(self, label, nodes, edges):
+        """Index a level; returns its class number."""
+        graph = LevelGraph(nodes, edges)
+        colors = refine(graph)
+        key = wl_hash(colors, len(edges))
+        bucket = self.buckets.setdefault(key, [])
+        for k in bucket:
+            _, rep_nodes, rep_edges, members = self.classes[k]
+            rep = LevelGraph(rep_nodes, rep_edges)
+            if find_mapping(graph, rep, colors, self._colors[k]) is not None:
+                members.append(label)
+                return k
+        self.classes.append((label, nodes, edges, []))
+        self._colors.append(colors)
+        bucket.append(len(self.classes) - 1)
+        return len(self.classes) - 1
+
+    def duplicates(self):
+        """(representative label, [duplicate labels]) for every repeated class."""
+        return [(label, members) for label, _, _, members in self.classes if members]
+
+
+def _without(edges, e):
+    return edges[:e] + edges[e + 1:]
+
+
+def near_duplicate_groups(index):
+    """Groups of class numbers whose graphs are one edge apart."""
+    classes = index.classes
+    parent = list(range(len(classes)))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    # Entries are (class, dropped edge index or -1 for the graph itself).
+    buckets = {}
+    for k, (_, nodes, edges, _) in enumerate(classes):
+        graph = LevelGraph(nodes, edges)
+        adjacency = adjacency_lists(graph)
+        buckets.setdefault(wl_hash(refine(graph, adjacency), len(edges)), []).append((k, -1))
+        index_of = graph.index
+        seen = set()
+        for e, (a, b) in enumerate(edges):
+            ia = index_of[a]
+            ib = index_of[b]
+            trimmed = list(adjacency)
+            trimmed[ia] = list(trimmed[ia])
+            trimmed[ia].remove(ib)
+            trimmed[ib] = list(trimmed[ib])
+            trimmed[ib].remove(ia)
+            key = wl_hash(refine(graph, trimmed), len(edges) - 1)
+            if key not in seen:
+                seen.add(key)
+                buckets.setdefault(key, []).append((k, e))
+
+    def materialize(entry):
+        k, e = entry
+        _, nodes, edges, _ = classes[k]
+        graph = LevelGraph(nodes, edges if e < 0 else _without(edges, e))
+        return graph, refine(graph)
+
+    for entries in buckets.values():
+        if len(entries) < 2 or len({k for k, _ in entries}) < 2:
+            continue
+        # Two whole graphs sharing a bucket are distinct classes, not one
+        # edge apart; every other pairing is a candidate.
+        anchors = []
+        for entry in entries:
+            graph, colors = materialize(entry)
+            for anchor, anchor_graph, anchor_colors in anchors:
+                if anchor[0] == entry[0] or (anchor[1] < 0 and entry[1] < 0):
+                    continue
+                if find_mapping(graph, anchor_graph, colors, anchor_colors) is not None:
+                    parent[find(entry[0])] = find(anchor[0])
+                    break
+            else:
+                anchors.append((entry, graph, colors))
+
+    groups = {}
+    for k in range(len(classes)):
+        groups.setdefault(find(k), []).append(k)
+    return [members for members in groups.values() if len(members) > 1]
+
+
+def _shown(labels, limit=10):
+    text = ', '.join(labels[:limit])
+    if len(labels) > limit:
+        text += f", ... (+{len(labels) - limit} more)"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('packs', nargs='+', help="Graph.kt-style sources or .jsonl packs")
+    parser.add_argument('--near', action='store_true', help="also report levels one edge apart")
+    args = parser.parse_args()
+
+    index = IsomorphismIndex()
+    count = 0
+    for filepath in args.packs:
+        pack = os.path.basename(filepath)
+        for level in iter_levels(filepath):
+            count += 1
+            index.add(f"{pack}:{level['id']} ({level['name']})", level['nodes'], level['edges'])
+
+    duplicates = index.duplicates()
+    print("Isomorphic duplicates:")
+    for label, members in duplicates:
+        print(f"  {label} == {_shown(members)}")
+    if not duplicates:
+        print("  none")
+
+    groups = []
+    if args.near:
+        groups = near_duplicate_groups(index)
+        print("\nNear duplicates (one edge apart):")
+        for members in groups:
+            print(f"  {_shown([index.classes[k][0] for k in members])}")
+        if not groups:
+            print("  none")
+
+    repeated = sum(len(members) for _, members in duplicates)
+    summary = f"\nTotal: {count} levels, {len(index.classes)} distinct graphs, {repeated} isomorphic duplicates"
+    if args.near:
+        summary += f", {len(groups)} near-duplicate groups"
+    print(summary)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Score how hard each level in Graph.kt is to draw.
+
+A position is (current node, set of drawn edges). From a position a move is
+either good (some complete trail still exists afterwards) or a dead end.
+By Fleury's rule a move is good exactly when its edge is not a bridge of
+the undrawn edges, or is the last undrawn edge at the current node, so
+dead ends are recognised without exploring below them. For each level the
+engine reports, summed over the valid starts:
+
+  trails     complete trails
+  dead_ends  dead-end moves offered along all good move sequences
+  p          chance that a player picking a valid start and then each
+             undrawn edge uniformly at random finishes the level
+
+and scores the level as -log2(p), the coin flips of luck a random scribbler
+needs.
+
+Small levels are solved exactly by DP over (node, edge bitmask), memoized
+across starts since the same position is reached in many orders. Starts
+that an automorphism of the level maps onto each other have identical
+numbers, so only one start per orbit is searched. Levels above
+--exact-edges edges, or whose DP would outgrow --max-states positions, are
+estimated from random good-move walks with Knuth's estimator, which is
+unbiased for all three numbers. Which way a level goes is decided up front
+from a few walks that estimate the DP's size (see estimate_states), so a
+large level never pays for an exact search it then abandons.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+
+from graph_core import LevelGraph
+from isomorphism import find_mapping, refine
+from solve_levels import has_trail, trail_starts
+from validate_levels import iter_levels
+
+
+# Walks shared out between the starts to estimate the DP's size.
+ESTIMATE_WALKS = 32
+
+
+class _TooManyStates(Exception):
+    pass
+
+
+class _Positions:
+    """Move generation over edge bitmasks for one level."""
+
+    __slots__ = ('adjacency', 'full')
+
+    def __init__(self, graph):
+        offsets, neighbors, edge_ids = graph.incidence()
+        self.adjacency = [
+            [(1 << edge_ids[slot], neighbors[slot]) for slot in range(offsets[v], offsets[v + 1])]
+            for v in range(len(graph.node_ids))
+        ]
+        self.full = (1 << len(graph.edges)) - 1
+
+    def _reaches(self, src, dst, drawn):
+        """Can `src` reach `dst` over edges not in `drawn`?"""
+        adjacency = self.adjacency
+        seen = 1 << src
+        frontier = [src]
+        while frontier:
+            v = frontier.pop()
+            for bit, w in adjacency[v]:
+                if not drawn & bit and not seen >> w & 1:
+                    if w == dst:
+                        return True
+                    seen |= 1 << w
+                    frontier.append(w)
+        return False
+
+    def moves(self, v, drawn):
+        """(good moves as (bit, w), dead-end move count) at a position that
+        can still be completed.
+        """
+        open_moves = [(bit, w) for bit, w in self.adjacency[v] if not drawn & bit]
+        if len(open_moves) == 1:
+            return open_moves, 0
+        # A loop never disconnects anything; any other edge is safe iff its
+        # far end still reaches v without it.
+        good = [(bit, w) for bit, w in open_moves if w == v or self._reaches(w, v, drawn | bit)]
+        return good, len(open_moves) - len(good)
+
+    def _joined(self, s, drawn):
+        """Do the edges in `drawn` form one piece that touches `s`?"""
+        adjacency = self.adjacency
+        reached = 0
+        seen = 1 << s
+        frontier = [s]
+        while frontier:
+            v = frontier.pop()
+            for bit, w in adjacency[v]:
+                if drawn & bit:
+                    reached |= bit
+                    if not seen >> w & 1:
+                        seen |= 1 << w
+                        frontier.append(w)
+        return reached == drawn
+
+    def ways_in(self, s, v, drawn):
+        """How many positions reached from `s` lead to (v, drawn) by one move.
+
+        Only positions on a complete trail are ever reached, so (u, drawn
+        without e) is one exactly when those edges are still a trail from s
+        to u; the parity of such a trail always works out, which leaves
+        connectivity to check.
+        """
+        count = 0
+        for bit, u in self.adjacency[v]:
+            if drawn & bit:
+                rest = drawn & ~bit
+                if (self._joined(s, rest) if rest else u == s):
+                    count += 1
+        return count
+
+
+def start_orbits(graph, starts):
+    """Group `starts` (vertex indices) into automorphism orbits."""
+    colors = refine(graph)
+    orbits = []
+    for s in starts:
+        for orbit in orbits:
+            if colors[orbit[0]] == colors[s] and find_mapping(graph, graph, colors, colors, (orbit[0], s)) is not None:
+                orbit.append(s)
+                break
+        else:
+            orbits.append([s])
+    return orbits
+
+
+def estimate_states(graph, representatives, walks, rng):
+    """Rough number of positions exact_counts() would memoize, from `walks`
+    random good-move walks shared out between the starts.
+
+    Along a walk, the positions one move deeper are estimated as those at
+    its current depth times the moves out of its position, divided by the
+    moves into the next one.
+    """
+    positions = _Positions(graph)
+    full = positions.full
+    walks = -(-walks // len(representatives))
+    total = 0.0
+    for s in representatives:
+        for _ in range(walks):
+            v = s
+            drawn = 0
+            width = 1.0
+            total += 1.0 / walks
+            while drawn != full:
+                good, _ = positions.moves(v, drawn)
+                bit, v = good[rng.randrange(len(good))]
+                drawn |= bit
+                width *= len(good) / positions.ways_in(s, v, drawn)
+                total += width / walks
+    return total
+
+
+def exact_counts(graph, representatives, max_states):
+    """{start: (trails, dead_ends, p)} by memoized search over positions."""
+    positions = _Positions(graph)
+    full = positions.full
+    n = len(graph.node_ids)
+    memo = {}
+
+    def explore(v, drawn):
+        key = drawn * n + v
+        found = memo.get(key)
+        if found is not None:
+            return found
+        if drawn == full:
+            found = (1, 0, 1.0)
+        else:
+            good, wrong = positions.moves(v, drawn)
+            trails = 0
+            dead = wrong
+            total = 0.0
+            for bit, w in good:
+                t, d, p = explore(w, drawn | bit)
+                trails += t
+                dead += d
+                total += p
+            found = (trails, dead, total / (len(good) + wrong))
+        memo[key] = found
+        if len(memo) > max_states:
+            raise _TooManyStates
+        return found
+
+    return {s: explore(s, 0) for s in representatives}
+
+
+def sampled_counts(graph, representatives, samples, rng):
+    """{start: (trails, dead_ends, p)} estimated from `samples` walks shared
+    out between the starts.
+    """
+    positions = _Positions(graph)
+    full = positions.full
+    results = {}
+    samples = -(-samples // len(representatives))
+    for s in representatives:
+        trails = 0.0
+        dead = 0.0
+        chance = 0.0
+        for _ in range(samples):
+            v = s
+            drawn = 0
+            weight = 1.0
+            p = 1.0
+            while drawn != full:
+                good, wrong = positions.moves(v, drawn)
+                dead += weight * wrong
+                p *= len(good) / (len(good) + wrong)
+                weight *= len(good)
+                bit, v = good[rng.randrange(len(good))]
+                drawn |= bit
+            trails += weight
+            chance += p
+        results[s] = (trails / samples, dead / samples, chance / samples)
+    return results
+
+
+def score_level(level, exact_edges=40, max_states=200_000, samples=2000, seed=0):
+    """Difficulty summary for one level; 'score' is None when it has no trail."""
+    graph = LevelGraph(level['nodes'], level['edges'])
+    summary = {'id': level['id'], 'name': level['name'], 'edges': len(level['edges'])}
+    if not has_trail(graph):
+        summary.update(method=None, starts=0, trails=0, dead_ends=0, p=0.0, score=None)
+        return summary
+
+    degree = graph.degree
+    starts = [s for s in trail_starts(graph) if degree[s]] or list(trail_starts(graph))
+    orbits = start_orbits(graph, starts)
+    representatives = [orbit[0] for orbit in orbits]
+
+    results = None
+    seed = seed * 1_000_003 + level['id']
+    if len(level['edges']) <= exact_edges and (
+            len(graph.node_ids) << len(level['edges']) <= max_states
+            or estimate_states(graph, representatives, ESTIMATE_WALKS, random.Random(seed)) <= max_states):
+        try:
+            results = exact_counts(graph, representatives, max_states)
+            method = 'exact'
+        except _TooManyStates:
+            pass
+    if results is None:
+        results = sampled_counts(graph, representatives, samples, random.Random(seed))
+        method = 'sampled'
+
+    trails = sum(results[orbit[0]][0] * len(orbit) for orbit in orbits)
+    dead = sum(results[orbit[0]][1] * len(orbit) for orbit in orbits)
+    p = sum(results[orbit[0]][2] * len(orbit) for orbit in orbits) / len(starts)
+    summary.update(
+        method=method,
+        starts=len(starts),
+        trails=trails if method == 'exact' else round(trails),
+        dead_ends=dead if method == 'exact' else round(dead),
+        p=p,
+        score=round(0.0 - math.log2(p), 2) if p > 0 else None,
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--exact-edges', type=int, default=40, metavar='N',
+                        help="sample instead of searching exactly above N edges")
+    parser.add_argument('--max-states', type=int, default=200_000, metavar='N',
+                        help="sample instead of searching exactly when that would memoize over N positions")
+    parser.add_argument('--samples', type=int, default=2000, metavar='N', help="random walks per level when sampling")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help="print one JSON object per level")
+    args = parser.parse_args()
+
+    for level in iter_levels(args.filepath):
+        summary = score_level(level, args.exact_edges, args.max_states, args.samples, args.seed)
+        if args.json:
+            print(json.dumps(summary))
+        elif summary['score'] is None:
+            print(f"Level {level['id']} ({level['name']}) - no trail, not scored")
+        else:
+            print(
+                f"Level {level['id']} ({level['name']}) - score {summary['score']:.2f} ({summary['method']}): "
+                f"{summary['starts']} starts, {summary['trails']} trails, {summary['dead_ends']} dead ends, "
+                f"p={summary['p']:.3g}"
+            )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
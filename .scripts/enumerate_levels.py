@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Enumerate every connected level graph with 0 or 2 odd nodes, once each.
+
+Graphs are grown one vertex at a time by canonical augmentation (McKay's
+method, as in nauty's geng): a graph on k vertices gets children by adding
+a vertex joined to a non-empty subset of them. A child H is kept only when
+its new vertex could be the one H itself would choose to delete: a vertex
+of minimum degree among those whose removal leaves H connected, ties
+broken by the canonical labelling (isomorphism.canonical_labelling). As
+every connected graph has exactly one such parent class and isomorphic
+siblings are dropped by certificate, each isomorphism class comes out
+exactly once, without keeping a global seen-set.
+
+Branches are cut as they are generated. A graph with m edges and o odd
+nodes still needs one edge per vertex to come, and one edge into each of
+all but two of its odd nodes (every node added afterwards can only touch
+the old ones through its own edges), so it is dropped when
+m + max(vertices to come, o - 2) is over the edge budget. --circuit
+allows no odd nodes.
+
+--jobs splits the tree between processes at SPLIT_NODES vertices: every
+worker builds the small top of the tree and keeps every mod-th graph of
+that size (with --part RES/MOD a single run takes one share, to spread
+the work over machines).
+
+-o writes the graphs as a binary stream: a header (magic b'LFGS', uint16
+version, uint16 0), then per graph uint8 node count, uint8 edge count and
+the upper triangle of its canonical adjacency matrix as little-endian bits
+(graph6 order: (0,1), (0,2), (1,2), (0,3), ...), so a record's size
+depends on its node count alone. Next to it PATH.idx holds (magic b'LFGI',
+uint16 version, uint16 0, uint32 stride, uint64 count) and the byte offset
+of every stride-th record; GraphStream reads a graph by number through it.
+--read lists a stream.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from isomorphism import canonical_labelling
+
+STREAM_MAGIC = b'LFGS'
+INDEX_MAGIC = b'LFGI'
+STREAM_VERSION = 1
+INDEX_STRIDE = 1024
+SPLIT_NODES = 6
+MAX_NODES = 16
+
+_STREAM_HEADER = struct.Struct('<4sHH')
+_INDEX_HEADER = struct.Struct('<4sHHIQ')
+
+
+def _connected_without(adjacency, v):
+    """True if removing vertex v leaves the rest of the graph connected."""
+    everyone = ((1 << len(adjacency)) - 1) & ~(1 << v)
+    if not everyone:
+        return True
+    start = everyone & -everyone
+    reached = start
+    frontier = start
+    while frontier:
+        low = frontier & -frontier
+        frontier ^= low
+        fresh = adjacency[low.bit_length() - 1] & everyone & ~reached
+        reached |= fresh
+        frontier |= fresh
+    return reached == everyone
+
+
+def _without(adjacency, v):
+    """The graph with vertex v removed, higher vertices moved down by one."""
+    low = (1 << v) - 1
+    return [(mask & low) | ((mask >> 1) & ~low) for u, mask in enumerate(adjacency) if u != v]
+
+
+class _Limits:
+    def __init__(self, max_nodes, min_nodes, max_edges, min_edges, max_odd):
+        self.max_nodes = max_nodes
+        self.min_nodes = min_nodes
+        self.max_edges = max_edges
+        self.min_edges = min_edges
+        self.max_odd = max_odd
+
+    def wanted(self, k, m, odd):
+        """(emit, expand) for a connected graph on k vertices."""
+        emit = k >= self.min_nodes and odd <= self.max_odd and m >= self.min_edges
+        expand = k < self.max_nodes and m + max(self.min_nodes - k, 1, odd - self.max_odd) <= self.max_edges
+        return emit, expand
+
+
+def _children(adjacency, edge_count, certificate, limits):
+    """(certificate, edge count, odd count, emit, expand) of every accepted
+    child of the graph with canonical adjacency masks `adjacency`.
+    """
+    k = len(adjacency)
+    degree = [mask.bit_count() for mask in adjacency]
+    seen = set()
+    for s in range(1, min(k, limits.max_edges - edge_count) + 1):
+        for subset in combinations(range(k), s):
+            child = list(adjacency)
+            new = 0
+            for u in subset:
+                child[u] |= 1 << k
+                new |= 1 << u
+            child.append(new)
+            child_degree = degree[:]
+            for u in subset:
+                child_degree[u] += 1
+            odd = sum(d & 1 for d in child_degree) + (s & 1)
+            emit, expand = limits.wanted(k + 1, edge_count + s, odd)
+            if not (emit or expand):
+                continue
+
+            # The new vertex must have the smallest degree among the
+            # vertices whose removal keeps the graph connected.
+            ties = [k]
+            rejected = False
+            for u in range(k):
+                d = child_degree[u]
+                if d > s:
+                    continue
+                if d == 1 or _connected_without(child, u):
+                    if d < s:
+                        rejected = True
+                        break
+                    ties.append(u)
+            if rejected:
+                continue
+
+            child_certificate, order = canonical_labelling(child)
+            if child_certificate in seen:
+                continue
+            seen.add(child_certificate)
+            if len(ties) > 1:
+                position = {v: i for i, v in enumerate(order)}
+                chosen = max(ties, key=position.__getitem__)
+                if chosen != k and canonical_labelling(_without(child, chosen))[0] != certificate:
+                    continue
+            yield child_certificate, edge_count + s, odd, emit, expand
+
+
+def enumerate_graphs(limits, part=(0, 1)):
+    """Yield (certificate, edge count, odd count) of every wanted graph in
+    share `part` = (res, mod); a certificate is the tuple of canonical
+    adjacency masks.
+    """
+    res, mod = part
+    split = min(SPLIT_NODES, limits.max_nodes) if mod > 1 else None
+    counter = 0
+
+    def grow(certificate, edge_count):
+        nonlocal counter
+        k = len(certificate)
+        for child, edges, odd, emit, expand in _children(list(certificate), edge_count, certificate, limits):
+            if k + 1 == split:
+                counter += 1
+                if (counter - 1) % mod != res:
+                    continue
+            if emit and (split is None or k + 1 >= split or res == 0):
+                yield child, edges, odd
+            if expand:
+                yield from grow(child, edges)
+
+    root = (0,)
+    emit, expand = limits.wanted(1, 0, 0)
+    if emit and res == 0:
+        yield root, 0, 0
+    if expand:
+        yield from grow(root, 0)
+
+
+def encode_graph(certificate, edge_count):
+    n = len(certificate)
+    bits = 0
+    bit = 0
+    for j in range(1, n):
+        row = certificate[j]
+        for i in range(j):
+            if row >> i & 1:
+                bits |= 1 << bit
+            bit += 1
+    return bytes((n, edge_count)) + bits.to_bytes(_matrix_bytes(n), 'little')
+
+
+def _matrix_bytes(n):
+    return (n * (n - 1) // 2 + 7) // 8
+
+
+def decode_edges(n, data):
+    """Edge list (i, j), i < j, from a record's adjacency bytes."""
+    bits = int.from_bytes(data, 'little')
+    edges = []
+    bit = 0
+    for j in range(1, n):
+        for i in range(j):
+            if bits >> bit & 1:
+                edges.append((i, j))
+            bit += 1
+    return edges
+
+
+def write_index(filepath, offsets, count):
+    with open(filepath + '.idx', 'wb') as f:
+        f.write(_INDEX_HEADER.pack(INDEX_MAGIC, STREAM_VERSION, 0, INDEX_STRIDE, count))
+        f.write(struct.pack(f'<{len(offsets)}Q', *offsets))
+
+
+def index_stream(filepath):
+    """Scan a stream and write its index; returns the number of graphs."""
+    offsets = []
+    count = 0
+    with open(filepath, 'rb') as f:
+        header = f.read(_STREAM_HEADER.size)
+        magic, version, _ = _STREAM_HEADER.unpack(header)
+        if magic != STREAM_MAGIC or version != STREAM_VERSION:
+            raise ValueError(f"{filepath}: not a version {STREAM_VERSION} graph stream")
+        offset = _STREAM_HEADER.size
+        while True:
+            head = f.read(2)
+            if len(head) < 2:
+                break
+            if count % INDEX_STRIDE == 0:
+                offsets.append(offset)
+            size = _matrix_bytes(head[0])
+            f.seek(size, os.SEEK_CUR)
+            offset += 2 + size
+            count += 1
+    write_index(filepath, offsets, count)
+    return count
+
+
+class GraphStream:
+    """A graph stream and its index: len(), indexing and iteration give
+    (node count, edge list) tuples.
+    """
+
+    def __init__(self, filepath):
+        with open(filepath, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < _STREAM_HEADER.size or _STREAM_HEADER.unpack_from(self.data)[:2] != (
+                STREAM_MAGIC, STREAM_VERSION):
+            self.data.close()
+            raise ValueError(f"{filepath}: not a version {STREAM_VERSION} graph stream")
+        with open(filepath + '.idx', 'rb') as f:
+            index = f.read()
+        magic, version, _, self.stride, self.count = _INDEX_HEADER.unpack_from(index)
+        if magic != INDEX_MAGIC or version != STREAM_VERSION:
+            raise ValueError(f"{filepath}.idx: not a version {STREAM_VERSION} graph stream index")
+        checkpoints = -(-self.count // self.stride)
+        self.offsets = struct.unpack_from(f'<{checkpoints}Q', index, _INDEX_HEADER.size)
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, offset):
+        n = self.data[offset]
+        end = offset + 2 + _matrix_bytes(n)
+        return (n, decode_edges(n, self.data[offset + 2:end])), end
+
+    def close(self):
+        self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _offset(self, k):
+        offset = self.offsets[k // self.stride]
+        for _ in range(k % self.stride):
+            offset += 2 + _matrix_bytes(self.data[offset])
+        return offset
+
+    def __getitem__(self, k):
+        if not 0 <= k < self.count:
+            raise IndexError(k)
+        return self._record(self._offset(k))[0]
+
+    def __iter__(self):
+        return self.read(0)
+
+    def read(self, start, stop=None):
+        """Graphs start .. stop - 1, seeking through the index once."""
+        stop = self.count if stop is None else min(stop, self.count)
+        if start >= stop:
+            return
+        offset = self._offset(start)
+        for _ in range(start, stop):
+            graph, offset = self._record(offset)
+            yield graph
+
+
+def _run_part(task):
+    """Enumerate one share; returns its per-node-count tallies and, when
+    writing, the number of graphs written to the part file.
+    """
+    limits, part, filepath = task
+    tallies = {}
+    out = open(filepath, 'wb') if filepath else None
+    try:
+        for certificate, edges, odd in enumerate_graphs(limits, part):
+            counts = tallies.setdefault(len(certificate), [0, 0])
+            counts[1 if odd else 0] += 1
+            if out:
+                out.write(encode_graph(certificate, edges))
+    finally:
+        if out:
+            out.close()
+    return tallies
+
+
+def run(limits, output=None, jobs=1, part=(0, 1)):
+    """Enumerate (in `jobs` processes) and optionally write `output`;
+    returns {node count: [circuits, paths]}.
+    """
+    if jobs <= 1:
+        tasks = [(limits, part, output and output + '.part')]
+        results = map(_run_part, tasks)
+    else:
+        res, mod = part
+        shares = [(res + mod * j, mod * jobs) for j in range(jobs)]
+        tasks = [(limits, share, output and f"{output}.part{j}") for j, share in enumerate(shares)]
+        pool = ProcessPoolExecutor(max_workers=jobs)
+        results = pool.map(_run_part, tasks)
+    tallies = {}
+    for result in results:
+        for n, (circuits, paths) in result.items():
+            counts = tallies.setdefault(n, [0, 0])
+            counts[0] += circuits
+            counts[1] += paths
+    if jobs > 1:
+        pool.shutdown()
+
+    if output:
+        with open(output, 'wb') as out:
+            out.write(_STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, 0))
+            for _, _, part_path in tasks:
+                with open(part_path, 'rb') as f:
+                    while chunk := f.read(1 << 20):
+                        out.write(chunk)
+                os.remove(part_path)
+        index_stream(output)
+    return dict(sorted(tallies.items()))
+
+
+def _part(text):
+    try:
+        res, mod = map(int, text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected RES/MOD") from None
+    if not 0 <= res < mod:
+        raise argparse.ArgumentTypeError("RES must be below MOD")
+    return res, mod
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--nodes', type=int, default=8, metavar='N', help="largest node count")
+    parser.add_argument('--min-nodes', type=int, default=3, metavar='N', help="smallest node count")
+    parser.add_argument('--max-edges', type=int, default=14, metavar='E', help="edge budget")
+    parser.add_argument('--min-edges', type=int, default=0, metavar='E', help="fewest edges")
+    parser.add_argument('--circuit', action='store_true', help="only graphs without odd nodes")
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N', help="worker processes")
+    parser.add_argument('--part', type=_part, default=(0, 1), metavar='RES/MOD', help="only this share of the tree")
+    parser.add_argument('-o', '--output', metavar='PATH', help="write the graphs and PATH.idx")
+    parser.add_argument('--read', metavar='PATH', help="list the graphs in a stream instead")
+    parser.add_argument('--start', type=int, default=0, metavar='K', help="with --read, first graph to list")
+    parser.add_argument('--limit', type=int, metavar='N', help="with --read, list at most N graphs")
+    args = parser.parse_args()
+
+    if args.read:
+        with GraphStream(args.read) as stream:
+            stop = None if args.limit is None else args.start + args.limit
+            for k, (n, edges) in enumerate(stream.read(args.start, stop), args.start):
+                degree = [0] * n
+                for a, b in edges:
+                    degree[a] += 1
+                    degree[b] += 1
+                kind = 'path' if any(d & 1 for d in degree) else 'circuit'
+                print(f"Graph {k} - {n} nodes, {len(edges)} edges, {kind}: "
+                      + ' '.join(f"({a},{b})" for a, b in edges))
+            print(f"\nTotal: {len(stream)} graphs")
+        return 0
+
+    if not 1 <= args.nodes <= MAX_NODES:
+        parser.error(f"--nodes must be between 1 and {MAX_NODES}")
+    limits = _Limits(args.nodes, args.min_nodes, args.max_edges, args.min_edges, 0 if args.circuit else 2)
+    started = time.perf_counter()
+    tallies = run(limits, args.output, args.jobs, args.part)
+    elapsed = time.perf_counter() - started
+
+    for n, (circuits, paths) in tallies.items():
+        print(f"{n:2d} nodes: {circuits} circuits, {paths} paths")
+    circuits = sum(c for c, _ in tallies.values())
+    paths = sum(p for _, p in tallies.values())
+    print(f"\nTotal: {circuits + paths} graphs ({circuits} circuits, {paths} paths) in {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
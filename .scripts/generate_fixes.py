@@ -1,55 +1,14 @@
 #!/usr/bin/env python3
 """Generate verified correct Kotlin code for levels 30-50."""
-from collections import defaultdict, deque
-
-
-def compute_degrees(nodes, edges):
-    deg = defaultdict(int)
-    for n in nodes:
-        deg[n] = 0
-    for a, b in edges:
-        deg[a] += 1
-        deg[b] += 1
-    return dict(deg)
-
-
-def odd_nodes(nodes, edges):
-    deg = compute_degrees(nodes, edges)
-    return sorted([n for n in nodes if deg[n] % 2 != 0])
-
-
-def is_connected(nodes, edges):
-    adj = defaultdict(set)
-    for a, b in edges:
-        adj[a].add(b)
-        adj[b].add(a)
-    visited = set()
-    queue = deque([nodes[0]])
-    visited.add(nodes[0])
-    while queue:
-        curr = queue.popleft()
-        for n in adj[curr]:
-            if n not in visited:
-                visited.add(n)
-                queue.append(n)
-    return len(visited) == len(nodes)
-
-
-def has_dups(edges):
-    s = set()
-    for a, b in edges:
-        k = (min(a, b), max(a, b))
-        if k in s:
-            return True
-        s.add(k)
-    return False
+from graph_core import LevelGraph
 
 
 def verify(name, nodes, edges):
-    deg = compute_degrees(nodes, edges)
-    odd = odd_nodes(nodes, edges)
-    conn = is_connected(nodes, edges)
-    dups = has_dups(edges)
+    graph = LevelGraph(nodes, edges)
+    deg = graph.degree_map()
+    odd = graph.odd_nodes
+    conn = graph.is_connected
+    dups = bool(graph.duplicates)
     ok = len(odd) in (0, 2) and conn and not dups
     if not ok:
         print(f"FAIL {name}: odd={odd}, conn={conn}, dups={dups}, deg={deg}")
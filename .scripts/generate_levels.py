@@ -1,62 +1,31 @@
 #!/usr/bin/env python3
 """Generate valid Eulerian graph levels for LineFlow."""
-from collections import defaultdict, deque
+from graph_core import LevelGraph
 
 
 def verify_level(level):
     """Verify a level is valid. Returns (is_valid, odd_nodes, issues)."""
     issues = []
     nodes = level['nodes']
-    edges = level['edges']
-    node_set = set(nodes)
+    graph = LevelGraph(nodes, level['edges'])
 
-    for a, b in edges:
-        if a not in node_set:
-            issues.append(f"Edge ({a},{b}) references invalid node {a}")
-        if b not in node_set:
-            issues.append(f"Edge ({a},{b}) references invalid node {b}")
+    for a, b, bad in graph.invalid_refs:
+        issues.append(f"Edge ({a},{b}) references invalid node {bad}")
 
-    edge_set = set()
-    for a, b in edges:
-        key = (min(a, b), max(a, b))
-        if key in edge_set:
-            issues.append(f"Duplicate edge ({a},{b})")
-        edge_set.add(key)
-
-    degree = defaultdict(int)
-    for n in nodes:
-        degree[n] = 0
-    for a, b in edges:
-        degree[a] += 1
-        degree[b] += 1
+    for a, b in graph.duplicates:
+        issues.append(f"Duplicate edge ({a},{b})")
 
-    odd_nodes = sorted([n for n in nodes if degree[n] % 2 != 0])
+    odd_nodes = graph.odd_nodes
     odd_count = len(odd_nodes)
 
     if odd_count != 0 and odd_count != 2:
         issues.append(f"Has {odd_count} odd-degree nodes: {odd_nodes}")
-        issues.append(f"  Degrees: {dict(sorted(degree.items()))}")
-
-    adj = defaultdict(set)
-    for a, b in edges:
-        adj[a].add(b)
-        adj[b].add(a)
+        issues.append(f"  Degrees: {dict(sorted(graph.degree_map().items()))}")
 
     if nodes:
-        start = nodes[0]
-        visited = set()
-        queue = deque([start])
-        visited.add(start)
-        while queue:
-            curr = queue.popleft()
-            for neighbor in adj[curr]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-
-        unreachable = node_set - visited
+        unreachable = graph.unreachable_from(nodes[0])
         if unreachable:
-            issues.append(f"Not connected. Unreachable: {sorted(unreachable)}")
+            issues.append(f"Not connected. Unreachable: {unreachable}")
 
     return len(issues) == 0, odd_nodes, issues
 
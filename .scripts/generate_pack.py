@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Procedurally generate Eulerian levels and stream them to JSON Lines.
+
+Each family is built so its parity comes out right by construction, the
+way the hand-made levels in generate_levels.py / generate_fixes.py were:
+
+  cycle   an n-cycle plus chord triangles (every triangle adds 2 to each of
+          its corners), optionally one extra chord for a 2-odd path
+  ladder  two rails with crossed cells; the rungs are then chosen column
+          by column to cancel the crosses' parity, optionally leaving one
+          column odd for a path
+  wheel   a rim, a hub and spokes; spoke ends are paired off with rim
+          chords, optionally leaving one pair (or the hub) odd
+
+so every candidate is connected, free of duplicate edges and has 0 or 2
+odd nodes without trial and error. Candidate i is built from its own RNG
+seeded by (seed, i), which makes the output a pure function of --seed and
+--count: --jobs only splits the index range into shards that workers
+write in parallel and that are then concatenated in order.
+
+Each output line is a level record in the parser's shape (id, name,
+nodes, positions, edges, valid_starts, first_edge), with first_edge taken
+from a solved trail. --min-edges/--max-edges/--families/--kind filter
+candidates before they are written, and --spacing also drops candidates
+that break the edge-angle or touch-distance rules of spacing_levels.py
+(checked a batch at a time with NumPy). --planar drops candidates whose
+graph has no crossing-free drawing (planarity.py) before anything else
+looks at their layout.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from graph_core import LevelGraph
+from planarity import is_planar
+from solve_levels import euler_trail
+
+FAMILIES = ('cycle', 'ladder', 'wheel')
+# Candidates per spacing_levels check when --spacing is on.
+SPACING_BATCH = 4096
+
+
+def _on_circle(count, radius=0.42, phase=-math.pi / 2):
+    return [
+        (round(0.5 + radius * math.cos(phase + 2 * math.pi * i / count), 2),
+         round(0.5 + radius * math.sin(phase + 2 * math.pi * i / count), 2))
+        for i in range(count)
+    ]
+
+
+def _key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+def cycle_level(rng, path):
+    """An n-cycle with chord triangles, plus one chord when `path`."""
+    n = rng.randint(7, 15)
+    edges = [(i, (i + 1) % n) for i in range(n)]
+    used = {_key(a, b) for a, b in edges}
+
+    def free(a, b):
+        return (a - b) % n not in (1, n - 1) and _key(a, b) not in used
+
+    for _ in range(rng.randint(1, n // 4 + 1)):
+        for _ in range(8):
+            a, b, c = rng.sample(range(n), 3)
+            if free(a, b) and free(b, c) and free(c, a):
+                for x, y in ((a, b), (b, c), (c, a)):
+                    edges.append((x, y))
+                    used.add(_key(x, y))
+                break
+    if path:
+        for _ in range(16):
+            a, b = rng.sample(range(n), 2)
+            if free(a, b):
+                edges.append((a, b))
+                break
+    return list(range(n)), _on_circle(n), edges
+
+
+def ladder_level(rng, path):
+    """Two rails of m nodes, crossed cells, rungs fixing the parity."""
+    m = rng.randint(3, 8)
+    crosses = [rng.random() < 0.5 for _ in range(m - 1)]
+    if not any(crosses):
+        crosses[rng.randrange(m - 1)] = True
+
+    top = list(range(m))
+    bottom = list(range(m, 2 * m))
+    edges = [(top[i], top[i + 1]) for i in range(m - 1)]
+    edges += [(bottom[i], bottom[i + 1]) for i in range(m - 1)]
+    for i in range(m - 1):
+        if crosses[i]:
+            edges += [(top[i], bottom[i + 1]), (bottom[i], top[i + 1])]
+
+    # Column i's nodes see 1 rail at the ends (2 inside) and one cross edge
+    # per crossed neighbouring cell; the rung makes the total even.
+    odd_column = rng.randrange(m) if path else -1
+    for i in range(m):
+        parity = (i == 0) + (i == m - 1) + (i > 0 and crosses[i - 1]) + (i < m - 1 and crosses[i])
+        if (parity & 1) != (i == odd_column):
+            edges.append((top[i], bottom[i]))
+
+    positions = [(round(0.1 + 0.8 * i / (m - 1), 2), 0.3) for i in range(m)]
+    positions += [(round(0.1 + 0.8 * i / (m - 1), 2), 0.7) for i in range(m)]
+    return top + bottom, positions, edges
+
+
+def wheel_level(rng, path):
+    """A rim with a hub; spoke ends paired by chords, one pair left when `path`."""
+    while True:
+        n = rng.randint(5, 12)
+        hub = n
+        spokes = rng.sample(range(n), rng.randint(3, n))
+        kept = []
+        if len(spokes) % 2:
+            last = spokes.pop()
+            if path:
+                # The hub and this rim node are the two odd ends.
+                kept.append(last)
+        leave_open = path and not kept
+        chords = []
+        for a, b in zip(spokes[::2], spokes[1::2]):
+            if leave_open:
+                leave_open = False
+                kept += [a, b]
+            elif (a - b) % n not in (1, n - 1):
+                chords.append((a, b))
+                kept += [a, b]
+            # Adjacent ends can't take a chord; dropping both spokes keeps
+            # the hub's parity and both ends even.
+        if len(kept) >= 2:
+            break
+    rim = [(i, (i + 1) % n) for i in range(n)]
+    edges = rim + [(hub, s) for s in sorted(kept)] + chords
+    return list(range(n + 1)), _on_circle(n) + [(0.5, 0.5)], edges
+
+
+_BUILDERS = {'cycle': cycle_level, 'ladder': ladder_level, 'wheel': wheel_level}
+
+
+def candidate(seed, index, families):
+    """Candidate `index` of the run seeded with `seed`; depends on nothing else."""
+    rng = random.Random(seed << 40 | index)
+    family = families[rng.randrange(len(families))]
+    path = rng.random() < 0.5
+    nodes, positions, edges = _BUILDERS[family](rng, path)
+
+    graph = LevelGraph(nodes, edges)
+    odd = graph.odd_nodes
+    start = odd[0] if odd else nodes[0]
+    trail = euler_trail(graph, start)
+    return {
+        'id': index + 1,
+        'name': f"{family.title()} {index + 1}",
+        'nodes': nodes,
+        'positions': positions,
+        'edges': edges,
+        'valid_starts': odd if odd else list(nodes),
+        'first_edge': (trail[0], trail[1]),
+    }
+
+
+def keep(level, min_edges, max_edges, kind, planar=False):
+    if not min_edges <= len(level['edges']) <= max_edges:
+        return False
+    if kind == 'circuit' and len(level['valid_starts']) != len(level['nodes']):
+        return False
+    if kind == 'path' and len(level['valid_starts']) != 2:
+        return False
+    return not planar or is_planar(LevelGraph(level['nodes'], level['edges']))
+
+
+def _write_levels(out, levels, spacing):
+    """Write `levels` as JSON lines, minus spacing failures when `spacing`;
+    returns how many were written.
+    """
+    if spacing and levels:
+        from spacing_levels import spacing_failures
+        levels = [level for level, failed in zip(levels, spacing_failures(levels, angles_from=1).tolist()) if not failed]
+    for level in levels:
+        out.write(json.dumps(level, separators=(',', ':')))
+        out.write('\n')
+    return len(levels)
+
+
+def write_shard(task):
+    """Write candidates [start, stop) that pass the filters; returns the count."""
+    filepath, seed, start, stop, families, min_edges, max_edges, kind, spacing, planar = task
+    batch_size = SPACING_BATCH if spacing else 1
+    written = 0
+    batch = []
+    with open(filepath, 'w') as out:
+        for index in range(start, stop):
+            level = candidate(seed, index, families)
+            if keep(level, min_edges, max_edges, kind, planar):
+                batch.append(level)
+                if len(batch) == batch_size:
+                    written += _write_levels(out, batch, spacing)
+                    batch = []
+        written += _write_levels(out, batch, spacing)
+    return written
+
+
+def generate(filepath, count, seed=0, jobs=1, families=FAMILIES, min_edges=0, max_edges=10**9, kind='any',
+             spacing=False, planar=False):
+    """Stream `count` candidates' survivors to `filepath`; returns how many were kept."""
+    families = tuple(families)
+    if jobs <= 1:
+        return write_shard((filepath, seed, 0, count, families, min_edges, max_edges, kind, spacing, planar))
+
+    bounds = [count * k // jobs for k in range(jobs + 1)]
+    parts = [f"{filepath}.part{k}" for k in range(jobs)]
+    tasks = [
+        (part, seed, start, stop, families, min_edges, max_edges, kind, spacing, planar)
+        for part, start, stop in zip(parts, bounds, bounds[1:])
+    ]
+    try:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            written = sum(pool.map(write_shard, tasks))
+        with open(filepath, 'wb') as out:
+            for part in parts:
+                with open(part, 'rb') as f:
+                    shutil.copyfileobj(f, out)
+    finally:
+        for part in parts:
+            if os.path.exists(part):
+                os.remove(part)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('output', help="JSON Lines file to write")
+    parser.add_argument('--count', '-n', type=int, default=1000, help="candidates to generate")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', '-j', type=int, default=1, metavar='N', help="generate shards in N worker processes")
+    parser.add_argument('--families', default=','.join(FAMILIES), help="comma-separated subset of: " + ', '.join(FAMILIES))
+    parser.add_argument('--min-edges', type=int, default=0)
+    parser.add_argument('--max-edges', type=int, default=10**9)
+    parser.add_argument('--kind', choices=('any', 'circuit', 'path'), default='any')
+    parser.add_argument('--spacing', action='store_true',
+                        help="drop candidates that break the edge-angle or touch-distance rule (needs numpy)")
+    parser.add_argument('--planar', action='store_true', help="drop candidates whose graph is not planar")
+    args = parser.parse_args()
+
+    families = [f.strip() for f in args.families.split(',') if f.strip()]
+    unknown = sorted(set(families) - set(FAMILIES))
+    if unknown or not families:
+        parser.error(f"unknown families: {', '.join(unknown) or '(none given)'}")
+
+    written = generate(
+        args.output, args.count, args.seed, args.jobs, families, args.min_edges, args.max_edges, args.kind,
+        args.spacing, args.planar)
+    print(f"Kept {written} of {args.count} candidates", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
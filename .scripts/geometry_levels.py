@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""Check level layouts for crossing edges, overlapping edges and edges
+drawn through a node.
+
+Positions come from the Offset(x, y) of each Node. Three problems are
+reported:
+
+  cross    two edges with no common node intersect at an interior point
+  overlap  two edges lie on one line and share more than a single point
+  through  an edge passes over a node that is not one of its ends
+
+find_layout_issues() is a plane sweep over x: segments (and nodes, as
+zero-length segments) enter the active set at their left end and leave at
+their right end, and each entering segment is only tested against active
+ones whose y-range overlaps its own. Any two shapes that meet overlap in
+both x and y, so nothing is missed, but pairs far apart on either axis are
+never compared. naive_layout_issues() tests every pair and is kept as the
+reference; both return the same sorted messages.
+"""
+import argparse
+import sys
+import time
+
+from validate_levels import iter_levels
+
+# Layout coordinates are fractions of the canvas; anything closer to a
+# line than this is on it.
+EPS = 1e-9
+
+
+def _orient(ax, ay, bx, by, cx, cy):
+    """+1 / -1 / 0: c is left of / right of / on the line a->b."""
+    value = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    return (value > EPS) - (value < -EPS)
+
+
+def _segments(level):
+    """[(edge index, a, b, (ax, ay), (bx, by))] for edges whose ends both
+    have positions, plus {node: position}.
+    """
+    where = {n: p for n, p in zip(level['nodes'], level.get('positions') or ()) if p is not None}
+    segments = []
+    for i, (a, b) in enumerate(level['edges']):
+        if a != b and a in where and b in where:
+            segments.append((i, a, b, where[a], where[b]))
+    return segments, where
+
+
+def pair_issue(s, t):
+    """Message for two edges (named in edge-list order), or None."""
+    if s[0] > t[0]:
+        s, t = t, s
+    _, a, b, (ax, ay), (bx, by) = s
+    _, c, d, (cx, cy), (dx, dy) = t
+    o1 = _orient(ax, ay, bx, by, cx, cy)
+    o2 = _orient(ax, ay, bx, by, dx, dy)
+    if o1 == 0 and o2 == 0:
+        # Collinear: project on the longer axis and compare intervals. Two
+        # edges meeting end to end share a single point, which is fine.
+        if abs(bx - ax) >= abs(by - ay):
+            lo1, hi1 = sorted((ax, bx))
+            lo2, hi2 = sorted((cx, dx))
+        else:
+            lo1, hi1 = sorted((ay, by))
+            lo2, hi2 = sorted((cy, dy))
+        if min(hi1, hi2) - max(lo1, lo2) > EPS:
+            return f"Edges ({a},{b}) and ({c},{d}) overlap"
+        return None
+    if a in (c, d) or b in (c, d):
+        return None
+    o3 = _orient(cx, cy, dx, dy, ax, ay)
+    o4 = _orient(cx, cy, dx, dy, bx, by)
+    # A zero orientation means an end of one edge lies on the other; that
+    # is reported as the edge passing through that node.
+    if o1 and o2 and o3 and o4 and o1 != o2 and o3 != o4:
+        return f"Edges ({a},{b}) and ({c},{d}) cross"
+    return None
+
+
+def through_issue(s, node, point):
+    """Message for edge `s` passing over `node` at `point`, or None."""
+    _, a, b, (ax, ay), (bx, by) = s
+    if node == a or node == b:
+        return None
+    px, py = point
+    if _orient(ax, ay, bx, by, px, py):
+        return None
+    # On the line; it must also sit strictly between the two ends.
+    if (px - ax) * (bx - ax) + (py - ay) * (by - ay) <= EPS:
+        return None
+    if (px - bx) * (ax - bx) + (py - by) * (ay - by) <= EPS:
+        return None
+    return f"Edge ({a},{b}) passes through node {node}"
+
+
+def naive_layout_issues(level):
+    """Every edge pair and every edge/node pair, for reference."""
+    segments, where = _segments(level)
+    issues = set()
+    for i, s in enumerate(segments):
+        for t in segments[i + 1:]:
+            issue = pair_issue(s, t)
+            if issue:
+                issues.add(issue)
+        for node, point in where.items():
+            issue = through_issue(s, node, point)
+            if issue:
+                issues.add(issue)
+    return sorted(issues)
+
+
+def find_layout_issues(level):
+    """Same result as naive_layout_issues(), from a sweep over x."""
+    segments, where = _segments(level)
+    # Shapes are (x_lo, x_hi, y_lo, y_hi, segment or None, node or None).
+    shapes = []
+    for s in segments:
+        (ax, ay), (bx, by) = s[3], s[4]
+        shapes.append((min(ax, bx), max(ax, bx), min(ay, by), max(ay, by), s, None))
+    for node, (px, py) in where.items():
+        shapes.append((px, px, py, py, None, node))
+    # Entering before leaving at the same x, so shapes that only touch at
+    # that x are still compared.
+    events = sorted(
+        [(shape[0] - EPS, 0, i) for i, shape in enumerate(shapes)]
+        + [(shape[1] + EPS, 1, i) for i, shape in enumerate(shapes)]
+    )
+
+    issues = set()
+    active = {}
+    for _, leaving, i in events:
+        if leaving:
+            del active[i]
+            continue
+        _, _, y_lo, y_hi, s, node = shape = shapes[i]
+        for _, _, other_lo, other_hi, t, other_node in active.values():
+            if other_lo > y_hi + EPS or other_hi < y_lo - EPS:
+                continue
+            if s is not None and t is not None:
+                issue = pair_issue(s, t)
+            elif s is not None:
+                issue = through_issue(s, other_node, where[other_node])
+            elif t is not None:
+                issue = through_issue(t, node, where[node])
+            else:
+                continue
+            if issue:
+                issues.add(issue)
+        active[i] = shape
+    return sorted(issues)
+
+
+def benchmark(levels, repeat=5):
+    """(sweep seconds, naive seconds) for checking `levels`, best of `repeat`."""
+    timings = []
+    for check in (find_layout_issues, naive_layout_issues):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for level in levels:
+                check(level)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best)
+    return tuple(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--naive', action='store_true', help="use the all-pairs check instead of the sweep")
+    parser.add_argument('--benchmark', action='store_true', help="time the sweep against the all-pairs check")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        levels = list(iter_levels(args.filepath))
+        densest = max(levels, key=lambda level: len(level['edges']))
+        for label, group in ((f"densest level ({densest['name']}, {len(densest['edges'])} edges)", [densest]),
+                             (f"all {len(levels)} levels", levels)):
+            sweep, naive = benchmark(group, repeat=20 if len(group) == 1 else 3)
+            print(f"{label}: sweep {sweep * 1e3:.2f} ms, naive {naive * 1e3:.2f} ms ({naive / sweep:.2f}x)")
+        return 0
+
+    check = naive_layout_issues if args.naive else find_layout_issues
+    count = 0
+    total_issues = 0
+    for level in iter_levels(args.filepath):
+        count += 1
+        issues = check(level)
+        if issues:
+            print(f"Level {level['id']} ({level['name']}):")
+            for issue in issues:
+                print(f"  ERROR: {issue}")
+            total_issues += len(issues)
+
+    print(f"\nTotal: {count} levels, {total_issues} layout issues")
+    return 1 if total_issues > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""Replay simulated swipes through OneLineDrawGame's touch handling.
+
+Every level is laid out on each --screen the way OneLineDrawGame does it
+(bounding box padded by LAYOUT_PADDING, width-fitted, levels with 12 or
+more nodes stretched up to 1.5x into spare height, centred vertically),
+and its solution trail from solve_levels is swiped in both directions,
+--swipes times each. A swipe aims at every node with a Gaussian --aim
+offset, moves in straight --step long pointer events between them and
+wobbles by --noise on every event. The events go through the same rules
+as the pointerInput block:
+
+  down   the closest node within the hit radius (3 x the 14dp node
+         radius) becomes the start, else the touch is ignored
+  move   the closest node within the hit radius, other than the current
+         one, is taken when the finger has moved at least 2 x the node
+         radius since the last confirmed node and is heading for it (the
+         last move within 60 degrees of the node, or hardly moving); then
+         the first unvisited edge between the two is drawn, or the game
+         is lost if the edge was already drawn, or nothing happens if
+         there is no edge
+
+A swipe either completes the level or fails: it starts nowhere or on the
+wrong node, reaches a node the trail did not go to next (wrong node, or
+retraced when that edge was already drawn), or misses a node (the swipe
+ends with edges left). Levels where more than --max-failures of the
+swipes on some screen fail are reported with the node that is most often
+to blame.
+
+All swipes of a batch of levels, screens and directions advance together,
+one pointer event per step, as flat NumPy arrays. Hit tests go through a
+grid per level and screen whose cells are one hit radius wide; a table
+lists, for each cell, the nodes in it and its 8 neighbours (every node
+that can be within the hit radius of a point in the cell), so a test
+looks at a handful of candidates whatever the level size.
+
+Requires numpy.
+"""
+import argparse
+import math
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from solve_levels import solve_level
+from spacing_levels import LAYOUT_PADDING
+from validate_levels import iter_levels
+
+NODE_RADIUS_DP = 14.0
+HIT_RADIUS = 3.0  # x node radius
+MIN_TRAVEL = 2.0  # x node radius
+DENSE_LEVEL_NODES = 12
+MAX_VERTICAL_STRETCH = 1.5
+TOWARD_COSINE = 0.5
+# Width dp, height dp, density (px per dp).
+SCREENS = ((360, 640, 2.0), (393, 851, 2.75), (412, 915, 2.625), (800, 1280, 2.0))
+
+OK, NO_START, WRONG_START, WRONG_NODE, RETRACED, MISSED = range(6)
+OUTCOMES = ('ok', 'no start', 'wrong start', 'wrong node', 'retraced', 'missed')
+
+
+def screen_positions(positions, width, height):
+    """Pixel positions of normalized `positions` on a width x height canvas."""
+    xs = [x for x, _ in positions]
+    ys = [y for _, y in positions]
+    min_x, min_y = min(xs) - LAYOUT_PADDING, min(ys) - LAYOUT_PADDING
+    content_width = max(xs) + LAYOUT_PADDING - min_x
+    content_height = max(ys) + LAYOUT_PADDING - min_y
+
+    uniform_height = content_height * (width / content_width)
+    stretch = 1.0
+    if len(positions) >= DENSE_LEVEL_NODES and height > uniform_height * 1.2:
+        stretch = min(height / uniform_height * 0.9, MAX_VERTICAL_STRETCH)
+    canvas_height = uniform_height * stretch
+    offset_y = (height - canvas_height) / 2
+    scale_x = width / content_width
+    scale_y = canvas_height / content_height
+    return [((x - min_x) * scale_x, offset_y + (y - min_y) * scale_y) for x, y in positions]
+
+
+class HitGrid:
+    """Closest-node lookup within a hit radius for a list of node layouts.
+
+    Layout g's nodes live in rows node_base[g]:node_base[g] + count of
+    `points`. Its grid cells (one hit radius wide, over its nodes'
+    bounding box) start at cell_base[g] of `cells`, a table with one row
+    of candidate node indices (local to the layout, -1 padded, ascending)
+    per cell.
+    """
+
+    def __init__(self, layouts, radii):
+        origins, sizes, node_base, cell_base, tables = [], [], [], [], []
+        points = []
+        cells = 0
+        width = 1
+        for layout, radius in zip(layouts, radii):
+            xy = np.asarray(layout, dtype=np.float64)
+            lo = xy.min(axis=0)
+            shape = np.floor((xy.max(axis=0) - lo) / radius).astype(np.int64) + 1
+            cell = np.floor((xy - lo) / radius).astype(np.int64)
+            grid = [[[] for _ in range(shape[0])] for _ in range(shape[1])]
+            for i, (cx, cy) in enumerate(cell.tolist()):
+                for y in range(max(cy - 1, 0), min(cy + 2, shape[1])):
+                    for x in range(max(cx - 1, 0), min(cx + 2, shape[0])):
+                        grid[y][x].append(i)
+            table = [row for line in grid for row in line]
+            width = max(width, max(len(row) for row in table))
+            origins.append(lo)
+            sizes.append(shape)
+            node_base.append(len(points))
+            cell_base.append(cells)
+            points.extend(layout)
+            tables.append(table)
+            cells += len(table)
+
+        self.cells = np.full((cells, width), -1, dtype=np.int64)
+        at = 0
+        for table in tables:
+            for row in table:
+                self.cells[at, :len(row)] = row
+                at += 1
+        self.points = np.asarray(points, dtype=np.float64)
+        self.origin = np.asarray(origins)
+        self.shape = np.asarray(sizes)
+        self.node_base = np.asarray(node_base)
+        self.cell_base = np.asarray(cell_base)
+        self.radius2 = np.asarray(radii, dtype=np.float64) ** 2
+
+    def closest(self, layout, x, y):
+        """Local index of the node closest to each (x, y) within the hit
+        radius of its layout, or -1. Ties go to the lower index, as
+        minByOrNull keeps the first.
+        """
+        rel_x = (x - self.origin[layout, 0]) / np.sqrt(self.radius2[layout])
+        rel_y = (y - self.origin[layout, 1]) / np.sqrt(self.radius2[layout])
+        cx = np.clip(np.floor(rel_x), 0, self.shape[layout, 0] - 1).astype(np.int64)
+        cy = np.clip(np.floor(rel_y), 0, self.shape[layout, 1] - 1).astype(np.int64)
+        candidates = self.cells[self.cell_base[layout] + cy * self.shape[layout, 0] + cx]
+        rows = self.node_base[layout][:, None] + np.maximum(candidates, 0)
+        d2 = (self.points[rows, 0] - x[:, None]) ** 2 + (self.points[rows, 1] - y[:, None]) ** 2
+        d2[candidates < 0] = np.inf
+        best = np.argmin(d2, axis=1)
+        picked = np.arange(len(x))
+        hit = d2[picked, best] < self.radius2[layout]
+        return np.where(hit, candidates[picked, best], -1)
+
+
+def level_plan(level):
+    """(node positions, trail as node indices, edge pair ids) for a level
+    that can be replayed, or a reason it cannot.
+    """
+    positions = level.get('positions')
+    if not positions or None in positions:
+        return "no literal positions"
+    index = {node: i for i, node in enumerate(level['nodes'])}
+    if any(a not in index or b not in index for a, b in level['edges']):
+        return "edges reference unknown nodes (see validate_levels)"
+    trail = solve_level(level)['trail']
+    if not trail or len(trail) < 2:
+        return "no Eulerian trail (see validate_levels)"
+    pairs = {}
+    for a, b in level['edges']:
+        key = (min(index[a], index[b]), max(index[a], index[b]))
+        pairs.setdefault(key, len(pairs))
+    return positions, [index[node] for node in trail], pairs
+
+
+class _Batch:
+    """Flat arrays for a list of (plan, screen, direction) configurations."""
+
+    def __init__(self, configs, swipes):
+        self.configs = configs
+        layouts, radii = [], []
+        n_max = max(len(plan[0]) for plan, _, _ in configs)
+        m_max = max(len(plan[2]) for plan, _, _ in configs)
+        l_max = max(len(plan[1]) for plan, _, _ in configs)
+        count = len(configs)
+        self.pair_id = np.full((count, n_max, n_max), -1, dtype=np.int64)
+        self.pair_count = np.zeros(count, dtype=np.int64)
+        self.trail = np.zeros((count, l_max), dtype=np.int64)
+        self.trail_len = np.zeros(count, dtype=np.int64)
+        self.min_travel = np.zeros(count)
+        self.sigma = np.zeros((count, 3))
+        schedules = []
+        for c, (plan, (width, height, density, aim, noise, step), reverse) in enumerate(configs):
+            positions, trail, pairs = plan
+            if reverse:
+                trail = trail[::-1]
+            layout = screen_positions(positions, width * density, height * density)
+            radius = NODE_RADIUS_DP * density
+            layouts.append(layout)
+            radii.append(radius * HIT_RADIUS)
+            for (a, b), p in pairs.items():
+                self.pair_id[c, a, b] = self.pair_id[c, b, a] = p
+            self.pair_count[c] = len(pairs)
+            self.trail[c, :len(trail)] = trail
+            self.trail_len[c] = len(trail)
+            self.min_travel[c] = radius * MIN_TRAVEL
+            self.sigma[c] = (aim * density, noise * density, step * density)
+            # Pointer events per trail segment, from the unjittered length.
+            segment, fraction = [], []
+            for j in range(len(trail) - 1):
+                (ax, ay), (bx, by) = layout[trail[j]], layout[trail[j + 1]]
+                n = max(1, math.ceil(math.hypot(bx - ax, by - ay) / (step * density)))
+                segment.extend([j] * n)
+                fraction.extend((k + 1) / n for k in range(n))
+            schedules.append((segment, fraction))
+
+        self.grid = HitGrid(layouts, radii)
+        self.steps = np.array([len(s) for s, _ in schedules])
+        p_max = int(self.steps.max())
+        self.segment = np.zeros((count, p_max), dtype=np.int64)
+        self.fraction = np.ones((count, p_max))
+        for c, (segment, fraction) in enumerate(schedules):
+            self.segment[c, :len(segment)] = segment
+            self.fraction[c, :len(fraction)] = fraction
+        self.config = np.repeat(np.arange(count), swipes)
+        self.m_max = m_max
+
+    def run(self, rng):
+        """Outcome, expected node and actual node (local indices) per swipe."""
+        config = self.config
+        total = len(config)
+        grid = self.grid
+        points = grid.points[grid.node_base[config][:, None] + self.trail[config]]
+        aims = points + rng.normal(size=points.shape) * self.sigma[config, 0][:, None, None]
+        noise = self.sigma[config, 1]
+
+        down = aims[:, 0] + rng.normal(size=(total, 2)) * noise[:, None]
+        current = grid.closest(config, down[:, 0], down[:, 1])
+        outcome = np.where(current < 0, NO_START, np.where(current != self.trail[config, 0], WRONG_START, OK))
+        expected = np.where(outcome == WRONG_START, self.trail[config, 0], -1)
+        got = np.where(outcome == WRONG_START, current, -1)
+        visited = np.zeros((total, self.m_max), dtype=bool)
+        # Trail position, which is also the number of edges drawn.
+        position = np.zeros(total, dtype=np.int64)
+        last = down.copy()
+        previous = np.full((total, 2), np.nan)
+        alive = current >= 0
+        complete = np.zeros(total, dtype=bool)
+        last_index = self.trail.shape[1] - 1
+
+        # Only swipes still in play are stepped; `live` shrinks as they
+        # complete, fail or run out of pointer events.
+        live = np.flatnonzero(alive)
+        for p in range(int(self.steps.max())):
+            live = live[alive[live] & (p < self.steps[config[live]])]
+            if not live.size:
+                break
+            cfg = config[live]
+            j = self.segment[cfg, p]
+            t = self.fraction[cfg, p][:, None]
+            a = aims[live, j]
+            pos = a + (aims[live, j + 1] - a) * t + rng.normal(size=(len(live), 2)) * noise[live][:, None]
+
+            node = grid.closest(cfg, pos[:, 0], pos[:, 1])
+            cur = current[live]
+            target = grid.points[grid.node_base[cfg] + np.maximum(node, 0)] - pos
+            move = pos - previous[live]
+            previous[live] = pos
+            move_len = np.hypot(move[:, 0], move[:, 1])
+            target_len = np.hypot(target[:, 0], target[:, 1])
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cosine = (move * target).sum(axis=1) / (move_len * target_len)
+            # NaN on the first move compares False, so it counts as steady.
+            steady = ~((move_len > 0.1) & (target_len > 0.1))
+            moved = np.hypot(*(pos - last[live]).T) >= self.min_travel[cfg]
+            pair = self.pair_id[cfg, cur, np.maximum(node, 0)]
+            taken = np.flatnonzero((node >= 0) & (node != cur) & moved & (steady | (cosine > TOWARD_COSINE))
+                                   & (pair >= 0))
+            if not taken.size:
+                continue
+
+            rows = live[taken]
+            pair = pair[taken]
+            node = node[taken]
+            drawn = visited[rows, pair]
+            planned = self.trail[cfg[taken], np.minimum(position[rows] + 1, last_index)]
+            off = (node != planned) & (outcome[rows] == OK)
+            outcome[rows[off]] = np.where(drawn[off], RETRACED, WRONG_NODE)
+            expected[rows[off]] = planned[off]
+            got[rows[off]] = node[off]
+
+            alive[rows[drawn]] = False
+            fresh = ~drawn
+            rows = rows[fresh]
+            visited[rows, pair[fresh]] = True
+            current[rows] = node[fresh]
+            last[rows] = pos[taken[fresh]]
+            position[rows] += 1
+            done = rows[position[rows] == self.pair_count[config[rows]]]
+            complete[done] = True
+            alive[done] = False
+
+        missed = (outcome == OK) & ~complete
+        outcome[missed] = MISSED
+        expected[missed] = self.trail[config, np.minimum(position, self.trail_len[config] - 2) + 1][missed]
+        return outcome, expected, got
+
+
+def replay(plans, screens, swipes, rng, batch_swipes=1 << 16):
+    """{(level index, screen index): (outcome counts, culprit Counter)} for
+    `plans` (level index, plan) replayed on every screen in both directions.
+    """
+    configs = [
+        (i, s, plan, screen, reverse)
+        for i, plan in plans for s, screen in enumerate(screens) for reverse in (False, True)
+    ]
+    # Similar trail lengths batch together, so few swipes idle at the end.
+    configs.sort(key=lambda c: len(c[2][1]))
+    per_batch = max(1, batch_swipes // swipes)
+    results = {}
+    for start in range(0, len(configs), per_batch):
+        chunk = configs[start:start + per_batch]
+        batch = _Batch([(plan, screen, reverse) for _, _, plan, screen, reverse in chunk], swipes)
+        outcome, expected, got = batch.run(rng)
+        for c, (i, s, _, _, _) in enumerate(chunk):
+            rows = slice(c * swipes, (c + 1) * swipes)
+            counts, culprits = results.setdefault((i, s), (np.zeros(len(OUTCOMES), dtype=np.int64), Counter()))
+            counts += np.bincount(outcome[rows], minlength=len(OUTCOMES))
+            failed = outcome[rows] != OK
+            culprits.update(zip(outcome[rows][failed].tolist(), expected[rows][failed].tolist(),
+                                got[rows][failed].tolist()))
+    return results
+
+
+def describe(counts, culprits, nodes):
+    """"12.5% of 400 swipes fail: wrong node 8.0% (mostly 3 instead of 5), ..." for one screen."""
+    total = int(counts.sum())
+    parts = []
+    for kind in range(1, len(OUTCOMES)):
+        if not counts[kind]:
+            continue
+        text = f"{OUTCOMES[kind]} {counts[kind] / total:.1%}"
+        blamed = [(n, e, g) for (k, e, g), n in culprits.items() if k == kind]
+        if blamed and kind != NO_START:
+            _, e, g = max(blamed)
+            if kind == MISSED:
+                text += f" (mostly node {nodes[e]})"
+            else:
+                text += f" (mostly {nodes[g]} instead of {nodes[e]})"
+        parts.append(text)
+    failed = total - int(counts[OK])
+    return f"{failed / total:.1%} of {total} swipes fail: " + ", ".join(parts)
+
+
+def _screen(text):
+    try:
+        size, density = text.split('@')
+        width, height = size.split('x')
+        return int(width), int(height), float(density)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT@DENSITY in dp, e.g. 360x640@2, not {text!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--screen', type=_screen, action='append', metavar='WxH@D',
+                        help="screen size in dp and density, repeatable (default: "
+                             + ", ".join(f"{w}x{h}@{d:g}" for w, h, d in SCREENS) + ")")
+    parser.add_argument('--swipes', type=int, default=100, metavar='N', help="swipes per direction per screen")
+    parser.add_argument('--aim', type=float, default=6.0, metavar='DP', help="spread of the aim at each node")
+    parser.add_argument('--noise', type=float, default=1.5, metavar='DP', help="wobble of each pointer event")
+    parser.add_argument('--step', type=float, default=8.0, metavar='DP', help="distance between pointer events")
+    parser.add_argument('--max-failures', type=float, default=0.05, metavar='RATE',
+                        help="report levels where more swipes than this fail on some screen")
+    parser.add_argument('--level', type=int, action='append', metavar='ID', help="only replay this level (repeatable)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch', type=int, default=1 << 16, metavar='N', help="swipes simulated together")
+    args = parser.parse_args()
+
+    screens = [(w, h, d, args.aim, args.noise, args.step) for w, h, d in (args.screen or SCREENS)]
+    levels = [level for level in iter_levels(args.filepath) if not args.level or level['id'] in args.level]
+    plans = []
+    skipped = 0
+    for i, level in enumerate(levels):
+        plan = level_plan(level)
+        if isinstance(plan, str):
+            print(f"Level {level['id']} ({level['name']}) - skipped: {plan}")
+            skipped += 1
+        else:
+            plans.append((i, plan))
+
+    started = time.perf_counter()
+    results = replay(plans, screens, args.swipes, np.random.default_rng(args.seed), args.batch)
+    elapsed = time.perf_counter() - started
+
+    flagged = 0
+    for i, _ in plans:
+        level = levels[i]
+        bad = []
+        for s, (w, h, d, *_) in enumerate(screens):
+            counts, culprits = results[(i, s)]
+            if 1 - counts[OK] / counts.sum() > args.max_failures:
+                bad.append(f"  {w}x{h}@{d:g}: {describe(counts, culprits, level['nodes'])}")
+        if bad:
+            flagged += 1
+            print(f"Level {level['id']} ({level['name']}) - unreliable gestures:")
+            print("\n".join(bad))
+        else:
+            print(f"Level {level['id']} ({level['name']}) - OK")
+
+    swiped = len(plans) * len(screens) * 2 * args.swipes
+    print(f"\nTotal: {len(levels)} levels, {flagged} with unreliable gestures, {skipped} skipped "
+          f"({swiped} swipes in {elapsed:.1f}s)")
+    return 1 if flagged else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Compact graph core shared by the level validation scripts.
+
+Node ids are mapped to dense indices and everything per node lives in
+array('i'). Degrees, parity, duplicate edges, invalid node references and
+connectivity all come out of one pass over the edge list, with union-find
+standing in for the adjacency-dict BFS. Traversals get CSR adjacency
+(offsets + neighbor indices) built on demand.
+"""
+from array import array
+
+
+class LevelGraph:
+    """Degree, parity, duplicate and connectivity facts for one level.
+
+    Node ids are mapped to dense indices in the order given. Ids that only
+    appear in edges are appended after the real nodes so they still count
+    towards degrees and connectivity, exactly like the old dict-based checks.
+    """
+
+    __slots__ = (
+        'node_ids', 'edges', 'index', 'node_count',
+        'degree', 'parent', 'edge_keys', 'duplicates', 'invalid_refs',
+        '_offsets', '_neighbors', '_edge_ids',
+    )
+
+    def __init__(self, nodes, edges):
+        node_ids = list(dict.fromkeys(nodes))
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        node_count = len(node_ids)
+
+        # Plain lists while counting (cheaper element access than array),
+        # packed into arrays once the pass is done.
+        degree = [0] * node_count
+        parent = list(range(node_count))
+        edge_keys = set()
+        duplicates = []
+        invalid_refs = []
+
+        for a, b in edges:
+            ia = index.get(a)
+            if ia is None:
+                ia = index[a] = len(node_ids)
+                node_ids.append(a)
+                degree.append(0)
+                parent.append(ia)
+            if ia >= node_count:
+                invalid_refs.append((a, b, a))
+            ib = index.get(b)
+            if ib is None:
+                ib = index[b] = len(node_ids)
+                node_ids.append(b)
+                degree.append(0)
+                parent.append(ib)
+            if ib >= node_count:
+                invalid_refs.append((a, b, b))
+
+            key = (ia << 32) | ib if ia < ib else (ib << 32) | ia
+            if key in edge_keys:
+                duplicates.append((a, b))
+            else:
+                edge_keys.add(key)
+
+            degree[ia] += 1
+            degree[ib] += 1
+
+            # Union-find with path halving; attach the larger root under the
+            # smaller so the representative is stable for a given input.
+            while parent[ia] != ia:
+                parent[ia] = ia = parent[parent[ia]]
+            while parent[ib] != ib:
+                parent[ib] = ib = parent[parent[ib]]
+            if ia < ib:
+                parent[ib] = ia
+            elif ib < ia:
+                parent[ia] = ib
+
+        self.node_ids = node_ids
+        self.edges = edges
+        self.index = index
+        self.node_count = node_count
+        self.degree = array('i', degree)
+        self.parent = array('i', parent)
+        self.edge_keys = edge_keys
+        self.duplicates = duplicates
+        self.invalid_refs = invalid_refs
+        self._offsets = None
+        self._neighbors = None
+        self._edge_ids = None
+
+    def csr(self):
+        """(offsets, neighbors) arrays; neighbors of i are neighbors[offsets[i]:offsets[i + 1]].
+
+        Built on first use, since the validation checks never need them.
+        """
+        offsets, neighbors, _ = self.incidence()
+        return offsets, neighbors
+
+    def incidence(self):
+        """(offsets, neighbors, edge_ids): CSR adjacency plus, for every slot,
+        the index into self.edges of the edge it came from.
+        """
+        if self._offsets is None:
+            total = len(self.node_ids)
+            offsets = array('i', bytes(4 * (total + 1)))
+            running = 0
+            for i, d in enumerate(self.degree):
+                offsets[i] = running
+                running += d
+            offsets[total] = running
+
+            fill = list(offsets)
+            neighbors = array('i', bytes(4 * running))
+            edge_ids = array('i', bytes(4 * running))
+            index = self.index
+            for e, (a, b) in enumerate(self.edges):
+                ia = index[a]
+                ib = index[b]
+                slot = fill[ia]
+                neighbors[slot] = ib
+                edge_ids[slot] = e
+                fill[ia] = slot + 1
+                slot = fill[ib]
+                neighbors[slot] = ia
+                edge_ids[slot] = e
+                fill[ib] = slot + 1
+
+            self._offsets = offsets
+            self._neighbors = neighbors
+            self._edge_ids = edge_ids
+        return self._offsets, self._neighbors, self._edge_ids
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def degree_map(self):
+        """{node id: degree}, real nodes first, then ids only seen in edges."""
+        return dict(zip(self.node_ids, self.degree))
+
+    @property
+    def odd_nodes(self):
+        """Sorted ids of the level's own nodes that have odd degree."""
+        degree = self.degree
+        return sorted(self.node_ids[i] for i in range(self.node_count) if degree[i] & 1)
+
+    def roots(self):
+        """Union-find representative of every real node, in index order."""
+        find = self.find
+        return [find(i) for i in range(self.node_count)]
+
+    def unreachable_from(self, node_id):
+        """Sorted ids of the level's nodes not connected to `node_id`."""
+        root = self.find(self.index[node_id])
+        ids = self.node_ids
+        return sorted(ids[i] for i, r in enumerate(self.roots()) if r != root)
+
+    @property
+    def is_connected(self):
+        return len(set(self.roots())) <= 1
+
+    def neighbors_of(self, node_id):
+        """Neighbor ids of `node_id`, one entry per incident edge."""
+        offsets, neighbors = self.csr()
+        i = self.index[node_id]
+        ids = self.node_ids
+        return [ids[j] for j in neighbors[offsets[i]:offsets[i + 1]]]
+
+    def has_edge(self, a, b):
+        ia = self.index.get(a)
+        ib = self.index.get(b)
+        if ia is None or ib is None:
+            return False
+        key = (ia << 32) | ib if ia < ib else (ib << 32) | ia
+        return key in self.edge_keys
@@ -0,0 +1,262 @@
+"""Weisfeiler-Lehman colours, graph hashes and exact isomorphism checks.
+
+Colours are plain int hashes of (own colour, sorted neighbour colours),
+so they mean the same thing in every graph and every process (ints and
+tuples of ints hash the same way regardless of PYTHONHASHSEED). Two
+isomorphic levels therefore always get the same wl_hash(); equal hashes are
+only a hint, and find_mapping() settles it exactly by backtracking over
+colour-compatible vertices.
+
+canonical_labelling() gives small simple graphs (neighbour bitmasks) a
+certificate that is equal exactly for isomorphic graphs, for the
+enumerator to tell classes apart without pairwise checks.
+"""
+from collections import deque
+
+
+def adjacency_lists(graph):
+    """Neighbour indices of every vertex, one entry per incident edge end."""
+    offsets, neighbors = graph.csr()
+    return [neighbors[offsets[v]:offsets[v + 1]].tolist() for v in range(len(graph.node_ids))]
+
+
+def refine(graph, adjacency=None):
+    """Stable WL colour of every vertex (index order), comparable across graphs.
+
+    `adjacency` overrides the graph's own neighbour lists, e.g. to colour
+    the graph with one edge left out.
+    """
+    if adjacency is None:
+        adjacency = adjacency_lists(graph)
+    colors = [len(nbrs) for nbrs in adjacency]
+    classes = len(set(colors))
+    while True:
+        refined = [hash((colors[v], tuple(sorted([colors[w] for w in nbrs])))) for v, nbrs in enumerate(adjacency)]
+        count = len(set(refined))
+        if count == classes:
+            return refined
+        colors = refined
+        classes = count
+
+
+def wl_hash(colors, edge_count):
+    """Isomorphism-invariant hash of a graph from its refine() colours."""
+    return hash((len(colors), edge_count, tuple(sorted(colors))))
+
+
+def find_mapping(first, second, first_colors, second_colors, pin=None):
+    """A vertex-index mapping first -> second preserving edge multiplicities,
+    or None. `pin` = (u, c) forces u onto c.
+    """
+    n = len(first_colors)
+    if n != len(second_colors) or len(first.edges) != len(second.edges):
+        return None
+    if sorted(first_colors) != sorted(second_colors):
+        return None
+    first_adjacency = adjacency_lists(first)
+    second_adjacency = adjacency_lists(second)
+
+    by_color = {}
+    for c, color in enumerate(second_colors):
+        by_color.setdefault(color, []).append(c)
+
+    # Breadth-first from the pinned vertex, or from one in the smallest
+    # colour class, so each new vertex is usually tied to a mapped one.
+    if n == 0:
+        return {}
+    if pin is not None:
+        root = pin[0]
+    else:
+        sizes = {}
+        for color in first_colors:
+            sizes[color] = sizes.get(color, 0) + 1
+        root = min(range(n), key=lambda v: sizes[first_colors[v]])
+    order = []
+    seen = set()
+    for start in [root] + list(range(n)):
+        if start in seen:
+            continue
+        seen.add(start)
+        k = len(order)
+        order.append(start)
+        while k < len(order):
+            v = order[k]
+            for w in first_adjacency[v]:
+                if w not in seen:
+                    seen.add(w)
+                    order.append(w)
+            k += 1
+
+    image = {}
+    taken = set()
+
+    def fits(u, c):
+        # Same colour means same degree, so comparing the edges to already
+        # mapped vertices (and loops) on both sides is enough.
+        wanted = {}
+        for x in first_adjacency[u]:
+            if x == u:
+                wanted[-1] = wanted.get(-1, 0) + 1
+            elif x in image:
+                y = image[x]
+                wanted[y] = wanted.get(y, 0) + 1
+        for y in second_adjacency[c]:
+            if y == c:
+                y = -1
+            elif y not in taken:
+                continue
+            left = wanted.get(y, 0)
+            if not left:
+                return False
+            wanted[y] = left - 1
+        return not any(wanted.values())
+
+    def extend(k):
+        if k == n:
+            return True
+        u = order[k]
+        if k == 0 and pin is not None:
+            candidates = [pin[1]] if second_colors[pin[1]] == first_colors[u] else []
+        else:
+            candidates = by_color.get(first_colors[u], ())
+        for c in candidates:
+            if c not in taken and fits(u, c):
+                image[u] = c
+                taken.add(c)
+                if extend(k + 1):
+                    return True
+                del image[u]
+                taken.discard(c)
+        return False
+
+    return dict(image) if extend(0) else None
+
+
+def _refine_cells(adjacency, cells, splitters):
+    """Refine an ordered partition (list of vertex lists) until every vertex
+    in a cell has the same number of neighbours in every cell, given the
+    vertex masks of the cells it may not yet be equitable against. Cells
+    split in order of those counts and the queue is worked first in, first
+    out, so the result does not depend on labels.
+    """
+    splitters = deque(splitters)
+    while splitters:
+        mask = splitters.popleft()
+        refined = []
+        for cell in cells:
+            if len(cell) == 1:
+                refined.append(cell)
+                continue
+            groups = {}
+            for v in cell:
+                groups.setdefault((adjacency[v] & mask).bit_count(), []).append(v)
+            if len(groups) == 1:
+                refined.append(cell)
+                continue
+            for count in sorted(groups):
+                group = groups[count]
+                refined.append(group)
+                piece = 0
+                for v in group:
+                    piece |= 1 << v
+                splitters.append(piece)
+        cells = refined
+    return cells
+
+
+def canonical_labelling(adjacency):
+    """(certificate, order) of a simple graph given as neighbour bitmasks.
+
+    order[i] is the vertex put at position i, and the certificate is the
+    relabelled graph's adjacency masks as a tuple: two graphs are
+    isomorphic exactly when their certificates are equal. Found by
+    individualisation and refinement, keeping the largest certificate over
+    the leaves of the search tree; subtrees that an automorphism found
+    on the way maps onto explored ones are skipped, so symmetric graphs
+    (stars, cycles, complete graphs) stay cheap.
+    """
+    n = len(adjacency)
+    best = [None, None]
+    first = [None, None]
+    first_prefix = []
+    automorphisms = []
+
+    def certificate(order):
+        position = [0] * n
+        for i, v in enumerate(order):
+            position[v] = i
+        rows = []
+        for v in order:
+            row = 0
+            nbrs = adjacency[v]
+            while nbrs:
+                low = nbrs & -nbrs
+                row |= 1 << position[low.bit_length() - 1]
+                nbrs ^= low
+            rows.append(row)
+        return tuple(rows)
+
+    def orbit_of(prefix, v, explored):
+        # Orbit of v under the automorphisms found so far that fix the prefix.
+        fixing = [g for g in automorphisms if all(g[p] == p for p in prefix)]
+        seen = {v}
+        frontier = [v]
+        while frontier:
+            u = frontier.pop()
+            for g in fixing:
+                w = g[u]
+                if w not in seen:
+                    if w in explored:
+                        return True
+                    seen.add(w)
+                    frontier.append(w)
+        return False
+
+    def search(cells, prefix):
+        """Depth to unwind to after an automorphism of the first leaf, or None."""
+        target = next((cell for cell in cells if len(cell) > 1), None)
+        if target is None:
+            order = [cell[0] for cell in cells]
+            cert = certificate(order)
+            if first[0] is None:
+                first[:] = cert, order
+                first_prefix.extend(prefix)
+                best[:] = cert, order
+                return None
+            for reference in (first, best):
+                if cert == reference[0]:
+                    g = [0] * n
+                    for u, w in zip(reference[1], order):
+                        g[u] = w
+                    automorphisms.append(g)
+                    if reference is first:
+                        # The automorphism maps the first path onto this one,
+                        # so the child where they part is an image of the
+                        # first path's child: unwind to the parting node.
+                        depth = 0
+                        while prefix[depth] == first_prefix[depth]:
+                            depth += 1
+                        return depth
+                    return None
+            if cert > best[0]:
+                best[:] = cert, order
+            return None
+        explored = set()
+        for v in sorted(target):
+            if explored and orbit_of(prefix, v, explored):
+                continue
+            cells_v = []
+            for cell in cells:
+                if cell is target:
+                    cells_v.append([v])
+                    cells_v.append([u for u in cell if u != v])
+                else:
+                    cells_v.append(cell)
+            back = search(_refine_cells(adjacency, cells_v, [1 << v]), prefix + [v])
+            explored.add(v)
+            if back is not None and back < len(prefix):
+                return back
+        return None
+
+    search(_refine_cells(adjacency, [list(range(n))], [(1 << n) - 1]) if n else [], [])
+    return (best[0], best[1]) if n else ((), [])
@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""Place level nodes automatically with a batched force-directed layout.
+
+Takes each level's nodes and edges and returns positions in the [0, 1]
+space Node.position uses, so a new level no longer needs hand-picked
+coordinates. Every level gets --restarts candidate layouts from different
+starts (the first one from planarity.tutte_layout() when the level is
+planar, which is free of crossings before relaxing), and the candidates
+of all levels are relaxed together as one set of flat NumPy arrays,
+Fruchterman-Reingold style:
+
+  repulsion   k^2/d between the nodes of a layout; layouts with more than
+              GRID_NODES nodes use a grid instead, exact between nodes in
+              neighbouring cells and through cell centroids beyond that
+  attraction  d^2/k along every edge
+  angle       edges at a node less than --min-angle degrees apart are
+              rotated away from each other, once the first 30% of the
+              iterations have settled the overall shape
+
+Moves are capped by a temperature that cools linearly. Each candidate is
+then scaled into [0.1, 0.9], rounded to two decimals like the hand-made
+levels, and scored with geometry_levels (crossings, overlaps, edges
+through nodes) and spacing_levels (edge angles, touch distance); the
+candidate with the fewest issues wins. Crossings are penalized there
+rather than by a force: pushing crossing edges apart mostly trades one
+crossing for another, and picking the best of several restarts did better.
+
+Requires numpy.
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from geometry_levels import find_layout_issues
+from graph_core import LevelGraph
+from planarity import tutte_layout
+from spacing_levels import MIN_EDGE_ANGLE_DEGREES, spacing_issues
+from validate_levels import iter_levels
+
+# Layouts with more nodes than this use grid repulsion instead of all pairs.
+GRID_NODES = 64
+# Weight of the angle term against the k-sized FR forces; wherever an
+# angle is too tight, fixing it should win.
+ANGLE_STRENGTH = 300.0
+
+
+def _group_pairs(offsets, sizes):
+    """All pairs (i < j) of rows inside each group [offsets[g], offsets[g] + sizes[g])."""
+    cache = {}
+    firsts = []
+    seconds = []
+    for start, size in zip(offsets.tolist(), sizes.tolist()):
+        if size < 2:
+            continue
+        pairs = cache.get(size)
+        if pairs is None:
+            pairs = cache[size] = np.triu_indices(size, 1)
+        firsts.append(pairs[0] + start)
+        seconds.append(pairs[1] + start)
+    if not firsts:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+class LayoutBatch:
+    """Flat arrays for relaxing many candidate layouts at once.
+
+    Candidate c of graph g is layout g * restarts + c. Node rows of a layout
+    are contiguous and in the graph's node order; edges are stored as node
+    rows, loops and edges to unknown nodes left out.
+    """
+
+    __slots__ = (
+        'restarts', 'count', 'node_offsets', 'node_layout', 'k',
+        'edge_a', 'edge_b', 'edge_layout', 'pair_a', 'pair_b', 'grid', 'pos',
+    )
+
+    def __init__(self, graphs, restarts=8, seed=0):
+        self.restarts = restarts
+        count = self.count = len(graphs) * restarts
+        sizes = np.repeat(np.fromiter((len(nodes) for nodes, _ in graphs), np.int64, len(graphs)), restarts)
+        offsets = self.node_offsets = np.zeros(count + 1, np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        self.node_layout = np.repeat(np.arange(count), sizes)
+        # Ideal edge length for a unit square; the result is rescaled anyway.
+        self.k = 1.0 / np.sqrt(np.maximum(sizes, 1))
+
+        edge_a = []
+        edge_b = []
+        edge_counts = []
+        for g, (nodes, edges) in enumerate(graphs):
+            row = {n: i for i, n in reversed(list(enumerate(nodes)))}
+            local = [(row[a], row[b]) for a, b in edges if a in row and b in row and a != b]
+            for c in range(restarts):
+                base = offsets[g * restarts + c]
+                edge_a.extend(base + a for a, _ in local)
+                edge_b.extend(base + b for _, b in local)
+                edge_counts.append(len(local))
+        edge_counts = np.array(edge_counts, np.int64)
+        self.edge_a = np.array(edge_a, np.int64)
+        self.edge_b = np.array(edge_b, np.int64)
+        self.edge_layout = np.repeat(np.arange(count), edge_counts)
+
+        # Exact repulsion pairs for small layouts, a grid for big ones.
+        self.grid = sizes > GRID_NODES
+        small = ~self.grid
+        self.pair_a, self.pair_b = _group_pairs(offsets[:-1][small], sizes[small])
+
+        # Restart 0 starts from a Tutte embedding when the graph is planar
+        # (jittered, since it can put nodes on top of each other) and on a
+        # circle in node order otherwise; the others start at random.
+        rng = np.random.default_rng(seed)
+        pos = rng.random((int(offsets[-1]), 2))
+        for g, (nodes, edges) in enumerate(graphs):
+            lo, hi = offsets[g * restarts], offsets[g * restarts + 1]
+            start = tutte_layout(LevelGraph(nodes, edges))
+            if start is not None and len(start) == hi - lo:
+                pos[lo:hi] = np.array(start) + rng.normal(0.0, 1e-3, (hi - lo, 2))
+            else:
+                turn = 2 * np.pi * np.arange(hi - lo) / max(hi - lo, 1)
+                pos[lo:hi, 0] = 0.5 + 0.4 * np.cos(turn)
+                pos[lo:hi, 1] = 0.5 + 0.4 * np.sin(turn)
+        self.pos = pos
+
+
+def _exact_repulsion(batch, pos, disp):
+    a = batch.pair_a
+    b = batch.pair_b
+    delta = pos[a] - pos[b]
+    d2 = np.maximum((delta * delta).sum(axis=1), 1e-9)
+    k = batch.k[batch.node_layout[a]]
+    push = delta * (k * k / d2)[:, None]
+    n = len(pos)
+    for axis in (0, 1):
+        disp[:, axis] += np.bincount(a, push[:, axis], n) - np.bincount(b, push[:, axis], n)
+
+
+def _grid_repulsion(batch, pos, disp):
+    """Repulsion for grid layouts: exact against nodes in the 3x3 block of
+    cells around a node, cell centroids for everything further away.
+    """
+    rows = np.flatnonzero(batch.grid[batch.node_layout])
+    if not len(rows):
+        return
+    layout = batch.node_layout[rows]
+    p = pos[rows]
+    count = batch.count
+    lo = np.full((count, 2), np.inf)
+    hi = np.full((count, 2), -np.inf)
+    np.minimum.at(lo, layout, p)
+    np.maximum.at(hi, layout, p)
+    sizes = np.diff(batch.node_offsets)
+    side = np.maximum(np.sqrt(sizes) / 2, 2).astype(np.int64)
+    extent = np.maximum((hi - lo).max(axis=1), 1e-9)
+    cell = np.floor((p - lo[layout]) / (extent / side)[layout][:, None]).astype(np.int64)
+    cell = np.minimum(cell, side[layout][:, None] - 1)
+    # Cells are numbered per layout and shifted by one, so the neighbour
+    # offsets below never wrap into another row or layout.
+    width = int(side.max()) + 2
+    keys = (layout * width + cell[:, 0] + 1) * width + cell[:, 1] + 1
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    p = p[order]
+    rows = rows[order]
+    layout = layout[order]
+    k2 = batch.k[layout] ** 2
+    force = np.zeros_like(p)
+
+    # Near field, both directions, every ordered pair once.
+    index = np.arange(len(keys))
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            target = keys + ox * width + oy
+            begin = np.searchsorted(keys, target, 'left')
+            counts = np.searchsorted(keys, target, 'right') - begin
+            total = int(counts.sum())
+            if not total:
+                continue
+            i = np.repeat(index, counts)
+            j = np.repeat(begin - np.cumsum(counts) + counts, counts) + np.arange(total)
+            delta = p[i] - p[j]
+            d2 = (delta * delta).sum(axis=1)
+            same = d2 == 0
+            push = delta * (k2[i] / np.where(same, 1.0, d2))[:, None]
+            push[same & (i == j)] = 0.0
+            for axis in (0, 1):
+                force[:, axis] += np.bincount(i, push[:, axis], len(keys))
+
+    # Far field from the centroid of every occupied cell outside the block.
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    mass = np.diff(np.r_[starts, len(keys)])
+    centroid = np.add.reduceat(p, starts) / mass[:, None]
+    cell_layout = layout[starts]
+    cell_x = keys[starts] // width % width
+    cell_y = keys[starts] % width
+    bounds = np.searchsorted(cell_layout, np.arange(count + 1))
+    counts = (bounds[1:] - bounds[:-1])[layout]
+    total = int(counts.sum())
+    i = np.repeat(index, counts)
+    c = np.repeat(bounds[:-1][layout] - np.cumsum(counts) + counts, counts) + np.arange(total)
+    far = (np.abs(cell_x[c] - keys[i] // width % width) > 1) | (np.abs(cell_y[c] - keys[i] % width) > 1)
+    i = i[far]
+    c = c[far]
+    delta = p[i] - centroid[c]
+    d2 = np.maximum((delta * delta).sum(axis=1), 1e-9)
+    push = delta * (mass[c] * k2[i] / d2)[:, None]
+    for axis in (0, 1):
+        force[:, axis] += np.bincount(i, push[:, axis], len(keys))
+    disp[rows] += force
+
+
+def _attraction(batch, pos, disp):
+    a = batch.edge_a
+    b = batch.edge_b
+    delta = pos[a] - pos[b]
+    d = np.sqrt((delta * delta).sum(axis=1))
+    pull = delta * (d / batch.k[batch.edge_layout])[:, None]
+    n = len(pos)
+    for axis in (0, 1):
+        disp[:, axis] += np.bincount(b, pull[:, axis], n) - np.bincount(a, pull[:, axis], n)
+
+
+def _angle_spread(batch, pos, disp, min_angle):
+    """Rotate neighbours apart around any node where two consecutive edges
+    are less than `min_angle` degrees apart.
+    """
+    center = np.concatenate([batch.edge_a, batch.edge_b])
+    other = np.concatenate([batch.edge_b, batch.edge_a])
+    arm = pos[other] - pos[center]
+    angles = np.degrees(np.arctan2(arm[:, 1], arm[:, 0]))
+    # One float key sorts by node, then angle; cheaper than lexsort.
+    order = np.argsort(center * 720.0 + angles)
+    center = center[order]
+    other = other[order]
+    arm = arm[order]
+    angles = angles[order]
+    n = len(center)
+    if not n:
+        return
+    starts = np.flatnonzero(np.r_[True, center[1:] != center[:-1]])
+    following = np.arange(1, n + 1)
+    following[np.r_[starts[1:], n] - 1] = starts
+    gap = angles[following] - angles
+    gap[gap <= 0] += 360.0
+    tight = np.flatnonzero((gap < min_angle) & (following != np.arange(n)))
+    if not len(tight):
+        return
+    # Push the earlier arm clockwise and the later one counter-clockwise,
+    # harder the tighter the gap.
+    strength = ANGLE_STRENGTH * (1.0 - gap[tight] / min_angle) * batch.k[batch.node_layout[center[tight]]]
+    for arms, sign in ((tight, -1.0), (following[tight], 1.0)):
+        v = arm[arms]
+        length = np.maximum(np.sqrt((v * v).sum(axis=1)), 1e-9)
+        tangent = np.stack([-v[:, 1], v[:, 0]], axis=1) / length[:, None]
+        push = sign * tangent * strength[:, None]
+        for axis in (0, 1):
+            disp[:, axis] += np.bincount(other[arms], push[:, axis], len(pos))
+
+
+def relax(batch, iterations=300, min_angle=MIN_EDGE_ANGLE_DEGREES):
+    """Run the relaxation on batch.pos in place."""
+    pos = batch.pos
+    n = len(pos)
+    k = batch.k[batch.node_layout]
+    has_grid = bool(batch.grid.any())
+    for step in range(iterations):
+        progress = step / max(iterations - 1, 1)
+        disp = np.zeros((n, 2))
+        _exact_repulsion(batch, pos, disp)
+        if has_grid:
+            _grid_repulsion(batch, pos, disp)
+        _attraction(batch, pos, disp)
+        # Shape first, then open up tight angles once it has settled.
+        if progress >= 0.3:
+            _angle_spread(batch, pos, disp, min_angle)
+        length = np.maximum(np.sqrt((disp * disp).sum(axis=1)), 1e-12)
+        limit = k * (0.25 * (1.0 - progress) + 0.005)
+        pos += disp * (np.minimum(length, limit) / length)[:, None]
+
+
+def normalized(batch):
+    """Positions of every layout scaled into [0.1, 0.9] (aspect kept, the
+    shorter side centred) and rounded to two decimals.
+    """
+    pos = batch.pos
+    layout = batch.node_layout
+    lo = np.full((batch.count, 2), np.inf)
+    hi = np.full((batch.count, 2), -np.inf)
+    np.minimum.at(lo, layout, pos)
+    np.maximum.at(hi, layout, pos)
+    extent = hi - lo
+    scale = 0.8 / np.maximum(extent.max(axis=1), 1e-9)
+    margin = (0.8 - extent * scale[:, None]) / 2
+    placed = 0.1 + margin[layout] + (pos - lo[layout]) * scale[layout][:, None]
+    return np.round(placed, 2)
+
+
+def layout_graphs(graphs, restarts=8, iterations=300, seed=0, min_angle=MIN_EDGE_ANGLE_DEGREES):
+    """[(positions, issue count)] for each (nodes, edges) in `graphs`, the
+    positions being the best of `restarts` relaxed candidates.
+    """
+    if not graphs:
+        return []
+    batch = LayoutBatch(graphs, restarts, seed)
+    relax(batch, iterations, min_angle)
+    placed = normalized(batch).tolist()
+    offsets = batch.node_offsets.tolist()
+
+    candidates = []
+    for layout in range(batch.count):
+        nodes, edges = graphs[layout // restarts]
+        positions = [tuple(p) for p in placed[offsets[layout]:offsets[layout + 1]]]
+        candidates.append({'id': layout + 1, 'name': '', 'nodes': nodes, 'positions': positions, 'edges': edges})
+    # Candidate ids are only positions in the batch; every one must pass.
+    spacing = spacing_issues(candidates, min_angle, angles_from=1)
+
+    results = []
+    for g in range(len(graphs)):
+        best = None
+        for layout in range(g * restarts, (g + 1) * restarts):
+            score = len(spacing[layout]) + len(find_layout_issues(candidates[layout]))
+            if best is None or score < best[1]:
+                best = (candidates[layout]['positions'], score)
+            if score == 0:
+                break
+        results.append(best)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('-o', '--output', help="write the relaid levels here as JSON Lines")
+    parser.add_argument('--restarts', type=int, default=8, metavar='N', help="candidate layouts per level")
+    parser.add_argument('--iterations', type=int, default=300, metavar='N')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--min-angle', type=float, default=MIN_EDGE_ANGLE_DEGREES, metavar='DEG')
+    parser.add_argument('--batch', type=int, default=1024, metavar='N', help="levels relaxed together")
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else None
+    count = 0
+    clean = 0
+    levels = iter_levels(args.filepath)
+    try:
+        while True:
+            chunk = [level for _, level in zip(range(args.batch), levels)]
+            if not chunk:
+                break
+            graphs = [(level['nodes'], level['edges']) for level in chunk]
+            results = layout_graphs(graphs, args.restarts, args.iterations, args.seed + count, args.min_angle)
+            for level, (positions, issues) in zip(chunk, results):
+                count += 1
+                clean += not issues
+                if out:
+                    record = {key: level[key] for key in ('id', 'name', 'nodes', 'edges', 'valid_starts', 'first_edge')}
+                    record['positions'] = positions
+                    out.write(json.dumps(record, separators=(',', ':')))
+                    out.write('\n')
+                else:
+                    placed = ', '.join(f"({n}, {x:g}, {y:g})" for n, (x, y) in zip(level['nodes'], positions))
+                    print(f"Level {level['id']} ({level['name']}) - {issues} layout issues")
+                    print(f"  [{placed}]")
+    finally:
+        if out:
+            out.close()
+
+    print(f"\nTotal: {count} levels, {clean} laid out without issues")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""On-disk cache of per-level validation results.
+
+Each level is keyed by a hash of its source text (its span, Level( to
+the closing paren) together with the validator version. Whitespace is
+collapsed in the key line by line, and string literals are hashed again
+byte for byte, so reindenting a level keeps its entry but a name or hint
+text that differs by a space does not; newlines are kept, since one ends a
+// comment. The spans come from a pass that reads comments and unclosed
+blocks exactly as an uncached run does but parses nothing, and only a
+level whose key is not cached is parsed and validated; editing one level
+only invalidates its own entry, and changing the checks invalidates
+everything.
+
+The store is a SQLite file: concurrent runs are serialized by SQLite's own
+locking, and the least recently used entries are evicted once the cache
+grows past its size bound.
+"""
+import hashlib
+import re
+import sqlite3
+import time
+
+# A one-line string literal.
+_STRING_LITERAL = re.compile(rb'"[^"\\\n]*(?:\\.[^"\\\n]*)*"')
+# Bump whenever the way keys are derived changes, so entries stored under
+# the old scheme can never be hit by accident.
+_KEY_FORMAT = 3
+
+
+def level_key(source, version):
+    # The scanner reads any run of whitespace alike, except that a newline
+    # ends a // comment; literals, where every byte counts, follow verbatim.
+    # bytes.split() keeps this in C, where a regex substitution was most of
+    # the cost of a warm run.
+    collapsed = b'\n'.join([b' '.join(line.split()) for line in source.split(b'\n')])
+    digest = hashlib.sha256(f'{_KEY_FORMAT}:{version}:{len(collapsed)}'.encode())
+    digest.update(b'\0')
+    digest.update(collapsed)
+    digest.update(b''.join(_STRING_LITERAL.findall(source)))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """SQLite-backed level key -> level summary store with LRU eviction.
+
+    A cached entry is (level_id, name, node_count, edge_count, issues).
+    """
+
+    def __init__(self, path, max_entries=100_000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS chunks ('
+            ' key TEXT PRIMARY KEY,'
+            ' level_id INTEGER,'
+            ' name TEXT,'
+            ' node_count INTEGER,'
+            ' edge_count INTEGER,'
+            ' issues TEXT,'
+            ' last_used REAL NOT NULL)'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS chunks_last_used ON chunks (last_used)')
+
+    def get_many(self, keys):
+        """{key: entry} for the keys already cached; marks them as used."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), 500):
+            batch = unique[i:i + 500]
+            rows = self.conn.execute(
+                'SELECT key, level_id, name, node_count, edge_count, issues FROM chunks'
+                f' WHERE key IN ({",".join("?" * len(batch))})', batch)
+            for key, level_id, name, node_count, edge_count, issues in rows:
+                # Issues are single-line messages, stored newline-joined.
+                found[key] = (level_id, name, node_count, edge_count, issues.split('\n') if issues else [])
+
+        now = time.time()
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany('UPDATE chunks SET last_used = ? WHERE key = ?', ((now, key) for key in found))
+        return found
+
+    def count(self, hits, misses):
+        """Add to the hit and miss counts stats() reports."""
+        self.hits += hits
+        self.misses += misses
+
+    def put_many(self, items):
+        """Store (key, entry) pairs, then evict down to max_entries."""
+        now = time.time()
+        rows = (
+            (key, entry[0], entry[1], entry[2], entry[3], '\n'.join(entry[4]), now)
+            for key, entry in items
+        )
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            self.conn.executemany('INSERT OR REPLACE INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+            (count,) = self.conn.execute('SELECT COUNT(*) FROM chunks').fetchone()
+            excess = count - self.max_entries
+            if excess > 0:
+                self.conn.execute(
+                    'DELETE FROM chunks WHERE key IN'
+                    ' (SELECT key FROM chunks ORDER BY last_used LIMIT ?)', (excess,))
+                self.evicted += excess
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = 100.0 * self.hits / total if total else 0.0
+        return f"Cache: {self.hits} hits, {self.misses} misses ({rate:.1f}% hit rate), {self.evicted} evicted"
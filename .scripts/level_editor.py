@@ -0,0 +1,452 @@
+"""Editable level state for an interactive editor backend.
+
+EditableLevel takes a parsed level record and applies edits (add, remove
+and move nodes, add, remove and move edges, set the hints), each of which
+can be undone and redone. Everything validate_level looks at is kept up to
+date as the edits come in instead of being recomputed:
+
+  degrees, odd set   a dict and a set, adjusted for the two ends of an edge
+  duplicates         a count per node pair
+  connectivity       union-find with rollback over the edges in the order
+                     they were added (union by size, no path compression,
+                     so every union can be undone), each vertex counting
+                     the existing nodes below it
+
+Undoing an add is the last union and rolls straight back. Removing any
+other edge that joined two components rolls the union-find back to just
+before it and replays the edges added since, which for a level's few
+dozen edges is a handful of unions; removing an edge that closed a cycle
+costs nothing. So status, odd_nodes, is_connected and is_valid are
+available right after every edit, and issues() gives the exact messages
+validate_level would for level().
+
+Node and edge order are kept through undo by giving every node and edge
+a serial number, which level() sorts by.
+"""
+
+
+class _Edit:
+    """One undoable step: primitive operations applied in order."""
+
+    __slots__ = ('name', 'ops')
+
+    def __init__(self, name):
+        self.name = name
+        self.ops = []
+
+
+class EditableLevel:
+    """A level under edit; see the module docstring."""
+
+    def __init__(self, level):
+        self.id = level['id']
+        self.name = level['name']
+        self.valid_starts = list(level['valid_starts'])
+        self.first_edge = tuple(level['first_edge']) if level.get('first_edge') else None
+        self.steps = list(level.get('steps', ()))
+        self._serial = 0
+        self._nodes = {}
+        self._edges = {}
+        self._pairs = {}
+        self.degree = {}
+        self._odd = set()
+        self.duplicate_count = 0
+        self.invalid_ref_count = 0
+        # Union-find over vertex indices; an index, once given to an id,
+        # is kept for it even while the node is deleted.
+        self._index = {}
+        self._parent = []
+        self._size = []
+        self._real = []
+        self._log = []
+        self._log_at = {}
+        self.components = 0
+        self._undo = []
+        self._redo = []
+
+        positions = level.get('positions') or [None] * len(level['nodes'])
+        for node, position in zip(level['nodes'], positions):
+            if node not in self._nodes:
+                self._add_node(node, position, self._next())
+        for a, b in level['edges']:
+            self._add_edge(self._next(), a, b)
+
+    def _next(self):
+        self._serial += 1
+        return self._serial
+
+    # Union-find with rollback.
+
+    def _vertex(self, node):
+        i = self._index.get(node)
+        if i is None:
+            i = self._index[node] = len(self._parent)
+            self._parent.append(i)
+            self._size.append(1)
+            self._real.append(0)
+        return i
+
+    def _find(self, i):
+        parent = self._parent
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    def _union(self, serial, ia, ib):
+        ra, rb = self._find(ia), self._find(ib)
+        merged = None
+        if ra != rb:
+            if self._size[ra] > self._size[rb]:
+                ra, rb = rb, ra
+            self._parent[ra] = rb
+            self._size[rb] += self._size[ra]
+            if self._real[ra] and self._real[rb]:
+                self.components -= 1
+            self._real[rb] += self._real[ra]
+            merged = (ra, rb)
+        self._log_at[serial] = len(self._log)
+        self._log.append([serial, ia, ib, merged])
+
+    def _rollback(self, entry):
+        merged = entry[3]
+        if merged is not None:
+            ra, rb = merged
+            self._parent[ra] = ra
+            self._size[rb] -= self._size[ra]
+            self._real[rb] -= self._real[ra]
+            if self._real[ra] and self._real[rb]:
+                self.components += 1
+
+    def _disconnect(self, serial):
+        at = self._log_at.pop(serial)
+        entry = self._log[at]
+        if entry[3] is None:
+            # Closed a cycle: the spanning forest does not use it.
+            entry[0] = None
+            return
+        later = self._log[at + 1:]
+        for undone in reversed(later):
+            self._rollback(undone)
+        self._rollback(entry)
+        del self._log[at:]
+        for replayed in later:
+            if replayed[0] is not None:
+                self._union(*replayed[:3])
+
+    def _set_real(self, i, delta):
+        # Every vertex holds the count of real nodes in its own subtree, not
+        # just the root, so a rollback splits the count where it belongs
+        # even when nodes were added or removed since the union.
+        parent = self._parent
+        real = self._real
+        real[i] += delta
+        while parent[i] != i:
+            i = parent[i]
+            real[i] += delta
+        before = real[i] - delta
+        if not before:
+            self.components += 1
+        elif not real[i]:
+            self.components -= 1
+
+    # Primitive operations, each the inverse of another.
+
+    def _add_node(self, node, position, serial):
+        self._nodes[node] = (serial, position)
+        self._set_real(self._vertex(node), 1)
+        d = self.degree.get(node, 0)
+        self.degree[node] = d
+        self.invalid_ref_count -= d
+        if d & 1:
+            self._odd.add(node)
+
+    def _remove_node(self, node):
+        serial, position = self._nodes.pop(node)
+        self._set_real(self._index[node], -1)
+        self._odd.discard(node)
+        d = self.degree[node]
+        self.invalid_ref_count += d
+        if not d:
+            del self.degree[node]
+        return serial, position
+
+    def _bump(self, node, delta):
+        d = self.degree.get(node, 0) + delta
+        if d or node in self._nodes:
+            self.degree[node] = d
+        else:
+            del self.degree[node]
+        if node in self._nodes:
+            if d & 1:
+                self._odd.add(node)
+            else:
+                self._odd.discard(node)
+        else:
+            self.invalid_ref_count += delta
+
+    def _add_edge(self, serial, a, b):
+        self._edges[serial] = (a, b)
+        key = (a, b) if a <= b else (b, a)
+        count = self._pairs.get(key, 0)
+        self._pairs[key] = count + 1
+        if count:
+            self.duplicate_count += 1
+        self._bump(a, 1)
+        self._bump(b, 1)
+        self._union(serial, self._vertex(a), self._vertex(b))
+
+    def _remove_edge(self, serial):
+        a, b = self._edges.pop(serial)
+        key = (a, b) if a <= b else (b, a)
+        count = self._pairs[key] - 1
+        if count:
+            self._pairs[key] = count
+            self.duplicate_count -= 1
+        else:
+            del self._pairs[key]
+        self._bump(a, -1)
+        self._bump(b, -1)
+        self._disconnect(serial)
+        return a, b
+
+    def _apply(self, op):
+        kind = op[0]
+        if kind == 'add_node':
+            self._add_node(op[1], op[2], op[3])
+        elif kind == 'remove_node':
+            self._remove_node(op[1])
+        elif kind == 'move_node':
+            serial, _ = self._nodes[op[1]]
+            self._nodes[op[1]] = (serial, op[3])
+        elif kind == 'add_edge':
+            self._add_edge(op[1], op[2], op[3])
+        elif kind == 'remove_edge':
+            self._remove_edge(op[1])
+        elif kind == 'hints':
+            self.valid_starts, self.first_edge = list(op[3][0]), op[3][1]
+
+    @staticmethod
+    def _inverse(op):
+        kind = op[0]
+        if kind == 'add_node':
+            return ('remove_node', op[1], op[2], op[3])
+        if kind == 'remove_node':
+            return ('add_node', op[1], op[2], op[3])
+        if kind == 'move_node':
+            return ('move_node', op[1], op[3], op[2])
+        if kind == 'add_edge':
+            return ('remove_edge', op[1], op[2], op[3])
+        if kind == 'remove_edge':
+            return ('add_edge', op[1], op[2], op[3])
+        return ('hints', None, op[3], op[2])
+
+    def _do(self, edit, op):
+        self._apply(op)
+        edit.ops.append(op)
+
+    def _commit(self, edit):
+        self._undo.append(edit)
+        self._redo.clear()
+        return edit.name
+
+    # Edits.
+
+    def add_node(self, node, position=None):
+        if node in self._nodes:
+            raise ValueError(f"node {node} already exists")
+        edit = _Edit(f"add node {node}")
+        self._do(edit, ('add_node', node, position, self._next()))
+        return self._commit(edit)
+
+    def remove_node(self, node):
+        """Remove a node and every edge touching it, as one step."""
+        if node not in self._nodes:
+            raise ValueError(f"no node {node}")
+        edit = _Edit(f"remove node {node}")
+        for serial, (a, b) in sorted(self._edges.items(), reverse=True):
+            if a == node or b == node:
+                self._do(edit, ('remove_edge', serial, a, b))
+        serial, position = self._nodes[node]
+        self._do(edit, ('remove_node', node, position, serial))
+        return self._commit(edit)
+
+    def move_node(self, node, position):
+        if node not in self._nodes:
+            raise ValueError(f"no node {node}")
+        edit = _Edit(f"move node {node}")
+        self._do(edit, ('move_node', node, self._nodes[node][1], position))
+        return self._commit(edit)
+
+    def _check_edge(self, a, b):
+        for node in (a, b):
+            if node not in self._nodes:
+                raise ValueError(f"no node {node}")
+        if a == b:
+            raise ValueError(f"an edge needs two different nodes, got ({a},{b})")
+
+    def _find_edge(self, a, b):
+        """Serial of the latest edge joining a and b, either way round."""
+        for serial in sorted(self._edges, reverse=True):
+            if self._edges[serial] in ((a, b), (b, a)):
+                return serial
+        raise ValueError(f"no edge ({a},{b})")
+
+    def add_edge(self, a, b):
+        self._check_edge(a, b)
+        edit = _Edit(f"add edge ({a},{b})")
+        self._do(edit, ('add_edge', self._next(), a, b))
+        return self._commit(edit)
+
+    def remove_edge(self, a, b):
+        serial = self._find_edge(a, b)
+        edit = _Edit(f"remove edge ({a},{b})")
+        self._do(edit, ('remove_edge', serial, *self._edges[serial]))
+        return self._commit(edit)
+
+    def move_edge(self, old, new):
+        """Replace edge `old` by `new` (both (a, b) pairs) in its place in the list."""
+        serial = self._find_edge(*old)
+        self._check_edge(*new)
+        edit = _Edit(f"move edge ({old[0]},{old[1]}) to ({new[0]},{new[1]})")
+        self._do(edit, ('remove_edge', serial, *self._edges[serial]))
+        self._do(edit, ('add_edge', serial, *new))
+        return self._commit(edit)
+
+    def set_hints(self, valid_starts=None, first_edge=False):
+        """Change validStartNodeIds and/or firstEdge (None clears it)."""
+        old = (tuple(self.valid_starts), self.first_edge)
+        new = (tuple(self.valid_starts if valid_starts is None else valid_starts),
+               old[1] if first_edge is False else tuple(first_edge) if first_edge else None)
+        edit = _Edit("set hints")
+        self._do(edit, ('hints', None, old, new))
+        return self._commit(edit)
+
+    def sync_hints(self):
+        """Set validStartNodeIds to start_nodes (and keep firstEdge)."""
+        return self.set_hints(valid_starts=self.start_nodes)
+
+    def undo(self):
+        """Undo the last edit; returns its name, or None if there is none."""
+        if not self._undo:
+            return None
+        edit = self._undo.pop()
+        for op in reversed(edit.ops):
+            self._apply(self._inverse(op))
+        self._redo.append(edit)
+        return edit.name
+
+    def redo(self):
+        if not self._redo:
+            return None
+        edit = self._redo.pop()
+        for op in edit.ops:
+            self._apply(op)
+        self._undo.append(edit)
+        return edit.name
+
+    # State.
+
+    @property
+    def nodes(self):
+        return sorted(self._nodes, key=lambda node: self._nodes[node][0])
+
+    @property
+    def edges(self):
+        return [self._edges[serial] for serial in sorted(self._edges)]
+
+    @property
+    def odd_nodes(self):
+        return sorted(self._odd)
+
+    @property
+    def is_connected(self):
+        return self.components <= 1
+
+    @property
+    def status(self):
+        """'circuit' or 'path' when the edges can be drawn in one line, else None."""
+        if self.invalid_ref_count or self.duplicate_count or not self.is_connected:
+            return None
+        if not self._odd:
+            return 'circuit'
+        return 'path' if len(self._odd) == 2 else None
+
+    @property
+    def start_nodes(self):
+        """What validStartNodeIds should be: the odd nodes of a path, every
+        node of a circuit, none otherwise.
+        """
+        status = self.status
+        if status == 'circuit':
+            return self.nodes
+        return self.odd_nodes if status == 'path' else []
+
+    def _hints_ok(self):
+        odd = len(self._odd)
+        if odd == 0 and set(self.valid_starts) != self._nodes.keys():
+            return False
+        if odd == 2 and set(self.valid_starts) != self._odd:
+            return False
+        if self.first_edge:
+            a, b = self.first_edge
+            return ((a, b) if a <= b else (b, a)) in self._pairs
+        return True
+
+    @property
+    def is_valid(self):
+        """validate_level(self.level()) == [], without building the level."""
+        return self.status is not None and self._hints_ok()
+
+    def issues(self):
+        """validate_level's messages for level(), from the kept state."""
+        issues = []
+        edges = self.edges
+        nodes = self._nodes
+        for a, b in edges:
+            for bad in (a, b):
+                if bad not in nodes:
+                    issues.append(f"Edge ({a},{b}) references invalid node {bad}")
+        seen = set()
+        for a, b in edges:
+            key = (a, b) if a <= b else (b, a)
+            if key in seen:
+                issues.append(f"Duplicate edge ({a},{b})")
+            seen.add(key)
+
+        odd_count = len(self._odd)
+        if odd_count != 0 and odd_count != 2:
+            issues.append(f"Has {odd_count} odd-degree nodes (need 0 or 2): {self.odd_nodes}")
+            issues.append(f"  Degrees: {dict(sorted(self.degree.items()))}")
+
+        if nodes and not self.is_connected:
+            root = self._find(self._index[min(nodes)])
+            unreachable = sorted(node for node in nodes if self._find(self._index[node]) != root)
+            issues.append(f"Not connected. Unreachable nodes: {unreachable}")
+
+        valid_starts = set(self.valid_starts)
+        if odd_count == 0:
+            if valid_starts != nodes.keys():
+                issues.append(f"Circuit but validStartNodeIds={sorted(valid_starts)} != all nodes {sorted(nodes)}")
+        elif odd_count == 2:
+            if valid_starts != self._odd:
+                issues.append(f"Path: odd nodes={self.odd_nodes} but validStartNodeIds={sorted(valid_starts)}")
+
+        if self.first_edge:
+            a, b = self.first_edge
+            if ((a, b) if a <= b else (b, a)) not in self._pairs:
+                issues.append(f"firstEdge ({a},{b}) not found in edges")
+        return issues
+
+    def level(self):
+        """The current level as a record in the parser's shape."""
+        nodes = self.nodes
+        return {
+            'id': self.id,
+            'name': self.name,
+            'nodes': nodes,
+            'positions': [self._nodes[node][1] for node in nodes],
+            'edges': self.edges,
+            'valid_starts': list(self.valid_starts),
+            'first_edge': self.first_edge,
+            'steps': list(self.steps),
+        }
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""Write and read levels as a compact binary pack (.lfpack).
+
+A pack is one little-endian file: a header, then sections, each starting
+on a 4-byte boundary so it can be viewed in place as a typed array.
+
+  header          magic b'LFPK', uint16 version, uint16 flags (0), uint32
+                  level count, uint32 CRC-32 of every byte after the header,
+                  then (uint32 offset, uint32 size) for each section below
+  index           (uint32 id, uint32 row) per level, sorted by id
+  levels          one LEVEL record per level, in source order
+  node_ids        uint16 per node
+  positions       uint16 x, uint16 y per node, fixed point over [0, 1]
+                  (value = q / POSITION_SCALE); NO_POSITION in both for a
+                  node whose Offset wasn't two literals
+  edges           uint16 a, uint16 b per edge
+  starts          uint16 per valid start node
+  steps           uint32 text, uint16 flags (1 = showValidStarts,
+                  2 = showFirstEdge), uint16 0 per hint step
+  string_offsets  uint32 per string, plus one for the end
+  strings         UTF-8 text of the string table (names and step texts,
+                  each stored once, as the Kotlin literal bodies the
+                  parser yields, escapes and all)
+
+A LEVEL record is uint32 id, name, node_start, edge_start, start_start,
+step_start, then uint16 node_count, edge_count, start_count, step_count,
+first_a, first_b. Every level's nodes, edges, starts and steps are
+consecutive and in level order, so each *_start is the running total of
+the counts before it; first_a = first_b = NO_NODE means no firstEdge.
+Node ids must be below NO_NODE and counts fit in 16 bits.
+
+LevelPack maps the file and reads straight out of typed memoryviews over
+it; validate_level_pack() hands the same bytes to batch_validate as NumPy
+views, so the checks the app would rely on run against exactly what ships.
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+from validate_levels import iter_levels
+
+MAGIC = b'LFPK'
+PACK_VERSION = 2
+NO_NODE = 0xFFFF
+NO_POSITION = 0xFFFF
+POSITION_SCALE = 0xFFFE
+
+_SECTIONS = (
+    'index', 'levels', 'node_ids', 'positions', 'edges', 'starts', 'steps', 'string_offsets', 'strings',
+)
+_HEADER = struct.Struct('<4sHHII' + 'II' * len(_SECTIONS))
+_LEVEL = struct.Struct('<6I6H')
+_STEP = struct.Struct('<IHH')
+_LEVEL_FIELDS = (
+    'id', 'name', 'node_start', 'edge_start', 'start_start', 'step_start',
+    'node_count', 'edge_count', 'start_count', 'step_count', 'first_a', 'first_b',
+)
+_SHOW_STARTS = 1
+_SHOW_FIRST = 2
+
+
+def _little(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _fixed(value, level):
+    if not 0.0 <= value <= 1.0:
+        raise ValueError(f"Level {level['id']}: position {value} is outside [0, 1]")
+    return round(value * POSITION_SCALE)
+
+
+def _id16(value, level, what):
+    if not 0 <= value < NO_NODE:
+        raise ValueError(f"Level {level['id']}: {what} {value} does not fit the pack")
+    return value
+
+
+def build_pack(levels):
+    """The bytes of a pack holding `levels` (parser-shaped records)."""
+    strings = {}
+    rows = []
+    node_ids = array('H')
+    positions = array('H')
+    edges = array('H')
+    starts = array('H')
+    steps = array('B')
+
+    def string(text):
+        return strings.setdefault(text, len(strings))
+
+    for level in levels:
+        nodes = level['nodes']
+        counts = (len(nodes), len(level['edges']), len(level['valid_starts']), len(level.get('steps') or ()))
+        if max(counts) > 0xFFFF:
+            raise ValueError(f"Level {level['id']}: more than 65535 nodes, edges, starts or steps")
+        first = level.get('first_edge')
+        first = [_id16(n, level, 'firstEdge node') for n in first] if first else (NO_NODE, NO_NODE)
+        rows.append(_LEVEL.pack(
+            level['id'], string(level['name']),
+            len(node_ids), len(edges) // 2, len(starts), len(steps) // _STEP.size,
+            *counts, *first,
+        ))
+        node_ids.extend(_id16(n, level, 'node id') for n in nodes)
+        for point in level.get('positions') or [None] * len(nodes):
+            if point is None:
+                positions.extend((NO_POSITION, NO_POSITION))
+            else:
+                positions.extend((_fixed(point[0], level), _fixed(point[1], level)))
+        for a, b in level['edges']:
+            edges.extend((_id16(a, level, 'edge node'), _id16(b, level, 'edge node')))
+        starts.extend(_id16(n, level, 'start node') for n in level['valid_starts'])
+        for text, show_starts, show_first in level.get('steps') or ():
+            flags = (_SHOW_STARTS if show_starts else 0) | (_SHOW_FIRST if show_first else 0)
+            steps.extend(_STEP.pack(string(text), flags, 0))
+
+    ids = [_LEVEL.unpack(row)[0] for row in rows]
+    index = array('I')
+    for row in sorted(range(len(rows)), key=ids.__getitem__):
+        index.extend((ids[row], row))
+    blobs = [text.encode('utf-8') for text in strings]
+    string_offsets = array('I', [0])
+    for blob in blobs:
+        string_offsets.append(string_offsets[-1] + len(blob))
+
+    sections = [
+        _little(index), b''.join(rows), _little(node_ids), _little(positions), _little(edges), _little(starts),
+        steps.tobytes(), _little(string_offsets), b''.join(blobs),
+    ]
+    body = bytearray()
+    table = []
+    for data in sections:
+        body.extend(b'\0' * (-(_HEADER.size + len(body)) % 4))
+        table.extend((_HEADER.size + len(body), len(data)))
+        body.extend(data)
+    header = _HEADER.pack(MAGIC, PACK_VERSION, 0, len(rows), zlib.crc32(body), *table)
+    return header + bytes(body)
+
+
+def write_pack(levels, filepath):
+    """Write `levels` to `filepath` as a pack; returns its size in bytes."""
+    data = build_pack(levels)
+    with open(filepath, 'wb') as f:
+        f.write(data)
+    return len(data)
+
+
+class LevelPack:
+    """A memory-mapped pack. len(), indexing and iteration give level records
+    in the parser's shape; find() looks one up by id through the index.
+    """
+
+    def __init__(self, filepath):
+        if sys.byteorder != 'little':
+            raise ValueError("level packs are read in place and need a little-endian host")
+        self._file = open(filepath, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._file.close()
+            raise ValueError(f"{filepath}: too short for a level pack")
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        fields = _HEADER.unpack_from(self.buf)
+        magic, self.version, _, self.count, self.crc = fields[:5]
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filepath}: not a level pack")
+        if self.version != PACK_VERSION:
+            self.close()
+            raise ValueError(f"{filepath}: pack version {self.version}, expected {PACK_VERSION}")
+        self.sections = {}
+        for name, offset, length in zip(_SECTIONS, fields[5::2], fields[6::2]):
+            if offset % 4 or offset + length > size:
+                self.close()
+                raise ValueError(f"{filepath}: section {name} is out of bounds")
+            self.sections[name] = (offset, length)
+
+        whole = memoryview(self.buf)
+        views = {}
+        for name, code in (('index', 'I'), ('node_ids', 'H'), ('positions', 'H'), ('edges', 'H'),
+                           ('starts', 'H'), ('string_offsets', 'I')):
+            offset, length = self.sections[name]
+            views[name] = whole[offset:offset + length - length % array(code).itemsize].cast(code)
+        for name in ('levels', 'steps', 'strings'):
+            offset, length = self.sections[name]
+            views[name] = whole[offset:offset + length]
+        whole.release()
+        self._views = views
+
+    def close(self):
+        for view in getattr(self, '_views', {}).values():
+            view.release()
+        self._views = {}
+        if getattr(self, 'buf', None) is not None:
+            self.buf.close()
+            self.buf = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def string(self, k):
+        offsets = self._views['string_offsets']
+        return bytes(self._views['strings'][offsets[k]:offsets[k + 1]]).decode('utf-8')
+
+    def row(self, i):
+        """The LEVEL record of level row `i` as a dict of its fields."""
+        return dict(zip(_LEVEL_FIELDS, _LEVEL.unpack_from(self._views['levels'], i * _LEVEL.size)))
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        row = self.row(i)
+        views = self._views
+        n, e, s = row['node_start'], row['edge_start'], row['start_start']
+        positions = views['positions'][2 * n:2 * (n + row['node_count'])].tolist()
+        flat = views['edges'][2 * e:2 * (e + row['edge_count'])].tolist()
+        steps = []
+        for k in range(row['step_start'], row['step_start'] + row['step_count']):
+            text, flags, _ = _STEP.unpack_from(views['steps'], k * _STEP.size)
+            steps.append((self.string(text), bool(flags & _SHOW_STARTS), bool(flags & _SHOW_FIRST)))
+        return {
+            'id': row['id'],
+            'name': self.string(row['name']),
+            'nodes': views['node_ids'][n:n + row['node_count']].tolist(),
+            'positions': [
+                None if x == NO_POSITION else (x / POSITION_SCALE, y / POSITION_SCALE)
+                for x, y in zip(positions[::2], positions[1::2])
+            ],
+            'edges': list(zip(flat[::2], flat[1::2])),
+            'valid_starts': views['starts'][s:s + row['start_count']].tolist(),
+            'first_edge': None if row['first_a'] == NO_NODE else (row['first_a'], row['first_b']),
+            'steps': steps,
+        }
+
+    def __iter__(self):
+        return (self[i] for i in range(self.count))
+
+    def find(self, level_id):
+        """The first level with this id, or None; a binary search of the index."""
+        index = self._views['index']
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if index[2 * mid] < level_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and index[2 * lo] == level_id:
+            return self[index[2 * lo + 1]]
+        return None
+
+    def verify(self):
+        """Problems with the pack's own structure (not its levels), as messages."""
+        problems = []
+        with memoryview(self.buf) as whole, whole[_HEADER.size:] as body:
+            crc = zlib.crc32(body)
+        if crc != self.crc:
+            problems.append("CRC mismatch: the pack is corrupt or was modified")
+        expected = {
+            'index': 8 * self.count, 'levels': _LEVEL.size * self.count,
+        }
+        for name, size in expected.items():
+            if self.sections[name][1] != size:
+                problems.append(f"Section {name} is {self.sections[name][1]} bytes, expected {size}")
+        if problems:
+            return problems
+
+        totals = {'node': 0, 'edge': 0, 'start': 0, 'step': 0}
+        strings = len(self._views['string_offsets']) - 1
+        for i in range(self.count):
+            row = self.row(i)
+            for kind in totals:
+                if row[f'{kind}_start'] != totals[kind]:
+                    problems.append(f"Level row {i}: {kind}_start {row[f'{kind}_start']}, expected {totals[kind]}")
+                totals[kind] += row[f'{kind}_count']
+            if not 0 <= row['name'] < strings:
+                problems.append(f"Level row {i}: name string {row['name']} out of range")
+        sizes = {
+            'node': (len(self._views['node_ids']), len(self._views['positions']) // 2),
+            'edge': (len(self._views['edges']) // 2,),
+            'start': (len(self._views['starts']),),
+            'step': (len(self._views['steps']) // _STEP.size,),
+        }
+        for kind, lengths in sizes.items():
+            if any(length != totals[kind] for length in lengths):
+                problems.append(f"Levels use {totals[kind]} {kind} entries, sections hold {lengths}")
+        for k in range(len(self._views['steps']) // _STEP.size):
+            text, _, _ = _STEP.unpack_from(self._views['steps'], k * _STEP.size)
+            if not 0 <= text < strings:
+                problems.append(f"Hint step {k}: text string {text} out of range")
+
+        index = self._views['index']
+        ids = index[0::2].tolist()
+        rows = index[1::2].tolist()
+        if ids != sorted(ids):
+            problems.append("Index is not sorted by id")
+        if sorted(rows) != list(range(self.count)):
+            problems.append("Index does not cover every level exactly once")
+        elif any(self.row(r)['id'] != level_id for level_id, r in zip(ids, rows)):
+            problems.append("Index ids disagree with the level records")
+        return problems
+
+
+def packed_levels(pack):
+    """batch_validate.PackedLevels over the pack's own bytes: node, edge and
+    start arrays are uint16 NumPy views of the mapping, checked in place.
+    Requires numpy.
+    """
+    import numpy as np
+    from batch_validate import PackedLevels
+
+    def section(name, dtype):
+        offset, length = pack.sections[name]
+        return np.frombuffer(pack.buf, dtype, length // np.dtype(dtype).itemsize, offset)
+
+    rows = section('levels', np.dtype([(name, '<u4' if k < 6 else '<u2') for k, name in enumerate(_LEVEL_FIELDS)]))
+    has_first_edge = rows['first_a'] != NO_NODE
+    return PackedLevels.from_arrays(
+        rows['node_count'], section('node_ids', '<u2'),
+        rows['edge_count'], section('edges', '<u2').reshape(-1, 2),
+        rows['start_count'], section('starts', '<u2'),
+        has_first_edge, np.where(has_first_edge[:, None], np.stack([rows['first_a'], rows['first_b']], axis=1), 0),
+    )
+
+
+def validate_level_pack(pack):
+    """validate_level()-style issue lists for every level of an open pack,
+    checked on the mapped bytes with batch_validate. Requires numpy.
+    """
+    from batch_validate import check_pack, render_issues
+
+    packed = packed_levels(pack)
+    return render_issues(packed, check_pack(packed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+        help="levels to pack (Kotlin source or .jsonl), or the pack to --check",
+    )
+    parser.add_argument('-o', '--output', help="write the levels to this pack")
+    parser.add_argument('--check', action='store_true', help="verify and validate the pack given as filepath")
+    args = parser.parse_args()
+    if not args.check and not args.output:
+        parser.error("give -o PACK to write a pack, or --check to validate one")
+
+    if args.output:
+        levels = list(iter_levels(args.filepath))
+        size = write_pack(levels, args.output)
+        print(f"Wrote {len(levels)} levels to {args.output} ({size} bytes, source {os.path.getsize(args.filepath)} bytes)")
+        return 0
+
+    try:
+        pack = LevelPack(args.filepath)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+    with pack:
+        problems = pack.verify()
+        for problem in problems:
+            print(f"ERROR: {problem}")
+        if problems:
+            print(f"\nTotal: {pack.count} levels, {len(problems)} pack errors")
+            return 1
+        total_issues = 0
+        for i, issues in enumerate(validate_level_pack(pack)):
+            if issues:
+                row = pack.row(i)
+                print(f"Level {row['id']} ({pack.string(row['name'])}) - {row['node_count']} nodes, "
+                      f"{row['edge_count']} edges:")
+                for issue in issues:
+                    print(f"  ERROR: {issue}")
+                print()
+                total_issues += len(issues)
+        print(f"\nTotal: {pack.count} levels, {total_issues} issues")
+        return 1 if total_issues > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""Write changed levels back into a Graph.kt-style source in place.
+
+Every record from validate_levels.scan_levels carries the byte span of its
+Level( ... ) block. patch_file() takes such records (edited, regenerated or
+repaired), checks each against the block currently at its span, and
+splices new text in for the ones that differ; every other byte of the
+file, comments between blocks included, is copied through unchanged.
+Nothing else is parsed or rendered, so patching a few levels costs the
+copy of the file plus the work for those levels. When every new block is
+exactly as long as the old one the file is patched where it lies and
+only the changed bytes are written.
+
+A changed block is patched field by field: the name, node, edge and hint
+step lists, validStartNodeIds and firstEdge are compared with the record
+the block was scanned as, and only the items that differ are rendered,
+so comments and the literals of untouched items are kept. A block this
+cannot follow is rendered whole from its record in Graph.kt's layout
+(render_block()); blocks can also be passed as ready-made text instead
+(see repair_levels --write).
+
+As a command, the levels of --from replace the levels with the same ids
+in the target file.
+"""
+import argparse
+import mmap
+import os
+import re
+import sys
+import tempfile
+from difflib import SequenceMatcher
+
+from validate_levels import iter_levels, scan_levels
+
+# Fields compared to decide whether a level changed; names and step texts
+# are compared by what they spell, so "\u2014" and "—" are the same.
+FIELDS = ('id', 'nodes', 'positions', 'edges', 'valid_starts', 'first_edge')
+COPY_CHUNK = 1 << 20
+
+_STRING_BODY = r'[^"\\\n]*(?:\\.[^"\\\n]*)*'
+_NAME = re.compile(r'\bname\s*=\s*"(' + _STRING_BODY + r')"')
+# Graph.kt also writes some start lists as (0..n).toList().
+_STARTS = re.compile(r'\bvalidStartNodeIds\s*=\s*(?:listOf\([^()]*\)|\([^()]*\)\.toList\(\))')
+_FIRST = re.compile(r'\bfirstEdge\s*=\s*(?:Pair\(\s*\d+\s*,\s*\d+\s*\)|null)')
+# (opening, item) patterns of the three lists, items in the form
+# scan_levels reads them.
+_LISTS = {
+    'nodes': (re.compile(r'\bnodes\s*=\s*listOf\('), re.compile(r'Node\(\s*\d+\s*,\s*Offset\([^()]*\)\s*\)')),
+    'edges': (re.compile(r'\bedges\s*=\s*listOf\('), re.compile(r'Edge\(\s*\d+\s*,\s*\d+\s*\)')),
+    'steps': (re.compile(r'\bsteps\s*=\s*listOf\('), re.compile(r'HintStep\([^()"]*(?:"' + _STRING_BODY + r'"[^()"]*)*\)')),
+}
+# What may stand between list items: separators, whitespace, comments.
+_GAP = re.compile(r'(?:\s+|,|//[^\n]*|/\*[\s\S]*?\*/)*')
+_ESCAPES = {'t': '\t', 'b': '\b', 'n': '\n', 'r': '\r', "'": "'", '"': '"', '\\': '\\', '$': '$'}
+
+
+def kotlin_unescape(text):
+    """The string a Kotlin literal body stands for."""
+    if '\\' not in text:
+        return text
+    out = []
+    i = 0
+    while i < len(text):
+        c = text[i]
+        if c == '\\' and i + 1 < len(text):
+            nxt = text[i + 1]
+            if nxt == 'u' and i + 6 <= len(text):
+                out.append(chr(int(text[i + 2:i + 6], 16)))
+                i += 6
+                continue
+            out.append(_ESCAPES.get(nxt, nxt))
+            i += 2
+            continue
+        out.append(c)
+        i += 1
+    # \u escapes of a surrogate pair come out as two halves; join them.
+    return ''.join(out).encode('utf-16', 'surrogatepass').decode('utf-16')
+
+
+def _literal(value):
+    text = f"{value:g}"
+    return text if any(c in text for c in '.e') else text + '.0'
+
+
+def _render_node(node, position, missing=None):
+    if position:
+        return f"Node({node}, Offset({_literal(position[0])}f, {_literal(position[1])}f))"
+    return f"Node({node}, Offset({missing}))"
+
+
+def _render_step(step):
+    text, show_starts, show_first = step
+    flags = (", showValidStarts = true" if show_starts else "") + (", showFirstEdge = true" if show_first else "")
+    return f"HintStep(text = \"{text}\"{flags})"
+
+
+def render_block(level, indent='        ', missing=None):
+    """The Level( ... ) block for a record, its first line unindented and the
+    rest indented under `indent`. Names and step texts are written as they
+    are, i.e. as Kotlin literal bodies the way scan_levels returns them.
+    Nodes without a position get `missing` as their Offset arguments; with
+    no `missing` they raise ValueError.
+    """
+    inner = indent + ' ' * 4
+    item = inner + ' ' * 4
+    positions = level.get('positions') or [None] * len(level['nodes'])
+    if missing is None and None in positions:
+        raise ValueError(f"Level {level['id']}: every node needs a literal position to be rendered")
+    nodes = ",\n".join(item + _render_node(n, p, missing) for n, p in zip(level['nodes'], positions))
+    edges = f",\n{item}".join(
+        ", ".join(f"Edge({a}, {b})" for a, b in level['edges'][i:i + 4])
+        for i in range(0, len(level['edges']), 4)
+    )
+    starts = ", ".join(str(n) for n in level['valid_starts'])
+    first = f"Pair({level['first_edge'][0]}, {level['first_edge'][1]})" if level.get('first_edge') else "null"
+    steps = []
+    for step in level.get('steps') or ():
+        steps.append(f"{item}    {_render_step(step)}")
+    steps = ",\n".join(steps)
+    return f"""Level(
+{inner}id = {level['id']},
+{inner}name = "{level['name']}",
+{inner}nodes = listOf(
+{nodes}
+{inner}),
+{inner}edges = listOf(
+{item}{edges}
+{inner}),
+{inner}hints = LevelHints(
+{item}validStartNodeIds = listOf({starts}),
+{item}firstEdge = {first},
+{item}steps = listOf(
+{steps}
+{item})
+{inner})
+{indent})"""
+
+
+def _indent_at(buf, start):
+    line = buf.rfind(b'\n', 0, start) + 1
+    prefix = buf[line:start]
+    return prefix.decode('utf-8') if not prefix.strip() else '        '
+
+
+def same_level(a, b):
+    if any(a.get(key) != b.get(key) for key in FIELDS):
+        return False
+    if kotlin_unescape(a['name']) != kotlin_unescape(b['name']):
+        return False
+    steps_a = a.get('steps') or []
+    steps_b = b.get('steps') or []
+    return len(steps_a) == len(steps_b) and all(
+        kotlin_unescape(s[0]) == kotlin_unescape(t[0]) and s[1:] == t[1:] for s, t in zip(steps_a, steps_b))
+
+
+def current_level(buf, span):
+    """The record scanned from the block at `span`, or None if none is there."""
+    start, end = span
+    if buf[start:start + 6] != b'Level(':
+        return None
+    found = list(scan_levels(buf, start, end))
+    if len(found) != 1 or found[0]['span'] != (start, end):
+        return None
+    return found[0]
+
+
+def _search(pattern, text, start=0):
+    """First match of `pattern` in `text` that is not on a // comment line."""
+    for m in pattern.finditer(text, start):
+        line = text[text.rfind('\n', 0, m.start()) + 1:m.start()]
+        if '//' not in line:
+            return m
+    return None
+
+
+def _list_items(text, opened, item):
+    """(item spans, index of the closing paren) of the list whose body
+    starts at `opened`, or None if it holds more than items, commas,
+    whitespace and comments.
+    """
+    spans = []
+    at = _GAP.match(text, opened).end()
+    while not text.startswith(')', at):
+        m = item.match(text, at)
+        if m is None:
+            return None
+        spans.append(m.span())
+        at = _GAP.match(text, m.end()).end()
+    return spans, at
+
+
+def _with_comma(tail, comma):
+    """`tail`, the text after an item up to the end of its line, with or
+    without the comma that separates it from the next item.
+    """
+    code = tail.split('//', 1)[0]
+    if comma and ',' not in code:
+        return ',' + tail
+    if not comma and ',' in code:
+        at = code.index(',')
+        tail = tail[:at] + tail[at + 1:]
+        return tail if '//' in tail else tail.rstrip()
+    return tail
+
+
+def _comments(head):
+    return '//' in head or '/*' in head
+
+
+def _merge_head(carried, head):
+    """The head for an item that follows deleted ones whose heads (line
+    breaks, comment lines) add up to `carried`.
+    """
+    if not head.startswith('\n'):
+        # The item shared a line with a deleted one; it takes that line.
+        return carried if carried.startswith('\n') else head
+    if not _comments(carried):
+        return head
+    return carried.rstrip(' \t') + head[1:]
+
+
+def _patched_list(text, opened, spans, close, old_keys, new_items, new_keys, render, one_per_line):
+    """The new body of the list text[opened:close]. Items whose key is
+    unchanged keep their text; every kept or changed item keeps the comment
+    lines above it and the comment after it on its line, and comment lines
+    above deleted items stay too. Only added or changed items are rendered.
+    """
+    # Split each gap between items at its first newline: before it is the
+    # tail of the item on the left (comma, trailing comment), after it the
+    # head of the one on the right (comment lines, indentation).
+    heads = [text[opened:spans[0][0]]]
+    tails = []
+    for left, right in zip(spans, spans[1:] + [(close, close)]):
+        gap = text[left[1]:right[0]]
+        at = gap.find('\n')
+        tails.append(gap if at < 0 else gap[:at])
+        heads.append('' if at < 0 else gap[at:])
+    closing = heads.pop()
+    trailing = ',' in tails[-1].split('//', 1)[0]
+    line = text.rfind('\n', 0, spans[-1][0]) + 1
+    indent = text[line:len(text) - len(text[line:].lstrip(' \t'))]
+    new_head = '\n' + indent if one_per_line else ' '
+
+    entries = []
+    carried = None
+
+    def place(head, body, tail):
+        nonlocal carried
+        if carried is not None:
+            head = _merge_head(carried, head)
+        entries.append([head, body, tail, carried is not None])
+        carried = None
+
+    def drop(i):
+        nonlocal carried
+        carried = heads[i] if carried is None else _merge_head(carried, heads[i])
+        comment = tails[i].find('//')
+        if comment >= 0 and not heads[i].startswith('\n') and entries and '//' not in entries[-1][2]:
+            # A comment ending a line outlives the item it followed when an
+            # item before it on that line stays.
+            entries[-1][2] = entries[-1][2].rstrip() + ' ' + tails[i][comment:]
+
+    matcher = SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for i in range(i1, i2):
+                place(heads[i], text[spans[i][0]:spans[i][1]], tails[i])
+            continue
+        paired = min(i2 - i1, j2 - j1)
+        for k in range(paired):
+            place(heads[i1 + k], render(new_items[j1 + k]), tails[i1 + k])
+        for i in range(i1 + paired, i2):
+            drop(i)
+        for j in range(j1 + paired, j2):
+            place('' if not entries and new_head == ' ' else new_head, render(new_items[j]), '')
+
+    out = []
+    for k, (head, body, tail, after_deleted) in enumerate(entries):
+        if after_deleted and head.startswith('\n') and out and not _comments(out[-1]):
+            out[-1] = out[-1].rstrip(' \t')
+        if not head.startswith('\n') and out and '//' in out[-1]:
+            # Nothing can follow a // comment on its line.
+            head = '\n' + indent + head.lstrip(' ')
+        out.append(head + body)
+        out.append(_with_comma(tail, k < len(entries) - 1 or trailing))
+    if carried is not None:
+        closing = _merge_head(carried, closing)
+        if out and not _comments(out[-1]):
+            out[-1] = out[-1].rstrip(' \t')
+    out.append(closing)
+    return ''.join(out)
+
+
+def _step_key(step):
+    return (kotlin_unescape(step[0]), bool(step[1]), bool(step[2]))
+
+
+def spliced_block(text, old, level):
+    """`text`, the Level( ... ) block `old` was scanned from, with only what
+    differs in `level` rewritten: the name, validStartNodeIds, firstEdge and
+    the nodes, edges and hint steps item by item, so comments and the
+    literals of unchanged items stay as written. None when something that
+    changed can't be found in a form this can patch.
+    """
+    edits = []
+    if kotlin_unescape(level['name']) != kotlin_unescape(old['name']):
+        m = _search(_NAME, text)
+        if m is None:
+            return None
+        edits.append((m.start(1), m.end(1), level['name']))
+
+    def node(item):
+        if item[1] is None:
+            raise ValueError(f"Level {level['id']}: every node needs a literal position to be rendered")
+        return _render_node(*item)
+
+    new_positions = level.get('positions') or [None] * len(level['nodes'])
+    lists = (
+        ('nodes', list(zip(old['nodes'], old['positions'])), list(zip(level['nodes'], new_positions)),
+         tuple, node),
+        ('edges', old['edges'], level['edges'], tuple, lambda edge: f"Edge({edge[0]}, {edge[1]})"),
+        ('steps', old['steps'], level.get('steps') or [], _step_key, _render_step),
+    )
+    for field, old_items, new_items, key, render in lists:
+        old_keys = [key(item) for item in old_items]
+        new_keys = [key(item) for item in new_items]
+        if old_keys == new_keys:
+            continue
+        opening, item = _LISTS[field]
+        m = _search(opening, text)
+        found = m and _list_items(text, m.end(), item)
+        if not found or not found[0] or len(found[0]) != len(old_items):
+            return None
+        spans, close = found
+        if len(spans) > 1:
+            one_per_line = all('\n' in text[a[1]:b[0]] for a, b in zip(spans, spans[1:]))
+        else:
+            one_per_line = field != 'edges'
+        body = _patched_list(text, m.end(), spans, close, old_keys, new_items, new_keys, render, one_per_line)
+        edits.append((m.end(), close, body))
+
+    if list(level['valid_starts']) != list(old['valid_starts']):
+        edits.append(_starts_edit(text, level['valid_starts']))
+    first = tuple(level['first_edge']) if level.get('first_edge') else None
+    if first != old['first_edge']:
+        edits.append(_first_edit(text, first))
+    if None in edits:
+        return None
+    return _apply(text, edits)
+
+
+def _starts_edit(text, valid_starts):
+    m = _search(_STARTS, text)
+    return m and (m.start(), m.end(), f"validStartNodeIds = listOf({', '.join(map(str, valid_starts))})")
+
+
+def _first_edit(text, first_edge):
+    m = _search(_FIRST, text)
+    return m and (m.start(), m.end(), f"firstEdge = Pair({first_edge[0]}, {first_edge[1]})" if first_edge
+                  else "firstEdge = null")
+
+
+def _apply(text, edits):
+    for start, end, new in sorted(edits, reverse=True):
+        text = text[:start] + new + text[end:]
+    return text
+
+
+def set_hints(text, valid_starts, first_edge):
+    """`text`, a Level( ... ) block, with its validStartNodeIds and firstEdge
+    rewritten; None when either can't be found.
+    """
+    edits = [_starts_edit(text, valid_starts), _first_edit(text, first_edge)]
+    if None in edits:
+        return None
+    return _apply(text, edits)
+
+
+def changed_blocks(buf, levels, blocks=None):
+    """(start, end, new bytes) for each level that differs from its block.
+
+    `blocks` optionally maps a level's span to ready-made block text to use
+    instead of spliced_block(). Raises ValueError when a span no longer
+    holds a level with the record's id (the file changed since it was
+    scanned) or when two spans overlap.
+    """
+    blocks = blocks or {}
+    changes = []
+    for level in levels:
+        span = level.get('span')
+        if span is None:
+            raise ValueError(f"Level {level['id']} has no span; only scanned levels can be written back")
+        old = current_level(buf, span)
+        if old is None or old['id'] != level['id']:
+            raise ValueError(f"Level {level['id']}: the source changed since it was scanned")
+        if span not in blocks and same_level(old, level):
+            continue
+        text = blocks.get(span)
+        if text is None:
+            block = bytes(buf[span[0]:span[1]]).decode('utf-8')
+            text = spliced_block(block, old, level) or render_block(level, _indent_at(buf, span[0]))
+        new = text.encode('utf-8')
+        if new != buf[span[0]:span[1]]:
+            changes.append((span[0], span[1], new))
+    changes.sort()
+    for (_, end, _), (start, _, _) in zip(changes, changes[1:]):
+        if start < end:
+            raise ValueError("overlapping level spans")
+    return changes
+
+
+def _copy(buf, start, end, out):
+    view = memoryview(buf)
+    try:
+        for at in range(start, end, COPY_CHUNK):
+            out.write(view[at:min(at + COPY_CHUNK, end)])
+    finally:
+        view.release()
+
+
+def splice(buf, changes, out):
+    """Write buf to `out` with each (start, end, new bytes) change applied."""
+    at = 0
+    for start, end, new in changes:
+        _copy(buf, at, start, out)
+        out.write(new)
+        at = end
+    _copy(buf, at, len(buf), out)
+
+
+def patch_file(filepath, levels, output=None, blocks=None):
+    """Write `levels` back into `filepath` (or a copy at `output`); returns
+    the spans that were replaced.
+    """
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            raise ValueError(f"{filepath} is empty")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            changes = changed_blocks(buf, levels, blocks)
+            in_place = output is None or os.path.abspath(output) == os.path.abspath(filepath)
+            if in_place and not changes:
+                return []
+            if in_place and all(end - start == len(new) for start, end, new in changes):
+                buf.close()
+                with open(filepath, 'r+b') as target:
+                    for start, _, new in changes:
+                        target.seek(start)
+                        target.write(new)
+                return [(start, end) for start, end, _ in changes]
+
+            target = filepath if in_place else output
+            fd, temp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), prefix='.patch-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    splice(buf, changes, out)
+                os.chmod(temp, os.stat(filepath).st_mode & 0o777)
+                os.replace(temp, target)
+            except BaseException:
+                os.remove(temp)
+                raise
+    return [(start, end) for start, end, _ in changes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--from', dest='source', required=True,
+                        help="levels to write in (Kotlin source, .jsonl or .lfpack), matched by id")
+    parser.add_argument('-o', '--output', help="write the patched file here instead of in place")
+    args = parser.parse_args()
+
+    updates = {level['id']: level for level in iter_levels(args.source)}
+    if args.source.endswith('.lfpack'):
+        # Packs hold fixed-point positions; round them back to the literals
+        # they came from (positions in the sources have at most 4 decimals).
+        for level in updates.values():
+            level['positions'] = [p and (round(p[0], 4), round(p[1], 4)) for p in level['positions']]
+    count = 0
+    levels = []
+    for level in iter_levels(args.filepath):
+        count += 1
+        update = updates.pop(level['id'], None)
+        if update is not None:
+            levels.append(dict(update, span=level['span']))
+    try:
+        replaced = patch_file(args.filepath, levels, args.output)
+    except ValueError as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    replaced = set(replaced)
+    for level in levels:
+        if level['span'] in replaced:
+            print(f"Level {level['id']} ({level['name']}) - replaced")
+    for level_id in sorted(updates):
+        print(f"Level {level_id} ({updates[level_id]['name']}) - not in {args.filepath}, skipped")
+    print(f"\nTotal: {count} levels, {len(replaced)} replaced, {len(levels) - len(replaced)} unchanged")
+    return 1 if updates else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,435 @@
+"""Left-right planarity test and Tutte embeddings for level graphs.
+
+planar_embedding() is the left-right (de Fraysseix-Rosenstiehl) test as
+laid out by Brandes: one DFS orients the graph and computes lowpoints,
+a second checks the left/right constraints between return edges with a
+stack of conflict pairs, and a third turns the chosen sides into a
+rotation system (clockwise neighbour order around every vertex). Only
+the simple graph matters, so loops and repeated edges are ignored. Graphs
+with more than 3V - 6 distinct edges are rejected before any DFS, and
+everything else runs in linear time apart from sorting each adjacency
+list. All three DFSs use explicit stacks.
+
+tutte_layout() places a connected planar graph by Tutte's barycentric
+method: the longest face of the embedding goes on a circle and every
+other vertex sits at the average of its neighbours. For 3-connected
+graphs that is a straight-line drawing without crossings; below that,
+some vertices can land on top of each other or on an edge, which a
+force-directed pass has to spread out afterwards. It is the only part
+that requires numpy, and imports it on first use.
+"""
+
+
+def simple_adjacency(graph):
+    """Distinct neighbour indices of every vertex, loops left out."""
+    offsets, neighbors = graph.csr()
+    adjacency = []
+    for v in range(len(graph.node_ids)):
+        seen = {v}
+        row = []
+        for w in neighbors[offsets[v]:offsets[v + 1]]:
+            if w not in seen:
+                seen.add(w)
+                row.append(w)
+        adjacency.append(row)
+    return adjacency
+
+
+class _Interval:
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low=None, high=None):
+        self.low = low
+        self.high = high
+
+    def empty(self):
+        return self.low is None and self.high is None
+
+    def copy(self):
+        return _Interval(self.low, self.high)
+
+
+class _ConflictPair:
+    __slots__ = ('left', 'right')
+
+    def __init__(self, left=None, right=None):
+        self.left = left or _Interval()
+        self.right = right or _Interval()
+
+    def swap(self):
+        self.left, self.right = self.right, self.left
+
+
+class _LeftRight:
+    """State of one left-right test; see planar_embedding()."""
+
+    def __init__(self, adjacency):
+        n = len(adjacency)
+        self.adjacency = adjacency
+        self.height = [None] * n
+        self.parent_edge = [None] * n
+        self.roots = []
+        self.out = [[] for _ in range(n)]
+        self.ordered = None
+        self.lowpt = {}
+        self.lowpt2 = {}
+        self.nesting_depth = {}
+        self.ref = {}
+        self.side = {}
+        self.lowpt_edge = {}
+        self.stack_bottom = {}
+        self.conflicts = []
+
+    # Phase 1: orientation, heights and lowpoints.
+
+    def orient(self, root):
+        height = self.height
+        parent_edge = self.parent_edge
+        lowpt = self.lowpt
+        lowpt2 = self.lowpt2
+        nesting_depth = self.nesting_depth
+        adjacency = self.adjacency
+        oriented = set()
+        position = [0] * len(adjacency)
+        resumed = set()
+        stack = [root]
+        while stack:
+            v = stack.pop()
+            e = parent_edge[v]
+            row = adjacency[v]
+            while position[v] < len(row):
+                w = row[position[v]]
+                vw = (v, w)
+                if vw not in resumed:
+                    if vw in oriented or (w, v) in oriented:
+                        position[v] += 1
+                        continue
+                    oriented.add(vw)
+                    self.out[v].append(w)
+                    lowpt[vw] = lowpt2[vw] = height[v]
+                    self.ref[vw] = None
+                    self.side[vw] = 1
+                    if height[w] is None:
+                        # Tree edge: descend, and finish vw when v resumes.
+                        parent_edge[w] = vw
+                        height[w] = height[v] + 1
+                        resumed.add(vw)
+                        stack.append(v)
+                        stack.append(w)
+                        break
+                    lowpt[vw] = height[w]
+                # Chordal edges (a second return point below v) nest deeper.
+                nesting_depth[vw] = 2 * lowpt[vw] + (lowpt2[vw] < height[v])
+                if e is not None:
+                    if lowpt[vw] < lowpt[e]:
+                        lowpt2[e] = min(lowpt[e], lowpt2[vw])
+                        lowpt[e] = lowpt[vw]
+                    elif lowpt[vw] > lowpt[e]:
+                        lowpt2[e] = min(lowpt2[e], lowpt[vw])
+                    else:
+                        lowpt2[e] = min(lowpt2[e], lowpt2[vw])
+                position[v] += 1
+
+    # Phase 2: left/right constraints between return edges.
+
+    def _top(self):
+        return self.conflicts[-1] if self.conflicts else None
+
+    def _conflicting(self, interval, edge):
+        return not interval.empty() and self.lowpt[interval.high] > self.lowpt[edge]
+
+    def _lowest(self, pair):
+        lowpt = self.lowpt
+        if pair.left.empty():
+            return lowpt[pair.right.low]
+        if pair.right.empty():
+            return lowpt[pair.left.low]
+        return min(lowpt[pair.left.low], lowpt[pair.right.low])
+
+    def _add_constraints(self, ei, e):
+        lowpt = self.lowpt
+        ref = self.ref
+        conflicts = self.conflicts
+        merged = _ConflictPair()
+        # Return edges of ei all go to one side.
+        while True:
+            pair = conflicts.pop()
+            if not pair.left.empty():
+                pair.swap()
+            if not pair.left.empty():
+                return False
+            if lowpt[pair.right.low] > lowpt[e]:
+                if merged.right.empty():
+                    merged.right = pair.right.copy()
+                else:
+                    ref[merged.right.low] = pair.right.high
+                merged.right.low = pair.right.low
+            else:
+                ref[pair.right.low] = self.lowpt_edge[e]
+            if self._top() is self.stack_bottom[ei]:
+                break
+        # Return edges of earlier siblings that conflict go to the other.
+        while conflicts and (self._conflicting(conflicts[-1].left, ei) or self._conflicting(conflicts[-1].right, ei)):
+            pair = conflicts.pop()
+            if self._conflicting(pair.right, ei):
+                pair.swap()
+            if self._conflicting(pair.right, ei):
+                return False
+            ref[merged.right.low] = pair.right.high
+            if pair.right.low is not None:
+                merged.right.low = pair.right.low
+            if merged.left.empty():
+                merged.left = pair.left.copy()
+            else:
+                ref[merged.left.low] = pair.left.high
+            merged.left.low = pair.left.low
+        if not (merged.left.empty() and merged.right.empty()):
+            conflicts.append(merged)
+        return True
+
+    def _remove_back_edges(self, e):
+        u = e[0]
+        height = self.height
+        lowpt = self.lowpt
+        ref = self.ref
+        side = self.side
+        conflicts = self.conflicts
+        # Drop whole conflict pairs that only return to u.
+        while conflicts and self._lowest(conflicts[-1]) == height[u]:
+            pair = conflicts.pop()
+            if pair.left.low is not None:
+                side[pair.left.low] = -1
+        if conflicts:
+            # Trim the edges returning to u off the next pair.
+            pair = conflicts.pop()
+            while pair.left.high is not None and pair.left.high[1] == u:
+                pair.left.high = ref[pair.left.high]
+            if pair.left.high is None and pair.left.low is not None:
+                ref[pair.left.low] = pair.right.low
+                side[pair.left.low] = -1
+                pair.left.low = None
+            while pair.right.high is not None and pair.right.high[1] == u:
+                pair.right.high = ref[pair.right.high]
+            if pair.right.high is None and pair.right.low is not None:
+                ref[pair.right.low] = pair.left.low
+                side[pair.right.low] = -1
+                pair.right.low = None
+            conflicts.append(pair)
+        # e goes to the side of its highest return edge.
+        if lowpt[e] < height[u]:
+            high_left = conflicts[-1].left.high
+            high_right = conflicts[-1].right.high
+            if high_left is not None and (high_right is None or lowpt[high_left] > lowpt[high_right]):
+                ref[e] = high_left
+            else:
+                ref[e] = high_right
+
+    def test(self, root):
+        height = self.height
+        lowpt = self.lowpt
+        parent_edge = self.parent_edge
+        ordered = self.ordered
+        position = [0] * len(ordered)
+        resumed = set()
+        stack = [root]
+        while stack:
+            v = stack.pop()
+            e = parent_edge[v]
+            descended = False
+            row = ordered[v]
+            while position[v] < len(row):
+                w = row[position[v]]
+                ei = (v, w)
+                if ei not in resumed:
+                    self.stack_bottom[ei] = self._top()
+                    if ei == parent_edge[w]:
+                        resumed.add(ei)
+                        stack.append(v)
+                        stack.append(w)
+                        descended = True
+                        break
+                    self.lowpt_edge[ei] = ei
+                    self.conflicts.append(_ConflictPair(right=_Interval(ei, ei)))
+                if lowpt[ei] < height[v]:
+                    if w == row[0]:
+                        self.lowpt_edge[e] = self.lowpt_edge[ei]
+                    elif not self._add_constraints(ei, e):
+                        return False
+                position[v] += 1
+            if not descended and e is not None:
+                self._remove_back_edges(e)
+        return True
+
+    # Phase 3: sides to a rotation system.
+
+    def _sign(self, e):
+        # Follow the ref chain, then fold the signs back down it.
+        chain = []
+        while self.ref[e] is not None:
+            chain.append(e)
+            e = self.ref[e]
+        sign = self.side[e]
+        for edge in reversed(chain):
+            sign = self.side[edge] = self.side[edge] * sign
+            self.ref[edge] = None
+        return sign
+
+    def embed(self):
+        n = len(self.adjacency)
+        depth = self.nesting_depth
+        for vw in list(depth):
+            depth[vw] *= self._sign(vw)
+        cw = [{} for _ in range(n)]
+        ccw = [{} for _ in range(n)]
+        first = [None] * n
+
+        def add_cw(v, w, reference):
+            if reference is None:
+                cw[v][w] = ccw[v][w] = w
+                first[v] = w
+                return
+            after = cw[v][reference]
+            cw[v][reference] = w
+            cw[v][w] = after
+            ccw[v][after] = w
+            ccw[v][w] = reference
+
+        def add_ccw(v, w, reference):
+            if reference is None:
+                add_cw(v, w, None)
+                return
+            add_cw(v, w, ccw[v][reference])
+            if reference == first[v]:
+                first[v] = w
+
+        for v in range(n):
+            self.out[v].sort(key=lambda w: depth[(v, w)])
+            previous = None
+            for w in self.out[v]:
+                add_cw(v, w, previous)
+                previous = w
+
+        left_ref = [None] * n
+        right_ref = [None] * n
+        parent_edge = self.parent_edge
+        for root in self.roots:
+            position = [0] * n
+            stack = [root]
+            while stack:
+                v = stack.pop()
+                row = self.out[v]
+                while position[v] < len(row):
+                    w = row[position[v]]
+                    position[v] += 1
+                    if (v, w) == parent_edge[w]:
+                        add_ccw(w, v, first[w])
+                        left_ref[v] = right_ref[v] = w
+                        stack.append(v)
+                        stack.append(w)
+                        break
+                    if self.side[(v, w)] == 1:
+                        add_cw(w, v, right_ref[w])
+                    else:
+                        add_ccw(w, v, left_ref[w])
+                        left_ref[w] = v
+
+        rotation = []
+        for v in range(n):
+            order = []
+            w = first[v]
+            while w is not None and (not order or w != order[0]):
+                order.append(w)
+                w = cw[v][w]
+            rotation.append(order)
+        return rotation
+
+
+def planar_embedding(graph, adjacency=None):
+    """Clockwise neighbour order of every vertex (index order) in a planar
+    embedding, or None when the graph is not planar.
+    """
+    if adjacency is None:
+        adjacency = simple_adjacency(graph)
+    n = len(adjacency)
+    edge_count = sum(len(row) for row in adjacency) // 2
+    if n > 2 and edge_count > 3 * n - 6:
+        return None
+    state = _LeftRight(adjacency)
+    for v in range(n):
+        if state.height[v] is None:
+            state.height[v] = 0
+            state.roots.append(v)
+            state.orient(v)
+    depth = state.nesting_depth
+    state.ordered = [sorted(row, key=lambda w, v=v: depth[(v, w)]) for v, row in enumerate(state.out)]
+    for root in state.roots:
+        if not state.test(root):
+            return None
+    return state.embed()
+
+
+def is_planar(graph):
+    return planar_embedding(graph) is not None
+
+
+def faces(rotation):
+    """Faces of a rotation system as vertex lists, walking each directed
+    edge once (turning to the next neighbour counter-clockwise).
+    """
+    position = [{w: k for k, w in enumerate(order)} for order in rotation]
+    seen = set()
+    found = []
+    for v, order in enumerate(rotation):
+        for w in order:
+            if (v, w) in seen:
+                continue
+            face = []
+            a, b = v, w
+            while (a, b) not in seen:
+                seen.add((a, b))
+                face.append(a)
+                around = rotation[b]
+                a, b = b, around[(position[b][a] - 1) % len(around)]
+            found.append(face)
+    return found
+
+
+def tutte_layout(graph, rotation=None):
+    """Positions (index order) in [0.1, 0.9] from Tutte's barycentric
+    embedding, or None if the graph is not planar or not connected.
+    """
+    import numpy as np
+
+    n = len(graph.node_ids)
+    if n == 0 or not graph.is_connected:
+        return None
+    adjacency = simple_adjacency(graph)
+    if rotation is None:
+        rotation = planar_embedding(graph, adjacency)
+        if rotation is None:
+            return None
+    if n == 1:
+        return [(0.5, 0.5)]
+
+    outer = list(dict.fromkeys(max(faces(rotation), key=lambda face: len(set(face)))))
+    positions = np.zeros((n, 2))
+    turn = 2 * np.pi * np.arange(len(outer)) / len(outer)
+    positions[outer, 0] = 0.5 + 0.4 * np.cos(turn)
+    positions[outer, 1] = 0.5 + 0.4 * np.sin(turn)
+
+    outer_set = set(outer)
+    inner = [v for v in range(n) if v not in outer_set]
+    if inner:
+        # deg(v) * p(v) - sum of inner neighbours = sum of outer neighbours.
+        slot = {v: k for k, v in enumerate(inner)}
+        system = np.zeros((len(inner), len(inner)))
+        fixed = np.zeros((len(inner), 2))
+        for k, v in enumerate(inner):
+            system[k, k] = len(adjacency[v])
+            for w in adjacency[v]:
+                if w in slot:
+                    system[k, slot[w]] -= 1
+                else:
+                    fixed[k] += positions[w]
+        positions[inner] = np.linalg.solve(system, fixed)
+    return [tuple(p) for p in positions.tolist()]
@@ -0,0 +1,160 @@
+"""Profiling support for validate_levels --profile and --profile-stacks.
+
+PhaseProfile adds up wall time and allocated memory blocks for each phase:
+parsing the source, then per level the phases validate_level reports
+through its `mark` callback:
+
+  graph         LevelGraph's single pass: degrees, duplicate edges,
+                invalid references and union-find
+  parity        odd-degree nodes and the degree listing
+  connectivity  reachability from the lowest node id
+  hints         validStartNodeIds and firstEdge checks
+
+Blocks are the change in sys.getallocatedblocks() over the phase: every
+object and buffer the interpreter's allocator hands out and has not had
+back, strings and numbers included, so a phase that frees more than it
+allocates comes out negative. Each reading walks the allocator's pools
+and takes tens of microseconds on a large file; the clock is read around
+it, so it slows a profiled run without being counted in any phase.
+Collections are reported as a gc phase of their own, with the blocks
+they free. It also keeps the slowest levels.
+
+StackSampler samples the Python stack on SIGPROF (CPU time) and writes
+collapsed stacks, one "a;b;c count" line per distinct stack, as read by
+flamegraph.pl, inferno and speedscope. Neither costs anything when the
+options are off: the validator only tests whether it got a `mark`.
+"""
+import gc
+import heapq
+import os
+import signal
+import sys
+import time
+from collections import Counter
+
+SAMPLE_INTERVAL = 0.001
+
+
+class PhaseProfile:
+    """Cumulative time and allocated blocks per phase, plus the `top`
+    slowest levels. Garbage collection is measured as a phase of its own
+    and left out of the others, so a collection that happens to run during
+    a small level does not make it look slow or look like it freed memory.
+    """
+
+    def __init__(self, top=10):
+        self.seconds = {}
+        self.blocks = {}
+        self.top = top
+        self.slowest = []
+        self._clock = 0.0
+        self._spent = 0.0
+        self._blocks = 0
+        self._gc_seconds = 0.0
+        self._gc_blocks = 0
+        self._gc_started = 0.0
+        self._gc_started_blocks = 0
+        self._gc_mark = 0.0
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_started = time.perf_counter()
+            self._gc_started_blocks = sys.getallocatedblocks()
+        else:
+            self._gc_blocks += sys.getallocatedblocks() - self._gc_started_blocks
+            self._gc_seconds += time.perf_counter() - self._gc_started
+
+    def __enter__(self):
+        gc.callbacks.append(self._on_gc)
+        return self
+
+    def __exit__(self, *exc):
+        gc.callbacks.remove(self._on_gc)
+        if self._gc_seconds:
+            self.seconds['gc'] = self._gc_seconds
+            self.blocks['gc'] = self._gc_blocks
+
+    def _allocated(self):
+        return sys.getallocatedblocks() - self._gc_blocks
+
+    def start(self):
+        self._blocks = self._allocated()
+        self._gc_mark = self._gc_seconds
+        self._clock = time.perf_counter()
+
+    def mark(self, phase):
+        """Close `phase` (time since start() or the previous mark) and start the next."""
+        now = time.perf_counter()
+        blocks = self._allocated()
+        spent = now - self._clock - (self._gc_seconds - self._gc_mark)
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + spent
+        self._spent += spent
+        self.blocks[phase] = self.blocks.get(phase, 0) + blocks - self._blocks
+        self._blocks = blocks
+        self._gc_mark = self._gc_seconds
+        self._clock = time.perf_counter()
+
+    def time_phase(self, phase, fn, *args):
+        """fn(*args), timed as one `phase`."""
+        self.start()
+        result = fn(*args)
+        self.mark(phase)
+        return result
+
+    def time_level(self, validate, level):
+        """validate(level, mark) with its phases timed; returns the issues."""
+        self._spent = 0.0
+        self.start()
+        issues = validate(level, self.mark)
+        entry = (self._spent, level['id'], level['name'], len(level['nodes']), len(level['edges']))
+        if len(self.slowest) < self.top:
+            heapq.heappush(self.slowest, entry)
+        elif self.top:
+            heapq.heappushpop(self.slowest, entry)
+        return issues
+
+    def report(self, out=sys.stderr):
+        total = sum(self.seconds.values()) or 1.0
+        print("\nProfile (wall time, allocated blocks):", file=out)
+        for phase, seconds in self.seconds.items():
+            print(f"  {phase:14s}{seconds:9.3f}s {seconds / total:6.1%} {self.blocks[phase]:+12d} blocks", file=out)
+        print(f"  {'total':14s}{sum(self.seconds.values()):9.3f}s", file=out)
+        if self.slowest:
+            print(f"\nSlowest {len(self.slowest)} levels:", file=out)
+            for seconds, level_id, name, node_count, edge_count in sorted(self.slowest, reverse=True):
+                print(f"  Level {level_id} ({name}) - {node_count} nodes, {edge_count} edges: "
+                      f"{seconds * 1e6:.1f} us", file=out)
+
+
+class StackSampler:
+    """Collapsed Python stacks of the main thread, sampled every `interval`
+    seconds of CPU time while the context is active. POSIX only.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.counts = Counter()
+        self._previous = None
+
+    def _sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        self.counts[';'.join(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._previous = signal.signal(signal.SIGPROF, self._sample)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, self._previous)
+
+    def write(self, filepath):
+        with open(filepath, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+        return sum(self.counts.values())
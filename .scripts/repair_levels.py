@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""Repair levels with the wrong number of odd-degree nodes by adding edges.
+
+A level needs 0 odd nodes (circuit) or 2 (path). Adding an edge flips the
+parity of both its ends, so a repair pairs odd nodes up and joins each
+pair: directly, or through a middle node when the direct edge already
+exists (the middle node gets two new edges and stays even). Each new
+edge costs its length on the canvas plus CROSSING_PENALTY for every
+existing edge it crosses and THROUGH_PENALTY for every node it passes
+over, and the cheapest pairing wins:
+
+  exact   bitmask DP over the odd nodes, used up to EXACT_ODD_NODES
+  greedy  cheapest pairs first, then 2-opt swaps between pairs
+
+Without --circuit two odd nodes may stay unpaired (the cheapest two to
+leave out), which makes the level a path. Each repaired level is printed
+as its Kotlin block with the new edges appended to the edge list and the
+hints' validStartNodeIds and firstEdge updated; .jsonl levels are rendered
+with patch_levels in Graph.kt's layout instead, nodes without a position
+marked for the author to place. Hint step texts are left as they were.
+--write splices the repaired blocks into the source with patch_levels
+instead of printing them.
+"""
+import argparse
+import math
+import re
+import sys
+
+from geometry_levels import pair_issue, through_issue
+from graph_core import LevelGraph
+from patch_levels import patch_file, render_block, set_hints
+from solve_levels import euler_trail
+from validate_levels import iter_levels
+
+# The canvas is a unit square, so a crossing weighs about one full-width edge.
+CROSSING_PENALTY = 1.0
+THROUGH_PENALTY = 10.0
+# Odd sets up to this size are paired exactly (about 2^n * n steps).
+EXACT_ODD_NODES = 16
+# Offset arguments for nodes a .jsonl level gives no position.
+MISSING_POSITION = '0f, 0f /* no position */'
+
+_EDGE = re.compile(r'Edge\(\s*\d+\s*,\s*\d+\s*\)')
+
+
+class _Costs:
+    """Cost of adding an edge, and of joining two odd nodes, for one level."""
+
+    def __init__(self, level, graph):
+        self.graph = graph
+        positions = level.get('positions') or [None] * len(level['nodes'])
+        self.where = {n: p for n, p in zip(level['nodes'], positions) if p is not None}
+        segments = []
+        for i, (a, b) in enumerate(level['edges']):
+            if a != b and a in self.where and b in self.where:
+                segments.append((i, a, b, self.where[a], self.where[b]))
+        self.segments = segments
+        self.edge_cache = {}
+        self.pair_cache = {}
+
+    def edge(self, a, b):
+        """Cost of a new edge a-b, or None if it already exists."""
+        key = (a, b) if a < b else (b, a)
+        cost = self.edge_cache.get(key, False)
+        if cost is not False:
+            return cost
+        if self.graph.has_edge(a, b):
+            cost = None
+        elif a in self.where and b in self.where:
+            pa, pb = self.where[a], self.where[b]
+            cost = math.dist(pa, pb)
+            new = (-1, a, b, pa, pb)
+            for s in self.segments:
+                issue = pair_issue(new, s)
+                if issue:
+                    cost += CROSSING_PENALTY
+            for node, point in self.where.items():
+                if through_issue(new, node, point):
+                    cost += THROUGH_PENALTY
+        else:
+            cost = 1.0
+        self.edge_cache[key] = cost
+        return cost
+
+    def pair(self, a, b):
+        """(cost, new edges) of flipping the parity of a and b, or (inf, None)."""
+        key = (a, b) if a < b else (b, a)
+        best = self.pair_cache.get(key)
+        if best is not None:
+            return best
+        best = (math.inf, None)
+        direct = self.edge(a, b)
+        if direct is not None:
+            best = (direct, [(a, b)])
+        for x in self.graph.node_ids[:self.graph.node_count]:
+            if x == a or x == b:
+                continue
+            first = self.edge(a, x)
+            if first is None or first >= best[0]:
+                continue
+            second = self.edge(x, b)
+            if second is not None and first + second < best[0]:
+                best = (first + second, [(a, x), (x, b)])
+        self.pair_cache[key] = best
+        return best
+
+
+def exact_pairing(odd, cost, spare=0):
+    """Cheapest pairing of `odd` as (total cost, pairs), leaving up to
+    `spare` nodes unpaired; cost(a, b) gives one pair's cost.
+    """
+    k = len(odd)
+    best = {}
+
+    def solve(mask, left):
+        state = (mask, left)
+        if state in best:
+            return best[state]
+        if mask == 0:
+            return 0.0, ()
+        i = (mask & -mask).bit_length() - 1
+        rest = mask & ~(1 << i)
+        result = (math.inf, ())
+        if left:
+            result = solve(rest, left - 1)
+        j_mask = rest
+        while j_mask:
+            low = j_mask & -j_mask
+            j = low.bit_length() - 1
+            j_mask ^= low
+            step = cost(odd[i], odd[j])
+            if step >= result[0]:
+                continue
+            total, pairs = solve(rest & ~low, left)
+            if step + total < result[0]:
+                result = (step + total, ((odd[i], odd[j]),) + pairs)
+        best[state] = result
+        return result
+
+    return solve((1 << k) - 1, spare)
+
+
+def greedy_pairing(odd, cost, spare=0):
+    """Cheapest-first pairing improved by 2-opt swaps. Up to `spare` nodes
+    are left out: ones nothing could be paired with, then the dearest pair.
+    """
+    candidates = sorted((cost(a, b), a, b) for i, a in enumerate(odd) for b in odd[i + 1:])
+    matched = set()
+    pairs = []
+    for c, a, b in candidates:
+        if a not in matched and b not in matched and c < math.inf:
+            matched.update((a, b))
+            pairs.append((a, b))
+    unpaired = len(odd) - len(matched)
+    if unpaired > spare:
+        return math.inf, ()
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(len(pairs)):
+            for j in range(i + 1, len(pairs)):
+                (a, b), (c, d) = pairs[i], pairs[j]
+                now = cost(a, b) + cost(c, d)
+                for p, q in (((a, c), (b, d)), ((a, d), (b, c))):
+                    if cost(*p) + cost(*q) < now - 1e-12:
+                        pairs[i], pairs[j] = p, q
+                        improved = True
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+
+    pairs.sort(key=lambda pair: cost(*pair))
+    if spare - unpaired >= 2 and pairs:
+        pairs.pop()
+    return sum(cost(*pair) for pair in pairs), tuple(pairs)
+
+
+def repair_level(level, circuit=False):
+    """(new edges, total cost, method) making `level` Eulerian, or None.
+
+    Levels that already have 0 (or, without `circuit`, 2) odd nodes come
+    back with no new edges.
+    """
+    graph = LevelGraph(level['nodes'], level['edges'])
+    odd = graph.odd_nodes
+    spare = 0 if circuit else 2
+    if len(odd) <= spare:
+        return [], 0.0, 'none'
+    costs = _Costs(level, graph)
+
+    def cost(a, b):
+        return costs.pair(a, b)[0]
+
+    if len(odd) <= EXACT_ODD_NODES:
+        total, pairs = exact_pairing(odd, cost, spare)
+        method = 'exact'
+    else:
+        total, pairs = greedy_pairing(odd, cost, spare)
+        method = 'greedy'
+    if total == math.inf:
+        return None
+
+    added = [edge for a, b in pairs for edge in costs.pair(a, b)[1]]
+    repaired = LevelGraph(level['nodes'], level['edges'] + added)
+    if repaired.duplicates or len(repaired.odd_nodes) > spare:
+        # Two joins routed through the same new edge; not worth a search.
+        return None
+    return added, total, method
+
+
+def repaired_hints(level, added):
+    """(valid starts, first edge) for the level with `added` edges."""
+    edges = level['edges'] + added
+    graph = LevelGraph(level['nodes'], edges)
+    odd = graph.odd_nodes
+    starts = odd if odd else list(level['nodes'])
+    first_edge = level.get('first_edge')
+    trail = None
+    if first_edge and first_edge[0] in starts:
+        trail = euler_trail(graph, first_edge[0], first_edge)
+    if trail is None:
+        trail = euler_trail(graph, starts[0])
+    if trail is None or len(trail) < 2:
+        # No trail to start, so no edge to hint at either.
+        return starts, None
+    return starts, (trail[0], trail[1])
+
+
+def repaired_record(level, added):
+    """`level` with `added` edges and its hints updated to match."""
+    starts, first_edge = repaired_hints(level, added)
+    return dict(level, edges=level['edges'] + added, valid_starts=starts, first_edge=first_edge)
+
+
+def render_repair(level, added, source=None):
+    """Kotlin block for `level` with `added` edges. With the `source` bytes
+    and the level's span, the original block is patched in place so
+    comments and hint steps survive.
+    """
+    record = repaired_record(level, added)
+    block = None
+    if source is not None and 'span' in level:
+        block = patched_block(level, added, source, record['valid_starts'], record['first_edge'])
+    if block is None:
+        return '        ' + render_block(record, missing=MISSING_POSITION)
+
+    lo = level['span'][0]
+    indent = source[source.rfind(b'\n', 0, lo) + 1:lo].decode('utf-8')
+    return indent + block
+
+
+def patched_block(level, added, source, starts, first_edge):
+    """The level's own Level( ... ) text from `source` with `added` edges
+    appended and the hints rewritten, or None when the block has no edge
+    to append after or no hint fields to rewrite.
+    """
+    lo, hi = level['span']
+    block = source[lo:hi].decode('utf-8')
+    edges_at = block.find('edges')
+    if edges_at < 0:
+        return None
+    last = None
+    for last in _EDGE.finditer(block, edges_at):
+        pass
+    if last is None:
+        return None
+    new_edges = ''.join(f", Edge({a}, {b})" for a, b in added)
+    block = block[:last.end()] + new_edges + block[last.end():]
+    return set_hints(block, starts, first_edge)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--level', type=int, action='append', metavar='ID', help="only repair this level (repeatable)")
+    parser.add_argument('--circuit', action='store_true', help="pair every odd node, leaving none for a path")
+    parser.add_argument('--write', action='store_true', help="patch the repaired blocks into the source file")
+    args = parser.parse_args()
+
+    # Level spans are byte offsets into the source.
+    source = None
+    if not args.filepath.endswith(('.jsonl', '.lfpack')):
+        with open(args.filepath, 'rb') as f:
+            source = f.read()
+    elif args.write:
+        parser.error("--write needs a Kotlin source")
+
+    count = 0
+    repaired = 0
+    failed = 0
+    fixes = []
+    blocks = {}
+    for level in iter_levels(args.filepath):
+        if args.level and level['id'] not in args.level:
+            continue
+        count += 1
+        result = repair_level(level, args.circuit)
+        if result is None:
+            failed += 1
+            print(f"Level {level['id']} ({level['name']}) - could not be repaired by adding edges\n")
+            continue
+        added, total, method = result
+        if not added:
+            continue
+        repaired += 1
+        new_edges = ', '.join(f"Edge({a}, {b})" for a, b in added)
+        print(f"Level {level['id']} ({level['name']}) - adding {new_edges} (cost {total:.2f}, {method})")
+        if args.write:
+            record = repaired_record(level, added)
+            block = patched_block(level, added, source, record['valid_starts'], record['first_edge'])
+            if block is None:
+                # patch_file splices the repaired record into the block itself.
+                fixes.append(record)
+            else:
+                fixes.append(level)
+                blocks[level['span']] = block
+            continue
+        print(render_repair(level, added, source))
+        print()
+
+    if fixes:
+        patch_file(args.filepath, fixes, blocks=blocks)
+        print(f"Patched {len(fixes)} levels into {args.filepath}")
+
+    print(f"\nTotal: {count} levels, {repaired} repaired, {failed} could not be repaired")
+    return 1 if failed > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Solve every level in Graph.kt and export one reference trail per level.
+
+Trails come from an iterative, stack-based Hierholzer walk over the
+LevelGraph incidence arrays (CSR slots carrying edge indices, one "used"
+byte per edge), so each level is solved in time linear in its edges. The
+declared hints.firstEdge is checked by solving again with that edge forced
+first: it passes if some complete trail starts with it, in either direction
+(the hint draws it as an undirected line).
+
+The JSON written is an array of
+    {"id", "name", "trail": [node ids], "first_edge": [a, b] | null,
+     "first_edge_ok": bool | null}
+with "trail" null for levels that have no Eulerian trail. --jsonl writes
+the same objects as JSON Lines instead, one per line with no enclosing
+array, for tools that read a line at a time.
+"""
+import argparse
+import json
+import sys
+
+from graph_core import LevelGraph
+from validate_levels import iter_levels
+
+
+def trail_starts(graph):
+    """Node indices a complete trail may start from: the two odd vertices,
+    every vertex for a circuit, none when parity rules a trail out.
+    """
+    odd = [i for i, d in enumerate(graph.degree) if d & 1]
+    if not odd:
+        return range(len(graph.node_ids))
+    if len(odd) == 2:
+        return odd
+    return ()
+
+
+def has_trail(graph):
+    """Right parity, and every edge in one component."""
+    if not trail_starts(graph):
+        return False
+    find = graph.find
+    index = graph.index
+    return len({find(index[a]) for a, _ in graph.edges}) <= 1
+
+
+def euler_trail(graph, start_id, first_edge=None):
+    """Node ids of a trail from `start_id` using every edge once, or None.
+
+    With `first_edge` = (start_id, b), that edge is taken first. Parity is
+    checked up front; connectivity falls out of whether the walk used every
+    edge.
+    """
+    index = graph.index
+    start = index.get(start_id)
+    if start is None or start not in trail_starts(graph):
+        return None
+    if first_edge is not None:
+        a, b = first_edge
+        if a != start_id or not graph.has_edge(a, b):
+            return None
+    edge_count = len(graph.edges)
+    if edge_count == 0:
+        return [start_id]
+
+    offsets, neighbors, edge_ids = graph.incidence()
+    used = bytearray(edge_count)
+    head = []
+    if first_edge is not None:
+        ib = index[first_edge[1]]
+        for slot in range(offsets[start], offsets[start + 1]):
+            if neighbors[slot] == ib:
+                used[edge_ids[slot]] = 1
+                break
+        else:
+            return None
+        # Whatever the walk from b does, `start` stays first in the trail.
+        head = [start]
+        start = ib
+
+    # ptr[v] is the next unexamined slot of v, so every slot is looked at
+    # once over the whole walk.
+    ptr = list(offsets)
+    stack = [start]
+    trail = []
+    while stack:
+        v = stack[-1]
+        slot = ptr[v]
+        end = offsets[v + 1]
+        while slot < end and used[edge_ids[slot]]:
+            slot += 1
+        if slot == end:
+            ptr[v] = slot
+            trail.append(stack.pop())
+        else:
+            used[edge_ids[slot]] = 1
+            ptr[v] = slot + 1
+            stack.append(neighbors[slot])
+
+    if len(head) + len(trail) != edge_count + 1:
+        return None
+    trail.reverse()
+    ids = graph.node_ids
+    return [ids[i] for i in head + trail]
+
+
+def solve_level(level):
+    graph = LevelGraph(level['nodes'], level['edges'])
+    first_edge = level['first_edge']
+
+    trail = None
+    first_edge_ok = None
+    if first_edge is not None:
+        a, b = first_edge
+        trail = euler_trail(graph, a, (a, b)) or euler_trail(graph, b, (b, a))
+        first_edge_ok = trail is not None
+    if trail is None:
+        # A circuit can start anywhere, but not at a node the edges never reach.
+        degree = graph.degree
+        starts = [i for i in trail_starts(graph) if degree[i]] or trail_starts(graph)
+        if starts:
+            trail = euler_trail(graph, graph.node_ids[starts[0]])
+
+    return {
+        'id': level['id'],
+        'name': level['name'],
+        'trail': trail,
+        'first_edge': list(first_edge) if first_edge is not None else None,
+        'first_edge_ok': first_edge_ok,
+    }
+
+
+def write_solutions(solutions, out, jsonl=False):
+    """Stream `solutions` to `out` as one JSON array, a level per line, or
+    with `jsonl` as bare JSON Lines.
+    """
+    if jsonl:
+        for solution in solutions:
+            out.write(json.dumps(solution, separators=(',', ':')) + '\n')
+        return
+    out.write('[')
+    for i, solution in enumerate(solutions):
+        out.write(',\n' if i else '\n')
+        out.write(json.dumps(solution, separators=(',', ':')))
+    out.write('\n]\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--output', '-o', metavar='PATH', help="write the JSON here instead of stdout")
+    parser.add_argument('--jsonl', action='store_true', help="write one JSON object per line instead of an array")
+    args = parser.parse_args()
+
+    problems = []
+
+    def solved():
+        for level in iter_levels(args.filepath):
+            solution = solve_level(level)
+            if solution['trail'] is None:
+                problems.append(f"Level {level['id']} ({level['name']}): no Eulerian trail")
+            elif solution['first_edge_ok'] is False:
+                a, b = level['first_edge']
+                problems.append(f"Level {level['id']} ({level['name']}): no trail starts with firstEdge ({a},{b})")
+            yield solution
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            write_solutions(solved(), out, args.jsonl)
+    else:
+        write_solutions(solved(), sys.stdout, args.jsonl)
+
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
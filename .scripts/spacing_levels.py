@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Check edge angles and node spacing for a whole level pack with NumPy.
+
+Two layout rules that otherwise only run inside Gradle or on a device:
+
+  angle    the edges at a node must be at least --min-angle degrees apart,
+           the rule LevelValidationTest.allNodesHaveAdequateEdgeAngularSeparation
+           enforces (MIN_EDGE_ANGLE_DEGREES = 30.0, levels 28 and up)
+  touch    two nodes must be at least --min-touch-dp apart on a
+           --screen-dp wide screen, so a finger on one is never inside the
+           other's hit circle (OneLineDrawGame uses 3 x the 14dp node radius)
+
+Every level's positions and edges are packed into flat arrays, the angles
+of all incident edges of all levels come from one arctan2 call and are
+sorted per node, and close node pairs are found through a grid hash whose
+cells are one minimum distance wide, so only nodes in neighbouring cells
+are ever compared. Nothing loops per level or per pair in Python except
+rendering the messages of levels that fail.
+
+Requires numpy.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from validate_levels import iter_levels
+
+MIN_EDGE_ANGLE_DEGREES = 30.0
+# The Gradle test only holds levels from this id on to the angle rule.
+ANGLES_FROM_LEVEL = 28
+# OneLineDrawGame: nodeRadius = 14.dp, nodeHitRadius = nodeRadius * 3f.
+NODE_HIT_RADIUS_DP = 42.0
+# Narrowest common phone width; wider screens only spread nodes further.
+SCREEN_WIDTH_DP = 360.0
+# OneLineDrawGame pads the node bounding box by this much on each side.
+LAYOUT_PADDING = 0.08
+
+_SHIFT = np.int64(32)
+
+
+class PackedLayouts:
+    """Flat node positions and edge ends (as node rows) for a list of levels.
+
+    Positions are float32 like Compose's Offset. Nodes without a position
+    are NaN; edges with an end that is not a listed node are left out,
+    validate_levels reports those.
+    """
+
+    __slots__ = ('count', 'node_level', 'node_ids', 'x', 'y', 'edge_level', 'edge_a', 'edge_b')
+
+    def __init__(self, levels):
+        count = len(levels)
+        node_counts = np.fromiter((len(level['nodes']) for level in levels), np.int64, count)
+        edge_counts = np.fromiter((len(level['edges']) for level in levels), np.int64, count)
+        total = int(node_counts.sum())
+
+        missing = (np.nan, np.nan)
+        positions = np.fromiter(
+            (c for level in levels
+             for point in (level.get('positions') or [None] * len(level['nodes']))
+             for c in (point or missing)),
+            np.float32, 2 * total).reshape(-1, 2)
+
+        self.count = count
+        self.node_level = np.repeat(np.arange(count, dtype=np.int64), node_counts)
+        self.node_ids = np.fromiter((n for level in levels for n in level['nodes']), np.int64, total)
+        self.x = positions[:, 0]
+        self.y = positions[:, 1]
+
+        edge_level = np.repeat(np.arange(count, dtype=np.int64), edge_counts)
+        ends = np.fromiter(
+            (n for level in levels for edge in level['edges'] for n in edge),
+            np.int64, 2 * int(edge_counts.sum())).reshape(-1, 2)
+        # Look edge ends up by (level, node id); a repeated node id resolves
+        # to its first row, as LevelGraph does.
+        keys = (self.node_level << _SHIFT) | self.node_ids
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        rows = []
+        found = np.ones(len(ends), bool)
+        for column in (0, 1):
+            wanted = (edge_level << _SHIFT) | ends[:, column]
+            at = np.minimum(np.searchsorted(sorted_keys, wanted), max(len(sorted_keys) - 1, 0))
+            if len(sorted_keys):
+                found &= sorted_keys[at] == wanted
+                rows.append(order[at])
+            else:
+                found[:] = False
+                rows.append(at)
+        self.edge_level = edge_level[found]
+        self.edge_a = rows[0][found]
+        self.edge_b = rows[1][found]
+
+
+def angle_separations(pack):
+    """(node rows, smallest separation in degrees) for every node with two
+    or more edges, computed the way LevelValidationTest does it.
+    """
+    a = pack.edge_a
+    b = pack.edge_b
+    # One entry per incident edge; a loop shows up once, pointing at itself.
+    loop = a == b
+    center = np.concatenate([a, b[~loop]])
+    other = np.concatenate([b, a[~loop]])
+    dx = pack.x[other] - pack.x[center]
+    dy = pack.y[other] - pack.y[center]
+    usable = ~(np.isnan(dx) | np.isnan(dy))
+    center = center[usable]
+    # Float32 differences, then degrees in double, as in the Kotlin test.
+    angles = np.arctan2(dy[usable].astype(np.float64), dx[usable].astype(np.float64)) * (180.0 / np.pi)
+
+    order = np.lexsort((angles, center))
+    center = center[order]
+    angles = angles[order]
+    n = len(center)
+    if n == 0:
+        return np.zeros(0, np.int64), np.zeros(0)
+    starts = np.flatnonzero(np.r_[True, center[1:] != center[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+
+    # Each angle's successor around the node, wrapping to the group start.
+    following = np.arange(1, n + 1)
+    following[starts + sizes - 1] = starts
+    separation = angles[following] - angles
+    # Like the test, a step of zero (two edges in the same direction) wraps
+    # to 360; overlapping edges are geometry_levels.py's business.
+    separation[separation <= 0] += 360.0
+
+    checked = sizes >= 2
+    smallest = np.minimum.reduceat(separation, starts)
+    return center[starts][checked], smallest[checked]
+
+
+def close_pairs(pack, min_dp=NODE_HIT_RADIUS_DP, screen_dp=SCREEN_WIDTH_DP):
+    """(row pairs, distances in dp) of same-level nodes closer than `min_dp`.
+
+    Levels are scaled the way OneLineDrawGame fits them to the screen width.
+    Dense levels may also be stretched vertically, which only adds space, so
+    the horizontal scale is the worst case.
+    """
+    count = pack.count
+    placed = np.flatnonzero(~(np.isnan(pack.x) | np.isnan(pack.y)))
+    empty = (np.zeros((0, 2), np.int64), np.zeros(0))
+    if min_dp <= 0 or len(placed) < 2:
+        return empty
+    level = pack.node_level[placed]
+    x = pack.x[placed].astype(np.float64)
+    y = pack.y[placed].astype(np.float64)
+
+    lo = np.full(count, np.inf)
+    hi = np.full(count, -np.inf)
+    np.minimum.at(lo, level, x)
+    np.maximum.at(hi, level, x)
+    span = np.where(hi >= lo, hi - lo, 0.0)
+    dp_per_unit = screen_dp / (span + 2 * LAYOUT_PADDING)
+    cell = (min_dp / dp_per_unit)[level]
+
+    # Grid cells one minimum distance wide: a close pair is always in the
+    # same or a neighbouring cell. Coordinates are shifted to start at 1 so
+    # the neighbour offsets below never wrap into another row or level.
+    cx = np.floor(x / cell).astype(np.int64)
+    cy = np.floor(y / cell).astype(np.int64)
+    cx -= cx.min() - 1
+    cy -= cy.min() - 1
+    width = int(max(cx.max(), cy.max())) + 2
+    if count * width * width >= 1 << 62:
+        raise ValueError("grid too fine to pack cell keys into int64; raise the minimum distance")
+    keys = (level * width + cx) * width + cy
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+
+    # Half the 3x3 neighbourhood, so every pair is generated once; within a
+    # cell only later entries are paired.
+    firsts = []
+    seconds = []
+    positions = np.arange(len(keys))
+    for ox, oy in ((0, 0), (0, 1), (1, -1), (1, 0), (1, 1)):
+        target = keys + ox * width + oy
+        if ox == 0 and oy == 0:
+            begin = positions + 1
+        else:
+            begin = np.searchsorted(keys, target, 'left')
+        end = np.searchsorted(keys, target, 'right')
+        counts = np.maximum(end - begin, 0)
+        total = int(counts.sum())
+        if not total:
+            continue
+        base = np.repeat(begin - np.cumsum(counts) + counts, counts)
+        firsts.append(np.repeat(positions, counts))
+        seconds.append(base + np.arange(total))
+    if not firsts:
+        return empty
+    i = order[np.concatenate(firsts)]
+    j = order[np.concatenate(seconds)]
+
+    scale = dp_per_unit[level[i]]
+    distance = np.hypot(x[i] - x[j], y[i] - y[j]) * scale
+    close = distance < min_dp
+    pairs = np.stack([placed[i[close]], placed[j[close]]], axis=1)
+    return pairs, distance[close]
+
+
+def _angle_failures(pack, levels, min_angle, angles_from):
+    rows, smallest = angle_separations(pack)
+    ids = np.fromiter((level['id'] for level in levels), np.int64, pack.count)
+    failing = (smallest < min_angle) & (ids[pack.node_level[rows]] >= angles_from)
+    return rows[failing], smallest[failing]
+
+
+def spacing_failures(levels, min_angle=MIN_EDGE_ANGLE_DEGREES, angles_from=ANGLES_FROM_LEVEL,
+                     min_dp=NODE_HIT_RADIUS_DP, screen_dp=SCREEN_WIDTH_DP):
+    """Boolean array, True for every level that breaks a rule. Skips
+    building messages, for filtering large batches of candidates.
+    """
+    pack = PackedLayouts(levels)
+    failed = np.zeros(pack.count, bool)
+    rows, _ = _angle_failures(pack, levels, min_angle, angles_from)
+    failed[pack.node_level[rows]] = True
+    pairs, _ = close_pairs(pack, min_dp, screen_dp)
+    failed[pack.node_level[pairs[:, 0]]] = True
+    return failed
+
+
+def spacing_issues(levels, min_angle=MIN_EDGE_ANGLE_DEGREES, angles_from=ANGLES_FROM_LEVEL,
+                   min_dp=NODE_HIT_RADIUS_DP, screen_dp=SCREEN_WIDTH_DP):
+    """Issue lists for every level. The angle rule only applies to levels
+    whose id is at least `angles_from`.
+    """
+    pack = PackedLayouts(levels)
+    issues = [[] for _ in range(pack.count)]
+    node_level = pack.node_level
+    node_ids = pack.node_ids
+
+    rows, smallest = _angle_failures(pack, levels, min_angle, angles_from)
+    rows = rows.tolist()
+    if rows:
+        # Neighbour lists only for the failing nodes, in edge order.
+        wanted = np.array(rows, np.int64)
+        touching = np.flatnonzero(np.isin(pack.edge_a, wanted) | np.isin(pack.edge_b, wanted))
+        wanted = set(rows)
+        neighbors = {}
+        for a, b in zip(pack.edge_a[touching].tolist(), pack.edge_b[touching].tolist()):
+            if a in wanted:
+                neighbors.setdefault(a, []).append(b)
+            if b in wanted and a != b:
+                neighbors.setdefault(b, []).append(a)
+        id_of = node_ids.tolist()
+        for row, separation in zip(rows, smallest.tolist()):
+            connected = [id_of[n] for n in neighbors[row]]
+            issues[int(node_level[row])].append(
+                f"Node {id_of[row]} has edges only {separation:.1f}° apart "
+                f"(minimum {min_angle:g}°), connected nodes: {connected}"
+            )
+
+    pairs, distances = close_pairs(pack, min_dp, screen_dp)
+    for (a, b), distance in sorted(zip(pairs.tolist(), distances.tolist())):
+        first, second = sorted((int(node_ids[a]), int(node_ids[b])))
+        issues[int(node_level[a])].append(
+            f"Nodes {first} and {second} are {distance:.0f}dp apart (minimum {min_dp:g}dp)")
+    return issues
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--min-angle', type=float, default=MIN_EDGE_ANGLE_DEGREES, metavar='DEG')
+    parser.add_argument('--angles-from', type=int, default=ANGLES_FROM_LEVEL, metavar='ID',
+                        help="only apply the angle rule from this level id on (default %(default)s, as in the Gradle test)")
+    parser.add_argument('--min-touch-dp', type=float, default=NODE_HIT_RADIUS_DP, metavar='DP')
+    parser.add_argument('--screen-dp', type=float, default=SCREEN_WIDTH_DP, metavar='DP')
+    args = parser.parse_args()
+
+    levels = list(iter_levels(args.filepath))
+    all_issues = spacing_issues(levels, args.min_angle, args.angles_from, args.min_touch_dp, args.screen_dp)
+    total_issues = 0
+    for level, issues in zip(levels, all_issues):
+        if issues:
+            print(f"Level {level['id']} ({level['name']}):")
+            for issue in issues:
+                print(f"  ERROR: {issue}")
+            total_issues += len(issues)
+
+    print(f"\nTotal: {len(levels)} levels, {total_issues} spacing issues")
+    return 1 if total_issues > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
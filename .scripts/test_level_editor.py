@@ -0,0 +1,117 @@
+"""Differential test of level_editor against validate_levels.
+
+Random edit, undo and redo sequences run on small random levels, most of
+them with edges to nodes the level does not have; after every step the
+editor's kept state must agree with validate_level on ed.level(). Runs
+under pytest or as `python test_level_editor.py [SEEDS]`.
+"""
+import random
+import sys
+
+from graph_core import LevelGraph
+from level_editor import EditableLevel
+from validate_levels import validate_level
+
+
+def random_level(rng, level_id):
+    """A small level whose edges may reference up to three missing nodes."""
+    count = rng.randint(1, 7)
+    nodes = rng.sample(range(count + 3), count)
+    ids = nodes + rng.sample([n for n in range(count + 3) if n not in nodes], rng.randint(0, 3))
+    edges = []
+    for _ in range(rng.randint(0, 2 * count)):
+        a, b = rng.sample(ids, 2) if len(ids) > 1 else (ids[0], ids[0] + 1)
+        edges.append((a, b))
+    return {
+        'id': level_id,
+        'name': f"Random {level_id}",
+        'nodes': nodes,
+        'positions': [(rng.random(), rng.random()) for _ in nodes],
+        'edges': edges,
+        'valid_starts': rng.sample(nodes, rng.randint(0, len(nodes))),
+        'first_edge': rng.choice(edges) if edges and rng.random() < 0.5 else None,
+    }
+
+
+def check(ed):
+    level = ed.level()
+    expected = validate_level(level)
+    assert ed.issues() == expected, (level, ed.issues(), expected)
+    assert ed.is_valid == (not expected), level
+    graph = LevelGraph(level['nodes'], level['edges'])
+    assert ed.odd_nodes == graph.odd_nodes, level
+    assert ed.is_connected == graph.is_connected, level
+
+
+def random_edit(rng, ed, referenced):
+    nodes = ed.nodes
+    r = rng.random()
+    if r < 0.2 and len(nodes) > 1:
+        ed.add_edge(*rng.sample(nodes, 2))
+    elif r < 0.35 and ed.edges:
+        ed.remove_edge(*rng.choice(ed.edges))
+    elif r < 0.42 and ed.edges and len(nodes) > 1:
+        ed.move_edge(rng.choice(ed.edges), tuple(rng.sample(nodes, 2)))
+    elif r < 0.55:
+        # Mostly a node some edge already points at, as when fixing a level.
+        missing = [n for n in referenced if n not in nodes]
+        node = rng.choice(missing) if missing and rng.random() < 0.7 else max(nodes, default=0) + 1
+        ed.add_node(node, (rng.random(), rng.random()))
+    elif r < 0.65 and nodes:
+        ed.remove_node(rng.choice(nodes))
+    elif r < 0.7 and nodes:
+        ed.move_node(rng.choice(nodes), (0.5, 0.5))
+    elif r < 0.75:
+        ed.sync_hints()
+    elif r < 0.78:
+        ed.set_hints(first_edge=rng.choice(ed.edges + [None]))
+    elif r < 0.9:
+        ed.undo()
+    else:
+        ed.redo()
+
+
+def run(seed, levels=200, steps=40):
+    rng = random.Random(seed)
+    for level_id in range(1, levels + 1):
+        level = random_level(rng, level_id)
+        ed = EditableLevel(level)
+        original = ed.level()
+        referenced = {n for edge in level['edges'] for n in edge}
+        check(ed)
+        for _ in range(steps):
+            try:
+                random_edit(rng, ed, referenced)
+            except ValueError:
+                pass
+            check(ed)
+        while ed.undo():
+            check(ed)
+        assert ed.level() == original
+        while ed.redo():
+            check(ed)
+
+
+def test_fix_invalid_reference():
+    ed = EditableLevel({'id': 1, 'name': "Fix", 'nodes': [0], 'edges': [(1, 0)], 'valid_starts': [0],
+                        'first_edge': None})
+    ed.add_node(1)
+    check(ed)
+    ed.remove_node(1)
+    check(ed)
+    assert ed.components == 1
+    ed.undo()
+    ed.undo()
+    check(ed)
+
+
+def test_random_edits():
+    for seed in range(5):
+        run(seed)
+
+
+if __name__ == '__main__':
+    for seed in range(int(sys.argv[1]) if len(sys.argv) > 1 else 5):
+        run(seed)
+    test_fix_invalid_reference()
+    print("OK")
@@ -0,0 +1,135 @@
+"""Differential test of patch_levels against scan_levels.
+
+Random edits to the node, edge, start, firstEdge, name and hint step
+fields of a random subset of Graph.kt's levels are patched into a copy of
+the file; rescanning the copy must give exactly the edited records, and
+every byte outside the changed blocks must be as it was. Patching the
+unedited records must leave the file untouched. Runs under pytest or as
+`python test_patch_levels.py [SEEDS]`.
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+from patch_levels import patch_file
+from validate_levels import parse_levels
+
+GRAPH_KT = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'src', 'main', 'java', 'app', 'curious', 'lineflow',
+    'Graph.kt')
+# What a record is compared on; span and lines move with every patch.
+COMPARED = ('id', 'name', 'nodes', 'positions', 'edges', 'valid_starts', 'first_edge', 'steps')
+
+
+def fields(level):
+    return {key: level[key] for key in COMPARED}
+
+
+def position(rng):
+    # Three decimals survive render_block's %g literals exactly.
+    return (round(rng.random(), 3), round(rng.random(), 3))
+
+
+def random_edit(rng, level):
+    """Apply one random change to `level` in place."""
+    nodes = level['nodes']
+    edges = level['edges']
+    steps = level['steps']
+    r = rng.random()
+    if r < 0.2 and len(nodes) > 1:
+        edges.insert(rng.randint(0, len(edges)), tuple(rng.sample(nodes, 2)))
+    elif r < 0.35 and edges:
+        del edges[rng.randrange(len(edges))]
+    elif r < 0.45 and edges and len(nodes) > 1:
+        edges[rng.randrange(len(edges))] = tuple(rng.sample(nodes, 2))
+    elif r < 0.55:
+        nodes.append(max(nodes, default=-1) + 1)
+        level['positions'].append(position(rng))
+    elif r < 0.62 and len(nodes) > 1:
+        # Edges to the removed node stay, as in a level being fixed.
+        i = rng.randrange(len(nodes))
+        del nodes[i]
+        del level['positions'][i]
+    elif r < 0.7 and nodes:
+        level['positions'][rng.randrange(len(nodes))] = position(rng)
+    elif r < 0.77:
+        level['valid_starts'] = sorted(rng.sample(nodes, rng.randint(0, min(3, len(nodes)))))
+    elif r < 0.83:
+        level['first_edge'] = rng.choice(edges + [None])
+    elif r < 0.87:
+        level['name'] = f"Renamed {rng.randint(0, 999)}"
+    elif r < 0.93:
+        steps.insert(rng.randint(0, len(steps)), (f"Step {rng.randint(0, 999)}", rng.random() < 0.5, False))
+    elif steps:
+        del steps[rng.randrange(len(steps))]
+
+
+def copy_level(level):
+    return dict(
+        level, nodes=list(level['nodes']), positions=list(level['positions']), edges=list(level['edges']),
+        valid_starts=list(level['valid_starts']), steps=list(level['steps']))
+
+
+def outside(buf, spans):
+    """The bytes of `buf` outside `spans`, one piece per gap."""
+    pieces = []
+    at = 0
+    for start, end in spans:
+        pieces.append(buf[at:start])
+        at = end
+    pieces.append(buf[at:])
+    return pieces
+
+
+def run(seed, rounds=20):
+    rng = random.Random(seed)
+    with open(GRAPH_KT, 'rb') as f:
+        source = f.read()
+    levels = parse_levels(GRAPH_KT)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Graph.kt')
+        for _ in range(rounds):
+            shutil.copyfile(GRAPH_KT, path)
+            chosen = set(rng.sample(range(len(levels)), rng.randint(1, 6)))
+            expected = []
+            for i, level in enumerate(levels):
+                level = copy_level(level)
+                if i in chosen:
+                    for _ in range(rng.randint(1, 8)):
+                        random_edit(rng, level)
+                expected.append(level)
+
+            patch_file(path, [expected[i] for i in sorted(chosen)])
+            with open(path, 'rb') as f:
+                patched = f.read()
+            found = parse_levels(path)
+            assert [fields(level) for level in found] == [fields(level) for level in expected], seed
+
+            # Compare the changed blocks' old and new spans by level order,
+            # so a block whose record ended up unchanged counts too.
+            changed = sorted(chosen)
+            assert outside(source, [levels[i]['span'] for i in changed]) == \
+                outside(patched, [found[i]['span'] for i in changed]), seed
+
+
+def test_round_trip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'Graph.kt')
+        shutil.copyfile(GRAPH_KT, path)
+        assert patch_file(path, parse_levels(path)) == []
+        with open(GRAPH_KT, 'rb') as a, open(path, 'rb') as b:
+            assert a.read() == b.read()
+
+
+def test_random_edits():
+    for seed in range(5):
+        run(seed)
+
+
+if __name__ == '__main__':
+    for seed in range(int(sys.argv[1]) if len(sys.argv) > 1 else 5):
+        run(seed)
+    test_round_trip()
+    print("OK")
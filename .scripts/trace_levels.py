@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Check solution traces (node-id sequences) against the levels in Graph.kt.
+
+Traces are read as JSON Lines, one trace per line, either
+    [level_id, [node ids...]]
+or an object with "id" (or "level") and "trail", as solve_levels --jsonl
+writes them. solve_levels' default output, a JSON array with one element
+per line, is read too: the "[" and "]" lines are skipped and the comma
+ending each element is dropped. A trace is valid when every step follows
+an edge of its level, no edge is drawn twice and every edge is drawn;
+otherwise it is reported with the first thing wrong with it:
+
+  invalid move   a node the level does not have, or no edge between two
+                 consecutive nodes
+  repeated edge  an edge drawn a second time
+  incomplete     the trace ends with edges left undrawn
+  unknown level  no level with that id
+  malformed      not a trace
+
+Edges are undirected and a pair of nodes counts once, like
+OneLineDrawGame draws it. Each level gets its check table the first time
+a trace needs it: node ids mapped to dense indices, an n*n table giving
+the edge index of every node pair (a dict past DENSE_NODES nodes), and a
+preallocated byte per edge marking it drawn, cleared with one slice copy
+per trace. A step is a few list lookups and allocates nothing, and memory
+stays the same however many traces come through. "-" reads traces from
+stdin.
+"""
+import argparse
+import json
+import sys
+import time
+
+from validate_levels import iter_levels
+
+KINDS = ('invalid move', 'repeated edge', 'incomplete', 'unknown level', 'malformed')
+# Above this many nodes the pair table is a dict instead of an n*n list.
+DENSE_NODES = 512
+
+
+class _SparsePairs(dict):
+    def __missing__(self, key):
+        return -1
+
+
+class TraceTable:
+    """Edge lookup table and drawn-edge bitmap for one level."""
+
+    __slots__ = ('level', 'index', 'n', 'edge_at', 'drawn', 'clear', 'edge_count')
+
+    def __init__(self, level):
+        self.level = level
+        nodes = list(dict.fromkeys(level['nodes']))
+        index = {node: i for i, node in enumerate(nodes)}
+        n = len(nodes)
+        edge_at = [-1] * (n * n) if n <= DENSE_NODES else _SparsePairs()
+        edge_count = 0
+        for a, b in level['edges']:
+            ia = index.get(a)
+            ib = index.get(b)
+            if ia is None or ib is None or edge_at[ia * n + ib] >= 0:
+                # Edges to unknown nodes can never be drawn (validate_levels
+                # reports them); repeated pairs are one line on screen.
+                continue
+            edge_at[ia * n + ib] = edge_at[ib * n + ia] = edge_count
+            edge_count += 1
+        self.index = index
+        self.n = n
+        self.edge_at = edge_at
+        self.drawn = bytearray(edge_count)
+        self.clear = bytes(edge_count)
+        self.edge_count = edge_count
+
+    def check(self, trail):
+        """None for a complete trail, else (kind, message)."""
+        index = self.index
+        if not trail:
+            return ('incomplete', f"empty trace, {self.edge_count} edges undrawn") if self.edge_count else None
+        i = index.get(trail[0])
+        if i is None:
+            return 'invalid move', f"starts at unknown node {trail[0]}"
+        n = self.n
+        edge_at = self.edge_at
+        drawn = self.drawn
+        drawn[:] = self.clear
+        step = 0
+        for node in trail[1:]:
+            step += 1
+            j = index.get(node)
+            if j is None:
+                return 'invalid move', f"step {step}: unknown node {node}"
+            e = edge_at[i * n + j]
+            if e < 0:
+                return 'invalid move', f"step {step}: no edge {trail[step - 1]}-{node}"
+            if drawn[e]:
+                return 'repeated edge', f"step {step}: edge {trail[step - 1]}-{node} drawn again"
+            drawn[e] = 1
+            i = j
+        if step < self.edge_count:
+            return 'incomplete', f"{self.edge_count - step} of {self.edge_count} edges undrawn"
+        return None
+
+
+def parse_trace(line):
+    """(level id, node ids) from one JSON line, or None if it is not a trace."""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None
+    if isinstance(record, list) and len(record) == 2:
+        level_id, trail = record
+    elif isinstance(record, dict):
+        level_id = record.get('id', record.get('level'))
+        trail = record.get('trail')
+    else:
+        return None
+    if not isinstance(level_id, int) or not isinstance(trail, list):
+        return None
+    return level_id, trail
+
+
+def verify_traces(lines, levels):
+    """Yield (line number, level or None, kind, message) for every trace in
+    `lines`, kind and message None for a valid one; `levels` maps level ids
+    to level records. Tables are built on first use and kept for the rest
+    of the stream.
+    """
+    tables = {}
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line in ('[', ']'):
+            continue
+        trace = parse_trace(line[:-1] if line.endswith(',') else line)
+        if trace is None:
+            yield lineno, None, 'malformed', "not a [level_id, [node ids]] trace"
+            continue
+        level_id, trail = trace
+        table = tables.get(level_id)
+        if table is None:
+            level = levels.get(level_id)
+            if level is None:
+                yield lineno, None, 'unknown level', f"no level {level_id}"
+                continue
+            table = tables[level_id] = TraceTable(level)
+        try:
+            problem = table.check(trail)
+        except TypeError:
+            # Unhashable node ids (lists, dicts) in the trace.
+            problem = 'malformed', "node ids must be integers"
+        if problem is None:
+            yield lineno, table.level, None, None
+        else:
+            yield lineno, table.level, *problem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('traces', help="JSON Lines file of traces, or - for stdin")
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument('--quiet', '-q', action='store_true', help="only print the totals")
+    args = parser.parse_args()
+
+    levels = {level['id']: level for level in iter_levels(args.filepath)}
+    counts = dict.fromkeys(KINDS, 0)
+    started = time.perf_counter()
+    source = sys.stdin if args.traces == '-' else open(args.traces)
+    traces = 0
+    with source:
+        for lineno, level, kind, message in verify_traces(source, levels):
+            traces += 1
+            if kind is None:
+                continue
+            counts[kind] += 1
+            if args.quiet:
+                continue
+            if level is None:
+                print(f"{args.traces}:{lineno}: {message}")
+            else:
+                print(f"{args.traces}:{lineno}: Level {level['id']} ({level['name']}): {message}")
+    elapsed = time.perf_counter() - started
+
+    failed = sum(counts.values())
+    print(f"\nTotal: {traces} traces, {failed} invalid ("
+          + ", ".join(f"{counts[kind]} {kind}" for kind in KINDS) + ")")
+    print(f"{traces / elapsed if elapsed else 0:.0f} traces/s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
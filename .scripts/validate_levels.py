@@ -1,114 +1,407 @@
 #!/usr/bin/env python3
 """Validate all levels in Graph.kt for Eulerian path correctness."""
+import argparse
+import contextlib
+import json
+import mmap
+import os
 import re
 import sys
-from collections import defaultdict, deque
-
-
-def parse_levels(filepath):
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+from graph_core import LevelGraph
+
+
+# Bump whenever validate_level's checks or messages change, so cached results
+# from an older validator are never reused.
+VALIDATOR_VERSION = 1
+
+# The body of a string literal up to its closing quote, as an unrolled loop:
+# each byte can match one way only, so an unclosed quote (common while a
+# file is being edited) fails in linear time instead of backtracking.
+_STRING_BODY = rb'[^"\\\n]*(?:\\.[^"\\\n]*)*'
+_STRING = _STRING_BODY + rb'"'
+
+
+def _token(name, pattern, word=False):
+    # sre only skips ahead quickly when every alternative opens with a plain
+    # literal, so the named group starts after the first byte.
+    split = 2 if pattern.startswith(b'\\') else 1
+    head, tail = pattern[:split], pattern[split:]
+    if word:
+        head += rb'(?<!\w' + head + rb')'
+    return head + rb'(?P<' + name.encode() + rb'>' + tail + rb')'
+
+
+# Unrolled so every byte of a list body has exactly one way to match, which
+# keeps a list that turns out not to be well-formed from backtracking.
+_LIST_BODY = rb'[\s,]*(?:(?:%s|//[^\n]*(?![^\n]))[\s,]*)*'
+_NODE = rb'Node\(\s*\d+\s*,\s*Offset\([^()]*\)\s*\)'
+_EDGE = rb'Edge\(\s*\d+\s*,\s*\d+\s*\)'
+# Positions are read when the Offset holds two float literals; any other
+# expression leaves that node's position as None.
+_NODE_ITEM = re.compile(
+    rb'//[^\n]*|Node\(\s*(\d+)(?:\s*,\s*Offset\(\s*([-+\d.eE]+)[fF]?\s*,\s*([-+\d.eE]+)[fF]?\s*\))?')
+_EDGE_ITEM = re.compile(rb'//[^\n]*|Edge\(\s*(\d+)\s*,\s*(\d+)')
+_DIGITS = re.compile(rb'\d+')
+# For translate(): every byte but digits and dots becomes a space.
+_NUMBERS = bytes(c if c in b'0123456789.' else 0x20 for c in range(256))
+# Inside a HintStep(...) token: its text (the first string literal, kept as
+# written, escapes and all) and the two flags.
+_STEP_TEXT = re.compile(rb'"(' + _STRING_BODY + rb')"')
+_STEP_STARTS = re.compile(rb'showValidStarts\s*=\s*true\b')
+_STEP_FIRST = re.compile(rb'showFirstEdge\s*=\s*true\b')
+_STEP = rb'HintStep\([^()"]*(?:"' + _STRING + rb'[^()"]*)*\)'
+_STEP_ITEM = re.compile(rb'//[^\n]*|' + _STEP)
+_STARTS_BODY = rb'\s*(?:\d+\s*(?:,\s*\d+\s*)*,?\s*)?'
+
+# One alternation over the whole buffer: every construct we care about is a
+# single token, and anything that can hide a false match (comments, string
+# literals) is consumed as a token of its own and ignored. Well-formed node
+# and edge lists are taken as one token each and their items read back from
+# the captured slice; anything irregular falls through to the per-item tokens.
+_TOKEN = re.compile(b'|'.join([
+    _token('comment', rb'//[^\n]*'),
+    # Only the opening; scan_levels() finds the end.
+    _token('block_comment', rb'/\*'),
+    # A whole level in the layout Graph.kt uses, with nothing in it the
+    # tokens below would read differently (comments only as lines of its
+    # lists, every list well-formed), taken as one token; any other level
+    # is read token by token from its Level(.
+    _token('block', (
+        rb'Level\(\s*id\s*=\s*(?P<block_id>\d+)\s*,'
+        rb'\s*name\s*=\s*"(?P<block_name>' + _STRING_BODY + rb')"\s*,'
+        rb'\s*nodes\s*=\s*listOf\((?P<block_nodes>' + _LIST_BODY % _NODE + rb')\)\s*,'
+        rb'\s*edges\s*=\s*listOf\((?P<block_edges>' + _LIST_BODY % _EDGE + rb')\)\s*,'
+        rb'\s*hints\s*=\s*LevelHints\('
+        rb'\s*validStartNodeIds\s*=\s*listOf\((?P<block_starts>' + _STARTS_BODY + rb')\)\s*,'
+        rb'\s*firstEdge\s*=\s*(?:Pair\(\s*(?P<block_first_a>\d+)\s*,\s*(?P<block_first_b>\d+)\s*\)|null)'
+        rb'(?:\s*,\s*steps\s*=\s*listOf\((?P<block_steps>' + _LIST_BODY % _STEP + rb')\))?'
+        rb'\s*,?\s*\)\s*,?\s*\)'
+    ), word=True),
+    _token('level', rb'Level\(', word=True),
+    _token('id', rb'id\s*=\s*(?P<id_value>\d+)', word=True),
+    _token('name', rb'name\s*=\s*"(?P<name_value>' + _STRING_BODY + rb')"', word=True),
+    _token('node_list', rb'nodes\s*=\s*listOf\((?P<node_items>' + _LIST_BODY % _NODE + rb')\)', word=True),
+    _token('edge_list', rb'edges\s*=\s*listOf\((?P<edge_items>' + _LIST_BODY % _EDGE + rb')\)', word=True),
+    _token('nodes', rb'nodes\s*=\s*listOf\(', word=True),
+    _token('edges', rb'edges\s*=\s*listOf\(', word=True),
+    _token('node', rb'Node\(\s*(?P<node_id>\d+)[^()]*(?:\([^()]*\)[^()]*)*\)', word=True),
+    _token('edge', rb'Edge\(\s*(?P<edge_a>\d+)\s*,\s*(?P<edge_b>\d+)\s*\)', word=True),
+    # Only a well-formed list: a half-typed one like listOf(0 1, 2) is left
+    # to the open/close tokens and the level comes out with no starts.
+    _token('starts', rb'validStartNodeIds\s*=\s*listOf\((?P<starts_value>' + _STARTS_BODY + rb')\)', word=True),
+    _token('first', rb'firstEdge\s*=\s*Pair\(\s*(?P<first_a>\d+)\s*,\s*(?P<first_b>\d+)\s*\)', word=True),
+    _token('step', _STEP, word=True),
+    _token('string', rb'"' + _STRING),
+    _token('open', rb'\('),
+    _token('close', rb'\)'),
+]))
+
+
+def _position(x, y):
+    try:
+        return (float(x), float(y)) if x else None
+    except ValueError:
+        return None
+
+
+def _hint_step(token):
+    text = _STEP_TEXT.search(token)
+    flags = b'true' in token
+    return (
+        text.group(1).decode('utf-8') if text else '',
+        flags and _STEP_STARTS.search(token) is not None,
+        flags and _STEP_FIRST.search(token) is not None,
+    )
+
+
+def _node_items(items):
+    """(node ids, positions) of a node list body; conversion runs through
+    map() and zip() rather than a Python loop per node.
+    """
+    if b'//' not in items:
+        # Graph.kt's layout, Node(id, Offset(xf, yf)) with plain decimals
+        # and spaces only after commas, is split on everything but the
+        # numbers; anything else, or a number float() rejects, goes
+        # through _NODE_ITEM.
+        count = items.count(b'Node(')
+        shape = b' '.join(items.split()).translate(None, b'0123456789.').rstrip(b',')
+        if shape == b', '.join([b'Node(, Offset(f, f))'] * count):
+            numbers = items.translate(_NUMBERS).split()
+            if len(numbers) == 3 * count:
+                try:
+                    return (list(map(int, numbers[0::3])),
+                            list(zip(map(float, numbers[1::3]), map(float, numbers[2::3]))))
+                except ValueError:
+                    pass
+    found = _NODE_ITEM.findall(items)
+    if b'//' in items:
+        found = [item for item in found if item[0]]
+    if not found:
+        return [], []
+    ids, xs, ys = zip(*found)
+    try:
+        positions = list(zip(map(float, xs), map(float, ys)))
+    except ValueError:
+        positions = [_position(x, y) for x, y in zip(xs, ys)]
+    return list(map(int, ids)), positions
+
+
+def _edge_items(items):
+    """Edges of an edge list body; its only numbers are the edges' ends
+    unless it holds a comment.
+    """
+    if b'//' in items:
+        return [(int(a), int(b)) for a, b in _EDGE_ITEM.findall(items) if a]
+    ends = map(int, items.translate(_NUMBERS).split())
+    return list(zip(ends, ends))
+
+
+def scan_levels(buf, start=0, end=None, line=1):
+    """Yield level records from buf[start:end] in a single forward pass.
+
+    `line` is the line number of buf[start]. Each record carries its
+    absolute byte span (Level( to the matching paren) and 1-based line span,
+    and one (x, y) position per node (None where the Offset isn't a pair of
+    float literals). Hint steps are (text, showValidStarts, showFirstEdge).
+    """
+    if end is None:
+        end = len(buf)
+
+    in_level = False
+    depth = 0
+    line_pos = start
+
+    pos = start
+    while pos is not None:
+        matches = _TOKEN.finditer(buf, pos, end)
+        pos = None
+        for m in matches:
+            kind = m.lastgroup
+            if kind == 'block_comment':
+                # The end of a comment is found with bytes.find: as a lazy
+                # regex, every /* without a */ (one being typed, say) cost a
+                # failed match to the end of the buffer.
+                close = buf.find(b'*/', m.end(), end)
+                if close >= 0:
+                    pos = close + 2
+                    break
+                continue
+            if not in_level:
+                if kind == 'block':
+                    line += buf[line_pos:m.start()].count(b'\n')
+                    first_line = line
+                    line += buf[m.start():m.end()].count(b'\n')
+                    line_pos = m.end()
+                    nodes, positions = _node_items(m.group('block_nodes'))
+                    first_a, first_b, steps = m.group('block_first_a', 'block_first_b', 'block_steps')
+                    yield {
+                        'id': int(m.group('block_id')),
+                        'name': m.group('block_name').decode('utf-8'),
+                        'nodes': nodes,
+                        'positions': positions,
+                        'edges': _edge_items(m.group('block_edges')),
+                        'valid_starts': list(map(int, _DIGITS.findall(m.group('block_starts')))),
+                        'first_edge': (int(first_a), int(first_b)) if first_a else None,
+                        'steps': [_hint_step(step) for step in _STEP_ITEM.findall(steps) if step[:2] != b'//']
+                        if steps else [],
+                        'span': m.span(),
+                        'lines': (first_line, line),
+                    }
+                    continue
+                if kind == 'level':
+                    line += buf[line_pos:m.start()].count(b'\n')
+                    line_pos = level_start = m.start()
+                    first_line = line
+                    level_id = name = nodes = positions = edges = first_edge = None
+                    valid_starts = []
+                    steps = []
+                    in_level = True
+                    depth = 1
+                continue
+
+            # Ordered by how often each token shows up inside a level.
+            if kind == 'edge':
+                if edges is not None:
+                    a, b = m.group('edge_a', 'edge_b')
+                    edges.append((int(a), int(b)))
+            elif kind == 'node':
+                if nodes is not None:
+                    _, x, y = _NODE_ITEM.match(m.group()).groups()
+                    nodes.append(int(m.group('node_id')))
+                    positions.append(_position(x, y))
+            elif kind == 'node_list':
+                nodes, positions = _node_items(m.group('node_items'))
+            elif kind == 'edge_list':
+                edges = _edge_items(m.group('edge_items'))
+            elif kind == 'open' or kind == 'level':
+                depth += 1
+            elif kind == 'block':
+                # Nested in a level still open, where it is only a Level(.
+                depth += 1
+                pos = m.start() + len(b'Level(')
+                break
+            elif kind == 'close':
+                depth -= 1
+                if depth == 0:
+                    in_level = False
+                    line += buf[line_pos:m.end()].count(b'\n')
+                    line_pos = m.end()
+                    if None in (level_id, name, nodes, edges):
+                        continue
+                    yield {
+                        'id': level_id,
+                        'name': name,
+                        'nodes': nodes,
+                        'positions': positions,
+                        'edges': edges,
+                        'valid_starts': valid_starts,
+                        'first_edge': first_edge,
+                        'steps': steps,
+                        'span': (level_start, m.end()),
+                        'lines': (first_line, line),
+                    }
+            elif kind == 'nodes':
+                nodes = []
+                positions = []
+                depth += 1
+            elif kind == 'edges':
+                edges = []
+                depth += 1
+            elif kind == 'id':
+                if level_id is None:
+                    level_id = int(m.group('id_value'))
+            elif kind == 'name':
+                if name is None:
+                    name = m.group('name_value').decode('utf-8')
+            elif kind == 'starts':
+                valid_starts = [int(x) for x in m.group('starts_value').split(b',') if x.strip()]
+            elif kind == 'first':
+                a, b = m.group('first_a', 'first_b')
+                first_edge = (int(a), int(b))
+            elif kind == 'step':
+                steps.append(_hint_step(m.group()))
+
+
+def level_spans(buf, start=0, end=None):
+    """Yield the (start, end) byte span of every top-level Level(...) in
+    buf[start:end], reading tokens exactly as scan_levels() does but
+    building no records.
+
+    scan_levels(buf, *span) gives the record of a span, or nothing when the
+    level lacks its id, name, nodes or edges; a span scan_levels() has no
+    record for is still yielded here.
+    """
+    if end is None:
+        end = len(buf)
+
+    depth = 0
+    pos = start
+    while pos is not None:
+        matches = _TOKEN.finditer(buf, pos, end)
+        pos = None
+        for m in matches:
+            kind = m.lastgroup
+            if kind == 'block_comment':
+                close = buf.find(b'*/', m.end(), end)
+                if close >= 0:
+                    pos = close + 2
+                    break
+            elif not depth:
+                if kind == 'block':
+                    yield m.span()
+                elif kind == 'level':
+                    level_start = m.start()
+                    depth = 1
+            elif kind == 'close':
+                depth -= 1
+                if depth == 0:
+                    yield level_start, m.end()
+            elif kind == 'open' or kind == 'level' or kind == 'nodes' or kind == 'edges':
+                depth += 1
+            elif kind == 'block':
+                depth += 1
+                pos = m.start() + len(b'Level(')
+                break
+
+
+def iter_jsonl_levels(filepath):
+    """Stream level records from a JSON Lines pack (see generate_pack.py)."""
     with open(filepath) as f:
-        content = f.read()
-
-    levels = []
-    parts = content.split('Level(')
-
-    for part in parts[1:]:
-        id_match = re.search(r'id\s*=\s*(\d+)', part)
-        name_match = re.search(r'name\s*=\s*"([^"]+)"', part)
-        if not id_match or not name_match:
-            continue
-
-        level_id = int(id_match.group(1))
-        name = name_match.group(1)
-
-        nodes_section = re.search(r'nodes\s*=\s*listOf\(([\s\S]*?)\)\s*,\s*edges', part)
-        if not nodes_section:
-            continue
-        node_ids = [int(x) for x in re.findall(r'Node\(\s*(\d+)', nodes_section.group(1))]
-
-        edges_section = re.search(r'edges\s*=\s*listOf\(([\s\S]*?)\)\s*,\s*hint', part)
-        if not edges_section:
-            continue
-        edge_pairs = re.findall(r'Edge\(\s*(\d+)\s*,\s*(\d+)\s*\)', edges_section.group(1))
-        edges = [(int(a), int(b)) for a, b in edge_pairs]
-
-        valid_starts_match = re.search(r'validStartNodeIds\s*=\s*listOf\(([\d\s,]+)\)', part)
-        first_edge_match = re.search(r'firstEdge\s*=\s*Pair\(\s*(\d+)\s*,\s*(\d+)\s*\)', part)
-
-        valid_starts = []
-        if valid_starts_match:
-            valid_starts = [int(x.strip()) for x in valid_starts_match.group(1).split(',') if x.strip()]
+        for line in f:
+            if not line.strip():
+                continue
+            level = json.loads(line)
+            level['edges'] = [tuple(edge) for edge in level['edges']]
+            if 'positions' in level:
+                level['positions'] = [tuple(p) if p is not None else None for p in level['positions']]
+            if level.get('first_edge') is not None:
+                level['first_edge'] = tuple(level['first_edge'])
+            yield level
+
+
+def iter_levels(filepath):
+    """Stream level records from a memory-mapped Kotlin source file, a
+    .jsonl pack or a binary .lfpack.
+    """
+    if filepath.endswith('.jsonl'):
+        yield from iter_jsonl_levels(filepath)
+        return
+    if filepath.endswith('.lfpack'):
+        from level_pack import LevelPack
+        with LevelPack(filepath) as pack:
+            yield from pack
+        return
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield from scan_levels(buf)
 
-        first_edge = None
-        if first_edge_match:
-            first_edge = (int(first_edge_match.group(1)), int(first_edge_match.group(2)))
 
-        levels.append({
-            'id': level_id,
-            'name': name,
-            'nodes': node_ids,
-            'edges': edges,
-            'valid_starts': valid_starts,
-            'first_edge': first_edge,
-        })
+def parse_levels(filepath):
+    return list(iter_levels(filepath))
 
-    return levels
 
+def validate_level(level, mark=None):
+    """Issue messages for one level; [] when it is valid.
 
-def validate_level(level):
+    `mark`, if given, is called with the name of each phase as it finishes
+    (graph, parity, connectivity, hints); see profile_levels.
+    """
     issues = []
     nodes = set(level['nodes'])
-    edges = level['edges']
     valid_starts = set(level['valid_starts'])
     first_edge = level['first_edge']
+    # Degrees, duplicates, invalid references and union-find in one pass.
+    graph = LevelGraph(level['nodes'], level['edges'])
+
+    for a, b, bad in graph.invalid_refs:
+        issues.append(f"Edge ({a},{b}) references invalid node {bad}")
+
+    for a, b in graph.duplicates:
+        issues.append(f"Duplicate edge ({a},{b})")
+    if mark:
+        mark('graph')
 
-    for a, b in edges:
-        if a not in nodes:
-            issues.append(f"Edge ({a},{b}) references invalid node {a}")
-        if b not in nodes:
-            issues.append(f"Edge ({a},{b}) references invalid node {b}")
-
-    edge_set = set()
-    for a, b in edges:
-        key = (min(a, b), max(a, b))
-        if key in edge_set:
-            issues.append(f"Duplicate edge ({a},{b})")
-        edge_set.add(key)
-
-    degree = defaultdict(int)
-    for n in nodes:
-        degree[n] = 0
-    for a, b in edges:
-        degree[a] += 1
-        degree[b] += 1
-
-    odd_nodes = {n for n in nodes if degree[n] % 2 != 0}
+    odd_nodes = set(graph.odd_nodes)
     odd_count = len(odd_nodes)
 
     if odd_count != 0 and odd_count != 2:
         issues.append(f"Has {odd_count} odd-degree nodes (need 0 or 2): {sorted(odd_nodes)}")
-        issues.append(f"  Degrees: {dict(sorted(degree.items()))}")
-
-    adj = defaultdict(set)
-    for a, b in edges:
-        adj[a].add(b)
-        adj[b].add(a)
+        issues.append(f"  Degrees: {dict(sorted(graph.degree_map().items()))}")
+    if mark:
+        mark('parity')
 
     if nodes:
-        start = min(nodes)
-        visited = set()
-        queue = deque([start])
-        visited.add(start)
-        while queue:
-            curr = queue.popleft()
-            for neighbor in adj[curr]:
-                if neighbor not in visited:
-                    visited.add(neighbor)
-                    queue.append(neighbor)
-
-        unreachable = nodes - visited
+        unreachable = graph.unreachable_from(min(nodes))
         if unreachable:
-            issues.append(f"Not connected. Unreachable nodes: {sorted(unreachable)}")
+            issues.append(f"Not connected. Unreachable nodes: {unreachable}")
+    if mark:
+        mark('connectivity')
 
     is_circuit = (odd_count == 0)
     if is_circuit:
@@ -120,35 +413,208 @@ def validate_level(level):
 
     if first_edge:
         a, b = first_edge
-        has_edge = any(
-            (e[0] == a and e[1] == b) or (e[0] == b and e[1] == a)
-            for e in edges
-        )
-        if not has_edge:
+        if not graph.has_edge(a, b):
             issues.append(f"firstEdge ({a},{b}) not found in edges")
+    if mark:
+        mark('hints')
 
     return issues
 
 
-def main():
-    filepath = sys.argv[1] if len(sys.argv) > 1 else '/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt'
-    levels = parse_levels(filepath)
+def pack_record(level):
+    """Compact, cheap-to-pickle form of the fields validate_level reads."""
+    return (
+        array('i', level['nodes']).tobytes(),
+        array('i', chain.from_iterable(level['edges'])).tobytes(),
+        array('i', level['valid_starts']).tobytes(),
+        level['first_edge'],
+    )
+
+
+def unpack_record(record):
+    nodes, edges, valid_starts, first_edge = record
+    flat = array('i', edges)
+    return {
+        'nodes': array('i', nodes).tolist(),
+        'edges': list(zip(flat[::2], flat[1::2])),
+        'valid_starts': array('i', valid_starts).tolist(),
+        'first_edge': first_edge,
+    }
+
+
+def _validate_chunk(task):
+    records, batch = task
+    levels = [unpack_record(record) for record in records]
+    if batch:
+        from batch_validate import validate_pack
+        return validate_pack(levels)
+    return [validate_level(level) for level in levels]
+
+
+def validate_parallel(levels, jobs, batch=False):
+    """Validate `levels` across `jobs` processes; results come back in order."""
+    chunk_size = max(1, -(-len(levels) // (jobs * 4)))
+    tasks = (
+        ([pack_record(level) for level in levels[i:i + chunk_size]], batch)
+        for i in range(0, len(levels), chunk_size)
+    )
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        for chunk in pool.map(_validate_chunk, tasks):
+            yield from chunk
+
+
+def validate_all(levels, jobs=1, batch=False):
+    if jobs > 1:
+        return validate_parallel(levels, jobs, batch)
+    if batch:
+        from batch_validate import validate_pack
+        return validate_pack(levels)
+    return (validate_level(level) for level in levels)
+
+
+def validate_cached(filepath, cache_path, cache_size, jobs=1, batch=False):
+    """(id, name, node count, edge count, issues) for every level, in file order.
+
+    level_spans() finds the levels and their text is hashed as it stands;
+    only the spans whose key is not cached are parsed and validated.
+    """
+    from level_cache import ResultCache, level_key
+
+    with open(filepath, 'rb') as f, ResultCache(cache_path, cache_size) as cache:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            spans = list(level_spans(buf))
+            keys = [level_key(buf[start:end], VALIDATOR_VERSION) for start, end in spans]
+            cached = cache.get_many(keys)
+            # A span with no record (a level missing a field) is never
+            # cached, so it is parsed again on every run.
+            parsed = {
+                i: next(scan_levels(buf, start, end), None)
+                for i, ((start, end), key) in enumerate(zip(spans, keys)) if key not in cached
+            }
+
+        fresh = [level for level in parsed.values() if level is not None]
+        fresh_issues = iter(list(validate_all(fresh, jobs, batch)))
+        summaries = []
+        stored = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                summaries.append(cached[key])
+                continue
+            level = parsed[i]
+            if level is None:
+                continue
+            summary = (level['id'], level['name'], len(level['nodes']), len(level['edges']), next(fresh_issues))
+            summaries.append(summary)
+            stored.append((key, summary))
+        cache.put_many(stored)
+        cache.count(len(spans) - len(parsed), len(parsed))
+        print(cache.stats(), file=sys.stderr)
+
+    return summaries
 
-    print(f"Found {len(levels)} levels\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'filepath', nargs='?',
+        default='/Users/curious/AndroidStudioProjects/LineFlow/app/src/main/java/com/example/lineflow/Graph.kt',
+    )
+    parser.add_argument(
+        '--batch', action='store_true',
+        help="validate the whole pack at once with NumPy (same report)",
+    )
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=1, metavar='N',
+        help="validate in chunks across N worker processes",
+    )
+    parser.add_argument(
+        '--cache', metavar='PATH',
+        help="reuse results for unchanged levels from this cache file",
+    )
+    parser.add_argument(
+        '--cache-size', type=int, default=100_000, metavar='N',
+        help="keep at most N cached levels, evicting the least recently used",
+    )
+    parser.add_argument(
+        '--profile', action='store_true',
+        help="print time and allocated memory blocks per phase and the slowest levels to stderr",
+    )
+    parser.add_argument(
+        '--profile-top', type=int, default=10, metavar='N',
+        help="how many of the slowest levels --profile lists",
+    )
+    parser.add_argument(
+        '--profile-stacks', metavar='PATH',
+        help="sample the stack every millisecond of CPU time and write collapsed stacks for flame graphs",
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help="keep running and re-check the levels touched by every change, printing file:line: message",
+    )
+    parser.add_argument(
+        '--all', action='store_true',
+        help="with --watch, print every diagnostic after each change, not only those of re-checked levels",
+    )
+    args = parser.parse_args()
+    if args.cache and args.filepath.endswith(('.jsonl', '.lfpack')):
+        parser.error("--cache works on Kotlin sources only")
+    if args.watch:
+        if args.filepath.endswith(('.jsonl', '.lfpack')):
+            parser.error("--watch works on Kotlin sources only")
+        from watch_levels import watch
+        return watch(args.filepath, args.all)
+    if (args.profile or args.profile_stacks) and (args.cache or args.jobs > 1):
+        parser.error("profiling works without --cache and --jobs only")
+
+    profile = None
+    sampler = contextlib.nullcontext()
+    if args.profile:
+        from profile_levels import PhaseProfile
+        profile = PhaseProfile(args.profile_top)
+    if args.profile_stacks:
+        from profile_levels import StackSampler
+        sampler = StackSampler()
+
+    with sampler, profile or contextlib.nullcontext():
+        if args.cache:
+            summaries = validate_cached(args.filepath, args.cache, args.cache_size, args.jobs, args.batch)
+        else:
+            if profile:
+                levels = profile.time_phase('parse', parse_levels, args.filepath)
+                if args.batch:
+                    results = profile.time_phase('batch', validate_all, levels, 1, True)
+                else:
+                    results = [profile.time_level(validate_level, level) for level in levels]
+            else:
+                levels = parse_levels(args.filepath)
+                results = validate_all(levels, args.jobs, args.batch)
+            summaries = [
+                (level['id'], level['name'], len(level['nodes']), len(level['edges']), issues)
+                for level, issues in zip(levels, results)
+            ]
+    summaries.sort(key=lambda x: x[0])
+
+    print(f"Found {len(summaries)} levels\n")
 
     total_issues = 0
-    for level in sorted(levels, key=lambda x: x['id']):
-        issues = validate_level(level)
+    for level_id, name, node_count, edge_count, issues in summaries:
         if issues:
-            print(f"Level {level['id']} ({level['name']}) - {len(level['nodes'])} nodes, {len(level['edges'])} edges:")
+            print(f"Level {level_id} ({name}) - {node_count} nodes, {edge_count} edges:")
             for issue in issues:
                 print(f"  ERROR: {issue}")
             print()
             total_issues += len(issues)
         else:
-            print(f"Level {level['id']} ({level['name']}) - OK ({len(level['nodes'])} nodes, {len(level['edges'])} edges)")
-
-    print(f"\nTotal: {len(levels)} levels, {total_issues} issues")
+            print(f"Level {level_id} ({name}) - OK ({node_count} nodes, {edge_count} edges)")
+
+    print(f"\nTotal: {len(summaries)} levels, {total_issues} issues")
+    if profile:
+        profile.report()
+    if args.profile_stacks:
+        samples = sampler.write(args.profile_stacks)
+        print(f"Wrote {samples} stack samples to {args.profile_stacks}", file=sys.stderr)
     return 1 if total_issues > 0 else 0
 
 
@@ -0,0 +1,219 @@
+"""Keep validating a Kotlin level source while it is being edited.
+
+validate_levels --watch polls the file every POLL_INTERVAL seconds. On a
+change the new bytes are compared with the previous ones to find the
+edited range (two memcmp bisections). Scanning restarts at the end of the
+last level before the edited line (or before the /* that a typed or
+deleted block comment marker may pair with, see comment_start()) and
+stops at the first level that comes out exactly where an unchanged level
+used to be, shifted by the edit: from a level start on, identical bytes
+scan identically, so the levels after it are kept with their spans and
+lines moved. Only the levels scanned again are revalidated.
+
+Diagnostics are printed as `file:line: message`, the line being the one
+the level starts on: all of them at start-up, then after each change
+those of the levels that were re-checked (or all of them with --all).
+A one-line summary of every run goes to stderr.
+"""
+import os
+import sys
+import time
+from bisect import bisect_left, bisect_right
+
+from validate_levels import scan_levels, validate_level
+
+POLL_INTERVAL = 0.05
+
+
+def common_prefix(a, b):
+    """Length of the longest common prefix of two bytes objects."""
+    view = memoryview(b)
+    lo, hi = 0, min(len(a), len(b))
+    # a.startswith(view[...], lo) compares in place, without copying.
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a.startswith(view[lo:mid], lo):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def common_suffix(a, b, limit):
+    """Length of the longest common suffix of a and b, at most `limit`."""
+    view = memoryview(b)
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a.endswith(view[len(b) - mid:len(b) - lo], 0, len(a) - lo):
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def comment_start(buf, start):
+    """Where scanning must restart when a block comment marker is typed or
+    deleted at `start`: the first /* after the last */ before it, else
+    `start` itself.
+
+    A /* without its */ is not a comment, so a new */ turns the text from
+    the first such /* on into one, and deleting a */ can undo that; text
+    before it scans the same. Markers inside strings or line comments are
+    counted too, which only restarts earlier.
+    """
+    closed = buf.rfind(b'*/', 0, start)
+    opened = buf.find(b'/*', closed + 2 if closed >= 0 else 0, start)
+    return opened if opened >= 0 else start
+
+
+class WatchedSource:
+    """The levels of one source, their issues, and the bytes they came from.
+
+    Spans and line numbers are kept in plain lists next to the records
+    (which lose their own 'span' and 'lines'), so moving everything after
+    an edit is a few list comprehensions.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.levels = []
+        self.starts = []
+        self.ends = []
+        self.first_lines = []
+        self.last_lines = []
+        self._take(scan_levels(buf), self.levels, self.starts, self.ends, self.first_lines, self.last_lines)
+        self.issues = [validate_level(level) for level in self.levels]
+        self.issue_count = sum(len(issues) for issues in self.issues)
+
+    @staticmethod
+    def _take(found, levels, starts, ends, first_lines, last_lines):
+        for level in found:
+            start, end = level.pop('span')
+            first_line, last_line = level.pop('lines')
+            levels.append(level)
+            starts.append(start)
+            ends.append(end)
+            first_lines.append(first_line)
+            last_lines.append(last_line)
+
+    def update(self, buf):
+        """Switch to the new contents `buf`; returns (the levels scanned
+        again as (level, line, issues), number of old levels they replaced).
+        """
+        old = self.buf
+        start = common_prefix(old, buf)
+        if start == len(old) == len(buf):
+            return [], 0
+        tail = common_suffix(old, buf, min(len(old), len(buf)) - start)
+        old_end = len(old) - tail
+        new_end = len(buf) - tail
+        delta = len(buf) - len(old)
+
+        around = max(start - 1, 0)
+        if any(marker in text for text in (old[around:old_end + 1], buf[around:new_end + 1])
+               for marker in (b'/*', b'*/')):
+            start = comment_start(old, start)
+        # Levels ending before the edited line are untouched (no other
+        # token looks past the end of its line or its level's last paren),
+        # and so is the scanner's state right after the last of them.
+        starts, ends = self.starts, self.ends
+        first = bisect_right(ends, old.rfind(b'\n', 0, start) + 1)
+        scan_from, line = (ends[first - 1], self.last_lines[first - 1]) if first else (0, 1)
+        rest = bisect_left(starts, old_end, first)
+
+        found = []
+        resume = len(starts)
+        line_delta = 0
+        for level in scan_levels(buf, scan_from, len(buf), line):
+            if level['span'][0] >= new_end:
+                at = level['span'][0] - delta
+                j = bisect_left(starts, at, rest)
+                if j < len(starts) and starts[j] == at:
+                    resume = j
+                    line_delta = level['lines'][0] - self.first_lines[j]
+                    break
+            found.append(level)
+        fresh = ([], [], [], [], [])
+        self._take(found, *fresh)
+        issues = [validate_level(level) for level in fresh[0]]
+
+        if delta:
+            starts[resume:] = [at + delta for at in starts[resume:]]
+            ends[resume:] = [at + delta for at in ends[resume:]]
+        if line_delta:
+            self.first_lines[resume:] = [at + line_delta for at in self.first_lines[resume:]]
+            self.last_lines[resume:] = [at + line_delta for at in self.last_lines[resume:]]
+        for column, values in zip((self.levels, starts, ends, self.first_lines, self.last_lines), fresh):
+            column[first:resume] = values
+        self.issue_count += sum(map(len, issues)) - sum(len(old_issues) for old_issues in self.issues[first:resume])
+        self.issues[first:resume] = issues
+        self.buf = buf
+        return list(zip(fresh[0], fresh[3], issues)), resume - first
+
+
+def diagnostics(filepath, level, line, issues):
+    return [f"{filepath}:{line}: Level {level['id']} ({level['name']}): {issue}" for issue in issues]
+
+
+def _stamp(filepath):
+    st = os.stat(filepath)
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _read(filepath):
+    with open(filepath, 'rb') as f:
+        return f.read()
+
+
+def watch(filepath, all_diagnostics=False, interval=POLL_INTERVAL, out=sys.stdout):
+    """Validate `filepath` now and after every change until interrupted."""
+    stamp = _stamp(filepath)
+    started = time.perf_counter()
+    source = WatchedSource(_read(filepath))
+    for level, line, issues in zip(source.levels, source.first_lines, source.issues):
+        for message in diagnostics(filepath, level, line, issues):
+            print(message, file=out)
+    out.flush()
+    print(f"-- {len(source.levels)} levels checked, {source.issue_count} issues "
+          f"({(time.perf_counter() - started) * 1000:.0f} ms)", file=sys.stderr)
+
+    try:
+        while True:
+            time.sleep(interval)
+            try:
+                now = _stamp(filepath)
+                if now == stamp:
+                    continue
+                buf = _read(filepath)
+            except FileNotFoundError:
+                # Editors that save by renaming leave a short gap.
+                continue
+            stamp = now
+            started = time.perf_counter()
+            try:
+                rechecked, replaced = source.update(buf)
+            except UnicodeDecodeError as e:
+                # Most likely caught halfway through a save; the next one
+                # is compared with the last contents that did scan.
+                print(f"{filepath}: not valid UTF-8 ({e.reason} at byte {e.start}), waiting for the next change",
+                      file=sys.stderr)
+                continue
+            except ValueError as e:
+                # update() changes nothing until the scan is through, so the
+                # last good state stays and the next save is compared with it.
+                line = buf.count(b'\n', 0, common_prefix(source.buf, buf)) + 1
+                print(f"{filepath}:{line}: could not scan the edit ({e}), waiting for the next change",
+                      file=sys.stderr)
+                continue
+            elapsed = time.perf_counter() - started
+            shown = zip(source.levels, source.first_lines, source.issues) if all_diagnostics else rechecked
+            for level, line, issues in shown:
+                for message in diagnostics(filepath, level, line, issues):
+                    print(message, file=out)
+            out.flush()
+            print(f"-- {len(rechecked)} levels re-checked in place of {replaced}, "
+                  f"{source.issue_count} issues in {len(source.levels)} levels ({elapsed * 1000:.0f} ms)",
+                  file=sys.stderr)
+    except KeyboardInterrupt:
+        return 1 if source.issue_count else 0
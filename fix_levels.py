@@ -1,50 +1,18 @@
 #!/usr/bin/env python3
 """Fix remaining broken levels."""
-from collections import defaultdict, deque
+import os
+import sys
 
-def compute_degrees(nodes, edges):
-    deg = defaultdict(int)
-    for n in nodes:
-        deg[n] = 0
-    for a, b in edges:
-        deg[a] += 1
-        deg[b] += 1
-    return dict(deg)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '.scripts'))
 
-def odd_nodes(nodes, edges):
-    deg = compute_degrees(nodes, edges)
-    return sorted([n for n in nodes if deg[n] % 2 != 0])
-
-def is_connected(nodes, edges):
-    adj = defaultdict(set)
-    for a, b in edges:
-        adj[a].add(b)
-        adj[b].add(a)
-    visited = set()
-    queue = deque([nodes[0]])
-    visited.add(nodes[0])
-    while queue:
-        curr = queue.popleft()
-        for n in adj[curr]:
-            if n not in visited:
-                visited.add(n)
-                queue.append(n)
-    return len(visited) == len(nodes)
-
-def has_dups(edges):
-    s = set()
-    for a, b in edges:
-        k = (min(a, b), max(a, b))
-        if k in s:
-            return True
-        s.add(k)
-    return False
+from graph_core import LevelGraph  # noqa: E402
 
 def check(name, nodes, edges):
-    deg = compute_degrees(nodes, edges)
-    odd = odd_nodes(nodes, edges)
-    conn = is_connected(nodes, edges)
-    dups = has_dups(edges)
+    graph = LevelGraph(nodes, edges)
+    deg = graph.degree_map()
+    odd = graph.odd_nodes
+    conn = graph.is_connected
+    dups = bool(graph.duplicates)
     ok = len(odd) in (0, 2) and conn and not dups
     status = "OK" if ok else "FAIL"
     type_str = "Circuit" if len(odd) == 0 else f"Path({odd})"
@@ -159,34 +127,39 @@ print("\n=== Hint-only fixes ===")
 # Level 30: recompute odd nodes
 nodes_30 = list(range(8))
 edges_30 = [(0,1),(1,2),(2,3),(3,0),(0,4),(4,5),(5,1),(0,6),(1,6),(6,2),(6,3),(3,7),(7,2),(6,7)]
-deg_30 = compute_degrees(nodes_30, edges_30)
-odd_30 = odd_nodes(nodes_30, edges_30)
+graph_30 = LevelGraph(nodes_30, edges_30)
+deg_30 = graph_30.degree_map()
+odd_30 = graph_30.odd_nodes
 print(f"Level 30: degrees={deg_30}, odd={odd_30}")
 
 # Level 37:
 nodes_37 = list(range(10))
 edges_37 = [(0,2),(0,3),(2,3),(2,4),(3,5),(4,5),(4,6),(5,7),(6,7),(6,1),(7,1),(4,8),(8,6),(5,9),(9,7),(2,5),(3,4)]
-deg_37 = compute_degrees(nodes_37, edges_37)
-odd_37 = odd_nodes(nodes_37, edges_37)
+graph_37 = LevelGraph(nodes_37, edges_37)
+deg_37 = graph_37.degree_map()
+odd_37 = graph_37.odd_nodes
 print(f"Level 37: degrees={deg_37}, odd={odd_37}")
 
 # Level 41:
 nodes_41 = list(range(11))
 edges_41 = [(0,2),(0,3),(2,3),(2,4),(3,5),(4,5),(4,6),(5,7),(6,7),(6,8),(7,9),(8,9),(8,1),(9,1),(4,10),(10,5),(10,2),(10,3),(6,9)]
-deg_41 = compute_degrees(nodes_41, edges_41)
-odd_41 = odd_nodes(nodes_41, edges_41)
+graph_41 = LevelGraph(nodes_41, edges_41)
+deg_41 = graph_41.degree_map()
+odd_41 = graph_41.odd_nodes
 print(f"Level 41: degrees={deg_41}, odd={odd_41}")
 
 # Level 42:
 nodes_42 = list(range(12))
 edges_42 = [(0,1),(0,3),(0,5),(0,6),(1,7),(7,2),(2,8),(8,3),(3,11),(11,4),(4,9),(9,5),(5,10),(10,6),(6,1),(1,2),(2,3),(4,5),(0,2),(0,4)]
-deg_42 = compute_degrees(nodes_42, edges_42)
-odd_42 = odd_nodes(nodes_42, edges_42)
+graph_42 = LevelGraph(nodes_42, edges_42)
+deg_42 = graph_42.degree_map()
+odd_42 = graph_42.odd_nodes
 print(f"Level 42: degrees={deg_42}, odd={odd_42}")
 
 # Level 49 (original): was circuit not path
 nodes_49_orig = list(range(14))
 edges_49_orig = [(0,2),(0,3),(2,4),(3,5),(4,6),(5,7),(6,8),(7,9),(8,1),(9,1),(2,10),(10,3),(10,12),(10,13),(12,6),(13,7),(12,11),(13,11),(11,8),(11,9),(4,12),(5,13),(2,3),(4,5),(6,7),(8,9)]
-deg_49 = compute_degrees(nodes_49_orig, edges_49_orig)
-odd_49 = odd_nodes(nodes_49_orig, edges_49_orig)
+graph_49 = LevelGraph(nodes_49_orig, edges_49_orig)
+deg_49 = graph_49.degree_map()
+odd_49 = graph_49.odd_nodes
 print(f"Level 49 (original): degrees={deg_49}, odd={odd_49}")